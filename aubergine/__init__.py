@@ -1,4 +1,5 @@
 """Main initialization file."""
 from aubergine.aubergine import Aubergine
+from aubergine.responses import RawResponse
 
-__all__ = ['Aubergine']
+__all__ = ['Aubergine', 'RawResponse']
@@ -0,0 +1,5 @@
+"""Allow running aubergine's command line interface with `python -m aubergine`."""
+import sys
+from aubergine.cli import main
+
+sys.exit(main())
@@ -0,0 +1,143 @@
+"""Per-operation admission control: concurrency limits and rate limiting."""
+import math
+import threading
+import time
+import falcon
+from aubergine.common import Loggable
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    :param rate: number of tokens added per second.
+    :type rate: float
+    :param capacity: maximum number of tokens in the bucket (i.e. allowed burst).
+    :type capacity: float
+    :param clock: callable returning current time in seconds.
+    :type clock: callable
+    """
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'clock', '_lock')
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take single token from the bucket, if there is one.
+
+        :returns: True if token was taken, False otherwise.
+        :rtype: bool
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+    def retry_after(self):
+        """Number of seconds after which a token will be available."""
+        with self._lock:
+            return max(0.0, (1.0 - self.tokens) / self.rate)
+
+
+class AdmissionController(Loggable):
+    """Local admission control of requests of a single operation.
+
+    Requests are rejected when the operation's rate limit is exhausted or when too many
+    of its requests are already being processed by this worker.
+
+    :param concurrency: maximum number of requests processed concurrently, or None.
+    :type concurrency: int
+    :param bucket: token bucket limiting rate of requests, or None.
+    :type bucket: :py:class:`TokenBucket`
+    :param status: status of responses to rejected requests, either 429 or 503. If None,
+     429 is used for rate limited requests and 503 for requests over concurrency limit.
+    :type status: int
+    :param retry_after: number of seconds in Retry-After header of responses to requests
+     rejected because of concurrency limit.
+    :type retry_after: int
+    """
+    __slots__ = ('concurrency', 'bucket', 'status', 'retry_after', '_semaphore')
+
+    SPEC_KEY = 'x-aubergine-limits'
+
+    ERRORS = {429: falcon.HTTPTooManyRequests, 503: falcon.HTTPServiceUnavailable}
+
+    def __init__(self, concurrency=None, bucket=None, status=None, retry_after=1):
+        if status is not None and status not in self.ERRORS:
+            raise ValueError('Rejection status should be 429 or 503, got {}.'.format(status))
+        self.concurrency = concurrency
+        self.bucket = bucket
+        self.status = status
+        self.retry_after = retry_after
+        self._semaphore = threading.Semaphore(concurrency) if concurrency else None
+
+    def admit(self):
+        """Admit request or reject it by raising appropriate HTTP error.
+
+        Every admitted request should be followed by call to :py:meth:`release`.
+
+        :raises falcon.HTTPTooManyRequests: if request was rejected (default for rate limit).
+        :raises falcon.HTTPServiceUnavailable: if request was rejected (default for
+         concurrency limit).
+        """
+        # Requests rejected for concurrency don't take tokens from the rate limit's budget.
+        if self._semaphore is not None and not self._semaphore.acquire(blocking=False):
+            self._reject(self.status or 503, 'Too many concurrent requests.', self.retry_after)
+        if self.bucket is not None and not self.bucket.try_acquire():
+            self.release()
+            self._reject(self.status or 429, 'Rate limit exceeded.',
+                         math.ceil(self.bucket.retry_after()))
+
+    def release(self):
+        """Release concurrency slot taken by an admitted request."""
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    def _reject(self, status, description, retry_after):
+        # Rejections come in floods when the service is overloaded, so they aren't warnings.
+        self.logger.debug('Request rejected: %s', description)
+        raise self.ERRORS[status](description=description, retry_after=max(1, retry_after))
+
+    @classmethod
+    def from_spec(cls, op_spec):
+        """Create admission controller for operation described by `op_spec`.
+
+        Limits are declared using `x-aubergine-limits` extension, e.g.::
+
+            x-aubergine-limits:
+              concurrency: 8      # requests processed at once by a single worker
+              rate: 100           # requests per second
+              burst: 20           # bucket capacity, defaults to rate
+              status: 503         # status of rejections, see AdmissionController
+              retry-after: 2      # Retry-After for concurrency rejections
+
+        :returns: admission controller or None if operation declares no limits.
+        :rtype: :py:class:`AdmissionController` or None
+        :raises ValueError: if the rate is not positive, or the burst or concurrency is less
+         than 1, as such limits would reject every request.
+        """
+        limits = op_spec.get(cls.SPEC_KEY)
+        if not limits:
+            return None
+        bucket = None
+        if 'rate' in limits:
+            rate = float(limits['rate'])
+            burst = float(limits.get('burst', max(1.0, rate)))
+            if not rate > 0:
+                raise ValueError('Rate limit should be positive, got {}.'.format(rate))
+            if not burst >= 1:
+                raise ValueError('Burst should be at least 1, got {}.'.format(burst))
+            bucket = TokenBucket(rate, burst)
+        if limits.get('concurrency') is not None and limits['concurrency'] < 1:
+            raise ValueError('Concurrency limit should be at least 1, got {}.'.format(
+                limits['concurrency']))
+        return cls(concurrency=limits.get('concurrency'), bucket=bucket,
+                   status=limits.get('status'), retry_after=limits.get('retry-after', 1))
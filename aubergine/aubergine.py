@@ -1,11 +1,25 @@
 """Definition of main class - aubergine's public API."""
+from concurrent.futures import ThreadPoolExecutor
+import collections
 import importlib
 import logging
+import os
+import re
 from urllib.parse import urlparse
 import falcon
 from nadia.api import SchemaBuilder
 import ymlref
+import yaml
+from aubergine.common import join_route, to_plain
+from aubergine.derived import derive_handlers
+from aubergine.document import document_routes
 from aubergine.extractors import ExtractorBuilder
+from aubergine.memory import memory_report
+from aubergine.metrics import MetricsResource
+from aubergine.reload import ReloadableResource, ReloadableRoutes, SpecWatcher
+from aubergine.spec import SpecLoader
+from aubergine.timing import BuildTimer, TimedExtractorBuilder, timed_phase
+from aubergine.warmup import ReadinessResource, Warmup
 from aubergine import utils
 
 
@@ -18,6 +32,15 @@ class Aubergine:
 
     def __init__(self, spec_dict):
         self.spec_dict = spec_dict
+        self.spec_path = None
+        self.spec_loader = None
+        self.watcher = None
+        self.warmup = None
+        self.prefix = ''
+        self.routes = collections.OrderedDict()
+
+    HANDLER_OPTIONS = ('trusted_source', 'deadline_header', 'profiling', 'background',
+                       'resources', 'security', 'metrics')
 
     def build_api(self, api_factory=falcon.API, **kwargs):
         """Build falcon API for this aubergine app.
@@ -31,6 +54,18 @@ class Aubergine:
          not needed but here's the list of used `kwargs` anyway:
          -  'ex_factory': a :py:class:`aubergine.extractors.ExtractorBuilder` instance.
             If not provided, one will be created for you.
+         - 'cors': a :py:class:`aubergine.cors.CorsSettings` instance used for answering
+           CORS preflight requests. Paths whose spec doesn't declare OPTIONS operation get
+           OPTIONS handler answering with Allow (and, for preflights from allowed origins,
+           CORS) headers precomputed at build time, without calling any operation.
+           Responses to other requests from allowed origins get Access-Control-Allow-Origin
+           and the configured exposed headers and credentials flag. Paths with GET but
+           without HEAD operation get HEAD handler running the GET operation (or the one
+           named in its `x-aubergine-head` extension) without serializing its result.
+           Derived handlers are not listed in :py:attr:`routes`.
+         - 'prefix': path prepended to the base path of the specification (and to other
+           routes added by aubergine), used for mounting several apps onto a single API.
+           See :py:class:`aubergine.hosting.Host`. Defaults to no prefix.
          - 'import_module': a callable that can be used to load modules/operations.
            More generally, it is a callable that will be called for every operation
            with argument being the part of operationId before the last dot. It should
@@ -39,6 +74,66 @@ class Aubergine:
            called with 'my.package' argument, and is supposed to return anything with
            `oper` atrribute (callable with argument matching the appropriate operation
            schema. Defaults to :py:func:`importlib.import_module`
+         - 'watch': if True, the file this app was loaded from (see :py:meth:`from_file`)
+           is watched and, whenever it changes, only the operations that changed get
+           rebuilt and swapped in place. Requests in flight finish on the old handlers.
+           Paths added to the file are served by a sink registered under the base path
+           (see :py:class:`aubergine.reload.ReloadableRoutes`). Defaults to False.
+         - 'watch_interval': number of seconds between checks of the watched file.
+           Defaults to 1.
+         - 'workers': number of threads used for building handlers concurrently. Routes
+           are registered in the order of the specification regardless of this setting,
+           and if building some handlers fails, the error of the first of them (in the
+           specification's order) is raised. Defaults to None, meaning that handlers
+           are built sequentially.
+         - 'timer': a :py:class:`aubergine.timing.BuildTimer` instance in which time spent
+           on compiling schemas, importing modules and registering routes is recorded.
+           Pass the same timer to :py:meth:`from_file` to include loading the spec.
+         - 'trusted_source': a predicate called with :py:class:`falcon.Request`, telling
+           whether the request comes from a trusted caller. Requests of trusted callers
+           are validated according to operation's `x-aubergine-validation` extension
+           (see :py:class:`aubergine.validation.ValidationPolicy`), all other requests
+           are always fully validated.
+         - 'deadline_header': name of the header in which clients may pass deadlines of
+           their requests, as seconds since the epoch. Requests past their deadline are
+           rejected with 504 before any extraction, and async operations are cancelled
+           when the deadline passes. Operations can declare their own timeouts using
+           `x-aubergine-timeout` extension and learn their remaining time budget by
+           calling :py:func:`aubergine.deadlines.remaining_budget`.
+         - 'profiling': a :py:class:`aubergine.profiling.ProfileSettings` instance. If given,
+           requests carrying the configured header with the secret token, as well as
+           a fraction of requests declared in operation's `x-aubergine-profile` extension,
+           are profiled and their profiles dumped to the configured directory. Use
+           `aubergine profile-report` command to aggregate them per operation.
+         - 'background': a :py:class:`aubergine.background.BackgroundExecutor` instance.
+           If given, operations can call :py:func:`aubergine.background.schedule` to run
+           follow-up work once their response is ready, on the executor's bounded pool.
+           Call its `shutdown` method (done automatically at exit) to drain pending tasks.
+         - 'resources': a :py:class:`aubergine.resources.ResourceRegistry` instance. Resources
+           declared in operation's `x-aubergine-resources` extension are created once per
+           worker process and passed to the operation as additional keyword arguments.
+         - 'security': a :py:class:`aubergine.security.Authenticator` instance. If given,
+           `security` requirements of operations (or of the whole spec) are enforced using
+           schemes declared in `components.securitySchemes`. Requests without valid
+           credentials are rejected with 401 before anything is extracted from them, and
+           the authenticated principal is stored in `req.context['principal']`.
+         - 'warmup': a :py:class:`aubergine.warmup.WarmupSettings` instance. If given, every
+           operation receives a few synthetic valid requests once the API is built, and a
+           readiness route is added, responding with 503 until this warm-up finishes. The
+           warm-up is available as `warmup` attribute of the app. Build the API in every
+           worker process, since what gets warmed up is local to the process.
+         - 'spec_route': route (relative to the base path) under which the specification
+           is served, e.g. '/openapi' serves it at '/openapi.json' and '/openapi.yaml'.
+           Both formats are serialized and gzip-compressed once, when the API is built,
+           and served with strong ETags, answering conditional requests with 304.
+           The document is not refreshed when the watched file changes.
+           See :py:meth:`document`.
+         - 'metrics': a :py:class:`aubergine.metrics.MetricsStore` instance. If given, the
+           number, outcomes and durations of requests of every operation are recorded in the
+           store's memory-mapped file, in a slot of the worker process handling them, and the
+           totals across all workers are served in Prometheus text format under the store's
+           route (prefixed like the readiness route). HEAD requests answered by the GET
+           operation are recorded as its requests, as are warm-up requests.
         :returns: an API object
         :rtype: :py:class:`falcon.API`
         """
@@ -50,25 +145,154 @@ class Aubergine:
                     self.spec_dict['info']['version'])
         ex_factory = kwargs.get('ex_factory', ExtractorBuilder(SchemaBuilder.create()))
         import_module = kwargs.get('import_module', importlib.import_module)
-        base_path = self._get_base_path()
+        self.prefix = kwargs.get('prefix', '').rstrip('/')
+        base_path = self.prefix + self.get_base_path()
         logger.info('Using base path %s', base_path)
+        watch = kwargs.get('watch', False)
+        if watch and self.spec_path is None:
+            raise ValueError('Only apps loaded with from_file can be watched for changes.')
+        timer = kwargs.get('timer')
+        options = {key: kwargs[key] for key in self.HANDLER_OPTIONS if key in kwargs}
+        if 'security' in options:
+            options['security'] = options['security'].for_spec(self.spec_dict)
         api = api_factory()
-        for path, path_spec in self.spec_dict['paths'].items():
-            logger.info('Creating handlers for path %s', path)
-            handlers = {meth: utils.create_handler(path, op_spec, ex_factory, import_module)
-                        for meth, op_spec in path_spec.items()}
-            resource = utils.create_resource(handlers)
-            api.add_route('/'.join((base_path.rstrip('/'), path.strip('/'))), resource)
+        all_handlers = self._create_handlers(ex_factory, import_module, options,
+                                             kwargs.get('workers'), timer)
+        resources = {}
+        with timed_phase(timer, BuildTimer.ROUTE_REGISTRATION):
+            for path, handlers in all_handlers.items():
+                served = dict(handlers)
+                served.update(derive_handlers(path, handlers, self.spec_dict['paths'][path],
+                                              import_module, kwargs.get('cors')))
+                if watch:
+                    resource = ReloadableResource(path, served)
+                else:
+                    resource = utils.create_resource(served)
+                resources[path] = resource
+                self.routes[join_route(base_path, path)] = handlers
+                api.add_route(join_route(base_path, path), resource)
+        if kwargs.get('spec_route') is not None:
+            document = self.document()
+            for route, resource in document_routes(kwargs['spec_route'], document).items():
+                logger.info('Serving specification at %s', join_route(base_path, route))
+                api.add_route(join_route(base_path, route), resource)
+        if watch:
+            logger.info('Watching %s for changes', self.spec_path)
+            routes = ReloadableRoutes()
+            api.add_sink(routes, re.escape(base_path))
+            self.watcher = SpecWatcher(self, routes, resources, base_path, ex_factory,
+                                       import_module, kwargs.get('watch_interval', 1.0),
+                                       options, kwargs.get('cors'))
+            self.watcher.start()
+        metrics = kwargs.get('metrics')
+        if metrics is not None and metrics.route is not None:
+            logger.info('Serving metrics at %s', self.prefix + metrics.route)
+            api.add_route(self.prefix + metrics.route, MetricsResource(metrics))
+        if kwargs.get('warmup') is not None:
+            self.warmup = Warmup(self, kwargs['warmup'])
+            api.add_route(self.prefix + self.warmup.settings.readiness_route,
+                          ReadinessResource(self.warmup))
+            self.warmup.start(api)
         return api
 
+    def _create_handlers(self, ex_factory, import_module, options, workers, timer):
+        logger = logging.getLogger('aubergine')
+        if timer is not None:
+            ex_factory = TimedExtractorBuilder(ex_factory, timer)
+            import_module = timer.wrap(BuildTimer.MODULE_IMPORT, import_module)
+        operations = [(path, meth, op_spec)
+                      for path, path_spec in self.spec_dict['paths'].items()
+                      for meth, op_spec in path_spec.items()]
+        with timed_phase(timer, BuildTimer.HANDLERS_BUILD):
+            if workers:
+                logger.info('Creating handlers using %d threads', workers)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(utils.create_handler, path, op_spec, ex_factory,
+                                               import_module, **options)
+                               for path, _, op_spec in operations]
+                    built = [future.result() for future in futures]
+            else:
+                built = [utils.create_handler(path, op_spec, ex_factory, import_module, **options)
+                         for path, _, op_spec in operations]
+        all_handlers = collections.OrderedDict()
+        for (path, meth, _), handler in zip(operations, built):
+            if path not in all_handlers:
+                logger.info('Created handlers for path %s', path)
+            all_handlers.setdefault(path, {})[meth] = handler
+        return all_handlers
+
+    def document(self):
+        """Get the specification document as plain dicts and lists, suitable for serving.
+
+        For apps loaded with :py:meth:`from_file`, the document is read again from the file
+        without resolving references, so it is served as it was written. Otherwise
+        :py:attr:`spec_dict` is converted.
+
+        :rtype: dict
+        """
+        if self.spec_path is not None:
+            with open(self.spec_path) as specfile:
+                return yaml.safe_load(specfile)
+        return to_plain(self.spec_dict)
+
+    def memory_report(self):
+        """Estimate memory used by runtime objects of the routes built by :py:meth:`build_api`.
+
+        :returns: bytes used per route and per type of component.
+        :rtype: :py:class:`aubergine.memory.MemoryReport`
+        """
+        return memory_report(self.routes)
+
+    def cache_stats(self):
+        """Get statistics of validation caches of operations using `x-aubergine-memoize`.
+
+        :returns: mapping '<METHOD> <route>' -> mapping with keys 'params' (mapping
+         parameter name -> stats of its cache) and 'body' (stats of body's cache, or None
+         if there's no body), stats being :py:class:`aubergine.extractors.CacheStats`.
+        :rtype: :py:class:`collections.OrderedDict`
+        """
+        stats = collections.OrderedDict()
+        for route, handlers in self.routes.items():
+            for meth, handler in handlers.items():
+                params = collections.OrderedDict(
+                    (name, extractor.cache.stats())
+                    for name, extractor in handler.params_extractors.items()
+                    if extractor.cache is not None)
+                body = handler.body_extractor
+                body = body.cache.stats() if body is not None and body.cache is not None else None
+                if params or body is not None:
+                    stats['{} {}'.format(meth.upper(), route)] = {'params': params, 'body': body}
+        return stats
+
     @classmethod
-    def from_file(cls, path):
-        """Shorthand for loading spec from given path and constructing Aubergine from it."""
-        with open(path) as specfile:
+    def from_file(cls, path, lazy=False, timer=None):
+        """Shorthand for loading spec from given path and constructing Aubergine from it.
+
+        :param path: path to the specification file.
+        :type path: str
+        :param lazy: if True, the spec is loaded with :py:class:`aubergine.spec.SpecLoader`,
+         which resolves references on first access and shares a single object for every
+         referenced component. The loader is available as `spec_loader` attribute of the
+         returned app and can be used for reporting memory footprint of the spec.
+         Defaults to False, in which case `ymlref` is used.
+        :type lazy: bool
+        :param timer: if given, the time of loading spec is recorded in it.
+        :type timer: :py:class:`aubergine.timing.BuildTimer`
+        :rtype: :py:class:`Aubergine`
+        """
+        with timed_phase(timer, BuildTimer.SPEC_LOAD), open(path) as specfile:
             content = specfile.read()
-            return cls(ymlref.load(content))
+            if lazy:
+                loader = SpecLoader(base_dir=os.path.dirname(path) or '.')
+                app = cls(loader.load(content))
+                app.spec_loader = loader
+            else:
+                app = cls(ymlref.load(content))
+        app.spec_path = path
+        return app
 
-    def _get_base_path(self):
+    def get_base_path(self):
+        """Get base path shared by all servers declared in the specification."""
         base_paths = {urlparse(server['url']).path for server in self.spec_dict['servers']}
         if len(base_paths) != 1:
             raise ValueError("Base paths of servers differ, I don't know which one to use.")
@@ -0,0 +1,154 @@
+"""Tasks scheduled by operations to run after the response is ready."""
+import atexit
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import os
+import threading
+from aubergine.common import Loggable
+
+
+_LOCAL = threading.local()
+
+BackgroundStats = collections.namedtuple(
+    'BackgroundStats', ['submitted', 'completed', 'failed', 'rejected', 'pending'])
+
+
+def schedule(func, *args, **kwargs):
+    """Schedule call of `func` with given arguments after the current response is ready.
+
+    Tasks scheduled by an operation that raised an exception are discarded.
+
+    :raises RuntimeError: if called outside of a request handled with background executor
+     configured (see `background` option of :py:meth:`aubergine.Aubergine.build_api`).
+    """
+    tasks = getattr(_LOCAL, 'tasks', None)
+    if tasks is None:
+        raise RuntimeError('Background tasks can only be scheduled while handling a request '
+                           'of an app built with background executor.')
+    tasks.append((func, args, kwargs))
+
+
+class BackgroundExecutor(Loggable):
+    """Bounded, per-process pool running background tasks.
+
+    The pool is created lazily, and recreated in processes forked after its creation, so the
+    executor can be configured before the server forks its workers.
+
+    :param max_workers: number of threads running the tasks.
+    :type max_workers: int
+    :param max_pending: maximum number of tasks waiting or running. Tasks submitted above
+     this limit are dropped (and counted as rejected).
+    :type max_pending: int
+    """
+
+    def __init__(self, max_workers=4, max_pending=1000):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = None
+        self._pid = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._counts = collections.Counter()
+        self._pending = 0
+
+    @contextmanager
+    def collect(self):
+        """Collect tasks scheduled within the block into the yielded list."""
+        previous = getattr(_LOCAL, 'tasks', None)
+        tasks = _LOCAL.tasks = []
+        try:
+            yield tasks
+        finally:
+            _LOCAL.tasks = previous
+
+    def submit_all(self, tasks):
+        """Submit collected tasks, dropping those not fitting within the pending limit."""
+        for func, args, kwargs in tasks:
+            self.submit(func, *args, **kwargs)
+
+    def submit(self, func, *args, **kwargs):
+        """Submit single task.
+
+        :returns: True if the task was accepted, False if it was dropped.
+        :rtype: bool
+        """
+        with self._cond:
+            pool = None if self._closed else self._get_pool()
+            if pool is None or self._pending >= self.max_pending:
+                self._counts['rejected'] += 1
+                self.logger.warning('Background task %r dropped, %d tasks pending.',
+                                    func, self._pending)
+                return False
+            self._pending += 1
+            self._counts['submitted'] += 1
+        pool.submit(self._run, func, args, kwargs)
+        return True
+
+    def _get_pool(self):
+        # Called with self._cond held.
+        pid = os.getpid()
+        if self._pool is None or self._pid != pid:
+            if self._pid is None:
+                atexit.register(self.shutdown)
+            else:
+                # Tasks of the parent process don't run in the forked child.
+                self._counts.clear()
+                self._pending = 0
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            self._pid = pid
+        return self._pool
+
+    def _run(self, func, args, kwargs):
+        outcome = 'completed'
+        try:
+            func(*args, **kwargs)
+        except Exception: # pylint: disable=broad-except
+            outcome = 'failed'
+            self.logger.exception('Background task %r failed.', func)
+        finally:
+            with self._cond:
+                self._counts[outcome] += 1
+                self._pending -= 1
+                self._cond.notify_all()
+
+    def stats(self):
+        """Get counts of tasks processed by this executor in the current process.
+
+        :rtype: :py:class:`BackgroundStats`
+        """
+        with self._cond:
+            return BackgroundStats(submitted=self._counts['submitted'],
+                                   completed=self._counts['completed'],
+                                   failed=self._counts['failed'],
+                                   rejected=self._counts['rejected'],
+                                   pending=self._pending)
+
+    def drain(self, timeout=None):
+        """Wait until all pending tasks finish.
+
+        :param timeout: maximum number of seconds to wait, or None to wait indefinitely.
+        :type timeout: float
+        :returns: True if all tasks finished, False if the timeout passed first.
+        :rtype: bool
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def shutdown(self, timeout=None):
+        """Stop accepting new tasks and drain pending ones.
+
+        Registered to run at interpreter's exit once the pool is created.
+
+        :returns: True if all tasks finished within the timeout.
+        :rtype: bool
+        """
+        with self._cond:
+            self._closed = True
+        drained = self.drain(timeout)
+        if not drained:
+            self.logger.warning('%d background tasks still running at shutdown.',
+                                self.stats().pending)
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=drained)
+        return drained
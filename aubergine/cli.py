@@ -0,0 +1,103 @@
+"""Command line interface of aubergine."""
+import argparse
+import random
+import sys
+from aubergine.aubergine import Aubergine
+from aubergine.compiler import compile_app
+from aubergine.loadgen import (HttpTarget, RequestFactory, TestClientTarget, format_report,
+                               run_load)
+from aubergine.profiling import aggregate_profiles
+
+
+def compile_command(args):
+    """Compile specification into an importable Python module."""
+    app = Aubergine.from_file(args.spec)
+    source = compile_app(app, source=args.spec)
+    if args.output == '-':
+        sys.stdout.write(source)
+    else:
+        with open(args.output, 'w') as output:
+            output.write(source)
+    return 0
+
+
+def profile_report_command(args):
+    """Print statistics aggregated from profile dumps, per operation."""
+    profiles = aggregate_profiles(args.directory)
+    if args.operation is not None:
+        profiles = {op_id: profiles[op_id] for op_id in args.operation if op_id in profiles}
+    if not profiles:
+        sys.stderr.write('No profiles found in {}\n'.format(args.directory))
+        return 1
+    for operation_id, (stats, count) in profiles.items():
+        sys.stdout.write('=== {} ({} profiles) ===\n'.format(operation_id, count))
+        stats.stream = sys.stdout
+        stats.strip_dirs().sort_stats(args.sort).print_stats(args.limit)
+    return 0
+
+
+def loadgen_command(args):
+    """Replay requests generated from specification and report latencies."""
+    app = Aubergine.from_file(args.spec)
+    if args.url is None:
+        target = TestClientTarget(app.build_api())
+    else:
+        target = HttpTarget(args.url)
+    factory = RequestFactory.from_app(app, invalid_ratio=args.invalid_ratio,
+                                      rng=random.Random(args.seed))
+    report = run_load(target, factory.stream(), args.rate, count=args.count,
+                      duration=args.duration if args.count is None else None)
+    sys.stdout.write(format_report(report) + '\n')
+    return 0
+
+
+def create_parser():
+    """Create parser of aubergine's command line arguments."""
+    parser = argparse.ArgumentParser(prog='aubergine',
+                                     description='Create REST APIs using API-first approach.')
+    subparsers = parser.add_subparsers(dest='command')
+
+    compile_parser = subparsers.add_parser(
+        'compile', help='generate Python module with API built from specification')
+    compile_parser.add_argument('spec', help='path to the OpenAPI specification file')
+    compile_parser.add_argument('-o', '--output', default='-',
+                                help='path of the module to write, "-" for stdout (default)')
+    compile_parser.set_defaults(func=compile_command)
+
+    report_parser = subparsers.add_parser(
+        'profile-report', help='aggregate profiles of requests per operation')
+    report_parser.add_argument('directory', help='directory to which profiles were dumped')
+    report_parser.add_argument('--operation', action='append',
+                               help='report only on given operationId (can be repeated)')
+    report_parser.add_argument('--sort', default='cumulative',
+                               help='key by which to sort stats (default: cumulative)')
+    report_parser.add_argument('--limit', type=int, default=20,
+                               help='number of functions reported per operation (default: 20)')
+    report_parser.set_defaults(func=profile_report_command)
+
+    loadgen_parser = subparsers.add_parser(
+        'loadgen', help='replay requests generated from specification against the API')
+    loadgen_parser.add_argument('spec', help='path to the OpenAPI specification file')
+    loadgen_parser.add_argument('--url', help='URL of a running server, if not given the API '
+                                              'is built and called in-process')
+    loadgen_parser.add_argument('--rate', type=float, default=50.0,
+                                help='requests per second (default: 50)')
+    loadgen_parser.add_argument('--duration', type=float, default=10.0,
+                                help='seconds to run for (default: 10)')
+    loadgen_parser.add_argument('--count', type=int,
+                                help='number of requests to send, overrides --duration')
+    loadgen_parser.add_argument('--invalid-ratio', type=float, default=0.0,
+                                help='fraction of deliberately invalid requests (default: 0)')
+    loadgen_parser.add_argument('--seed', type=int, help='seed of the random generator')
+    loadgen_parser.set_defaults(func=loadgen_command)
+    return parser
+
+
+def main(argv=None):
+    """Entry point of aubergine command."""
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    return args.func(args)
@@ -1,5 +1,8 @@
-"""Common classes used in aubergine."""
+"""Common classes and functions used in aubergine."""
+from collections.abc import Mapping, Sequence
 import logging
+import sys
+import types
 
 
 class Loggable:
@@ -8,6 +11,8 @@ class Loggable:
     This base class was extracted in case we switch to another logging framework at some
     point.
     """
+    __slots__ = ()
+
     @property
     def logger_name(self):
         """Logger name of this loggable object."""
@@ -17,3 +22,57 @@ class Loggable:
     def logger(self):
         """Get logger used by this class."""
         return logging.getLogger(self.logger_name)
+
+
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                 types.MethodType)
+
+
+def join_route(base_path, path):
+    """Join base path of the application with path of the operation into a route."""
+    return '/'.join((base_path.rstrip('/'), path.strip('/')))
+
+
+def to_plain(value):
+    """Convert mappings and sequences (e.g. proxies created by ymlref) into dicts and lists."""
+    if isinstance(value, Mapping):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, Sequence) and not isinstance(value, str):
+        return [to_plain(item) for item in value]
+    return value
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate number of bytes occupied by given object and everything it references.
+
+    Containers, instance dictionaries and slots are followed, while classes, modules and
+    functions are considered shared and are not counted.
+
+    :param obj: object to measure.
+    :param seen: set of ids of objects that were already counted. Passing the same set
+     to several calls makes objects shared between measured objects counted only once.
+    :type seen: set
+    :returns: size in bytes.
+    :rtype: int
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SHARED_TYPES):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        if hasattr(current, '__dict__') and not isinstance(current, type):
+            stack.append(vars(current))
+        for cls in type(current).__mro__:
+            for slot in cls.__dict__.get('__slots__', ()):
+                if slot not in ('__dict__', '__weakref__') and hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+    return total
@@ -0,0 +1,622 @@
+"""Ahead-of-time compilation of aubergine apps into plain Python modules.
+
+The generated module contains one handler function per operation, validators specialized
+for every schema used by operations and a route table. Importing it gives an API equivalent
+to the one obtained from :py:meth:`aubergine.Aubergine.build_api`, without building any
+extractors or schemas at startup. Results of operations are serialized in the same way
+as by :py:class:`aubergine.handlers.RequestHandler`, and values of schemas using
+`x-aubergine-record` extension are materialized into records. Schemas using
+`x-aubergine-packed` extension are loaded by :py:class:`aubergine.packed.PackedSchema`.
+Paths which don't declare HEAD and OPTIONS operations get handlers of these methods derived
+as by :py:func:`aubergine.derived.derive_handlers`. Limits declared in `x-aubergine-limits`
+extension are enforced by :py:class:`aubergine.admission.AdmissionController`, and timeouts
+declared in `x-aubergine-timeout` extension by :py:class:`aubergine.deadlines.DeadlinePolicy`
+(compiled modules don't read deadlines sent by clients). Coroutines returned by operations
+are run as by :py:func:`aubergine.deadlines.run_coroutine`. Parameters and bodies of
+operations using `x-aubergine-memoize` extension are loaded through
+:py:class:`aubergine.extractors.ValidationCache`, one per parameter and body. Operations
+declaring resources or security requirements can't be compiled, as compiled modules can
+neither inject resources nor authenticate requests.
+"""
+from aubergine.admission import AdmissionController
+from aubergine.common import to_plain
+from aubergine.deadlines import DeadlinePolicy
+from aubergine.derived import HEAD_SPEC_KEY
+from aubergine.extractors import (ExtractorBuilder, UnsupportedContentTypeError,
+                                  ValidationCache)
+from aubergine.hooks import declared_hooks
+from aubergine.packed import PackedSchema, is_packed
+from aubergine.records import RecordFactory
+from aubergine.resources import ResourceRegistry
+from aubergine.security import Authenticator
+
+
+PRELUDE = '''\
+"""Module generated by `aubergine compile` from {source}. Do not edit."""
+# pylint: skip-file
+import asyncio
+from collections.abc import Mapping
+import copy
+import json
+import logging
+import falcon
+from aubergine.admission import AdmissionController
+from aubergine.cors import CorsHandler, OptionsHandler
+from aubergine.deadlines import DeadlinePolicy, deadline_scope, run_coroutine
+from aubergine.decoders import DecodingError
+from aubergine.extractors import Location, MissingValueError, ValidationCache, ValidationError
+from aubergine.handlers import WARMUP_STATE, encode_result
+from aubergine.packed import PackedSchema
+from aubergine.records import RecordFactory
+from aubergine.resources import ResourceRegistry
+from aubergine.security import Authenticator
+from aubergine.responses import RawResponse
+{imports}
+
+LOGGER = logging.getLogger('aubergine.request_handler')
+
+_RECORDS = RecordFactory()
+
+
+class _Invalid(Exception):
+    def __init__(self, errors):
+        super(_Invalid, self).__init__(errors)
+        self.errors = errors
+
+
+def _decode_json(content):
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError as err:
+        LOGGER.exception('Decoding failed.')
+        raise DecodingError(err.msg)
+
+
+def _is_collection(value):
+    return (hasattr(value, '__iter__') and not isinstance(value, (str, bytes))
+            and not isinstance(value, Mapping))
+
+
+def _null(allow_none):
+    if allow_none:
+        return None
+    raise _Invalid(['Field may not be null.'])
+
+
+def _string(value, allow_none):
+    if value is None:
+        return _null(allow_none)
+    if isinstance(value, str):
+        return value
+    if not isinstance(value, bytes):
+        raise _Invalid(['Not a valid string.'])
+    try:
+        return value.decode('utf-8')
+    except UnicodeDecodeError:
+        raise _Invalid(['Not a valid utf-8 string.'])
+
+
+def _integer(value, allow_none):
+    if value is None:
+        return _null(allow_none)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise _Invalid(['Not a valid integer.'])
+    except OverflowError:
+        raise _Invalid(['Number too large.'])
+
+
+def _number(value, allow_none):
+    if value is None:
+        return _null(allow_none)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise _Invalid(['Not a valid number.'])
+    except OverflowError:
+        raise _Invalid(['Number too large.'])
+
+
+def _resource(name, responders):
+    attrs = {{'on_' + meth.lower(): staticmethod(func) for meth, func in responders.items()}}
+    return type(name, tuple(), attrs)()
+'''
+
+EPILOGUE = '''
+
+def create_api(api_factory=falcon.API, cors=None):
+    """Create API with all routes of the compiled specification.
+
+    OPTIONS requests to paths not declaring them are answered with Allow header and, if
+    `cors` (a :py:class:`aubergine.cors.CorsSettings` instance) is given, CORS headers,
+    which are then added to responses to other methods too.
+    """
+    api = api_factory()
+    for route, path, responders in ROUTES:
+        if cors is not None:
+            responders = {
+                meth: func if meth == 'OPTIONS' else CorsHandler(path, func, cors).handle_request
+                for meth, func in responders.items()}
+        if 'OPTIONS' not in responders:
+            options = OptionsHandler(path, responders, cors)
+            responders = dict(responders, OPTIONS=options.handle_request)
+        api.add_route(route, _resource('Resource<{}>'.format(path), responders))
+    return api
+
+
+api = create_api()
+'''
+
+PRIMITIVES = {'string': '_string', 'integer': '_integer', 'number': '_number'}
+
+
+class _Writer:
+    """Simple helper accumulating indented lines of code."""
+
+    def __init__(self):
+        self.lines = []
+
+    def emit(self, indent, line=''):
+        """Append line indented by given number of levels."""
+        self.lines.append('    ' * indent + line if line else '')
+
+    def source(self):
+        """Get code accumulated so far."""
+        return '\n'.join(self.lines) + '\n'
+
+
+class ModuleCompiler:
+    """Compiler translating specification into source of a Python module.
+
+    :param spec_dict: mapping defining OpenAPI specification.
+    :type spec_dict: Mapping
+    :param base_path: base path of the application.
+    :type base_path: str
+    """
+
+    def __init__(self, spec_dict, base_path):
+        self.spec_dict = spec_dict
+        self.base_path = base_path
+        self.writer = _Writer()
+        self.imports = []
+        self.handler_names = set()
+        self.counter = 0
+        self.records = RecordFactory()
+        self.admissions = {}
+        self.deadline_policies = {}
+        self.caches = {}
+
+    def _next_name(self, prefix):
+        self.counter += 1
+        return '{}_{}'.format(prefix, self.counter)
+
+    def compile(self, source='specification'):
+        """Compile specification into module's source code.
+
+        :param source: description of the spec's origin, used in module's docstring.
+        :type source: str
+        :returns: source code of the module.
+        :rtype: str
+        """
+        routes = []
+        for path, path_spec in self.spec_dict['paths'].items():
+            responders = {meth.upper(): self.compile_operation(op_spec)
+                          for meth, op_spec in path_spec.items()}
+            if 'GET' in responders and 'HEAD' not in responders:
+                responders['HEAD'] = self.compile_operation(path_spec['get'], head=True)
+            routes.append(('/'.join((self.base_path.rstrip('/'), path.strip('/'))), path,
+                           responders))
+        writer = self.writer
+        writer.emit(0)
+        writer.emit(0, 'ROUTES = (')
+        for route, path, responders in routes:
+            items = ', '.join('{!r}: {}'.format(meth, func) for meth, func in responders.items())
+            writer.emit(1, '({!r}, {!r}, {{{}}}),'.format(route, path, items))
+        writer.emit(0, ')')
+        prelude = PRELUDE.format(source=source, imports='\n'.join(self.imports))
+        return prelude + writer.source() + EPILOGUE
+
+    def compile_schema(self, spec):
+        """Compile top level schema into a loader function.
+
+        The loader mimics `load` of the schema built by :py:class:`nadia.api.SchemaBuilder`,
+        i.e. it returns validated value or raises
+        :py:class:`aubergine.extractors.ValidationError` with errors keyed by 'content'.
+        Validated values of schemas using records are materialized by the loader.
+
+        :returns: name of the generated function.
+        :rtype: str
+        :raises ValueError: if the schema is packed but can't be checked in bulk.
+        """
+        if is_packed(spec):
+            return self._compile_packed(spec)
+        validator = self.compile_field(spec, spec.get('type', 'object'))
+        writer = self.writer
+        if self.records.materializer(spec) is not None:
+            materializer = self._next_name('_materialize')
+            writer.emit(0)
+            writer.emit(0)
+            writer.emit(0, '{} = _RECORDS.materializer({!r})'.format(materializer,
+                                                                   to_plain(spec)))
+            validator = '{}({})'.format(materializer, validator)
+        name = self._next_name('_load')
+        writer.emit(0)
+        writer.emit(0)
+        writer.emit(0, 'def {}(content):'.format(name))
+        writer.emit(1, 'try:')
+        writer.emit(2, 'return {}'.format(validator.format('content')))
+        writer.emit(1, 'except _Invalid as err:')
+        writer.emit(2, "raise ValidationError({'content': err.errors})")
+        return name
+
+    def _compile_packed(self, spec):
+        # Fail at compile time rather than when the generated module is imported.
+        PackedSchema.from_spec(spec)
+        schema = self._next_name('_packed')
+        name = self._next_name('_load')
+        writer = self.writer
+        writer.emit(0)
+        writer.emit(0)
+        writer.emit(0, '{} = PackedSchema.from_spec({!r})'.format(schema, to_plain(spec)))
+        writer.emit(0)
+        writer.emit(0)
+        writer.emit(0, 'def {}(content):'.format(name))
+        writer.emit(1, "data, errors = {}.load({{'content': content}})".format(schema))
+        writer.emit(1, 'if errors:')
+        writer.emit(2, 'raise ValidationError(errors)')
+        writer.emit(1, "return data['content']")
+        return name
+
+    def compile_default(self, loader, default):
+        """Compile default value, loaded with given loader once, at module's import.
+
+        :returns: expression evaluating to the default, copied if it's mutable.
+        :rtype: str
+        """
+        # Specs loaded by ymlref contain proxies, whose repr is not a valid literal.
+        default = to_plain(default)
+        name = self._next_name('_default')
+        writer = self.writer
+        writer.emit(0)
+        writer.emit(0)
+        writer.emit(0, '{} = {}({!r})'.format(name, loader, default))
+        if isinstance(default, (list, dict)):
+            return 'copy.deepcopy({})'.format(name)
+        return name
+
+    def compile_field(self, spec, typename):
+        """Compile validation of a single field.
+
+        :returns: format string with a single placeholder for the validated expression.
+        :rtype: str
+        """
+        allow_none = bool(spec.get('nullable', False))
+        if typename in PRIMITIVES:
+            return '{}({{}}, {})'.format(PRIMITIVES[typename], allow_none)
+        if typename == 'array':
+            return self._compile_array(spec, allow_none) + '({})'
+        if typename == 'object':
+            return self._compile_object(spec, allow_none) + '({})'
+        raise ValueError('Unknown type: {}'.format(typename))
+
+    def _compile_array(self, spec, allow_none):
+        item_spec = spec['items']
+        item = self.compile_field(item_spec, item_spec['type'])
+        name = self._next_name('_array')
+        writer = self.writer
+        writer.emit(0)
+        writer.emit(0)
+        writer.emit(0, 'def {}(value):'.format(name))
+        writer.emit(1, 'if value is None:')
+        writer.emit(2, 'return _null({})'.format(allow_none))
+        writer.emit(1, 'if not _is_collection(value):')
+        writer.emit(2, "raise _Invalid(['Not a valid list.'])")
+        writer.emit(1, 'result = []')
+        writer.emit(1, 'errors = {}')
+        writer.emit(1, 'for idx, item in enumerate(value):')
+        writer.emit(2, 'try:')
+        writer.emit(3, 'result.append({})'.format(item.format('item')))
+        writer.emit(2, 'except _Invalid as err:')
+        writer.emit(3, 'errors[idx] = err.errors')
+        writer.emit(1, 'if errors:')
+        writer.emit(2, 'raise _Invalid(errors)')
+        writer.emit(1, 'return result')
+        return name
+
+    def _compile_object(self, spec, allow_none):
+        properties = spec['properties']
+        required = set(spec.get('required', []))
+        props = [(prop, self.compile_field(prop_spec, prop_spec['type']))
+                 for prop, prop_spec in properties.items()]
+        name = self._next_name('_object')
+        writer = self.writer
+        writer.emit(0)
+        writer.emit(0)
+        writer.emit(0, 'def {}(value):'.format(name))
+        writer.emit(1, 'if value is None:')
+        writer.emit(2, 'return _null({})'.format(allow_none))
+        writer.emit(1, 'if not isinstance(value, Mapping):')
+        writer.emit(2, "raise _Invalid({'_schema': ['Invalid input type.']})")
+        writer.emit(1, 'result = {}')
+        writer.emit(1, 'errors = {}')
+        for prop, validator in props:
+            writer.emit(1, 'if {!r} in value:'.format(prop))
+            writer.emit(2, 'try:')
+            writer.emit(3, 'result[{!r}] = {}'.format(
+                prop, validator.format('value[{!r}]'.format(prop))))
+            writer.emit(2, 'except _Invalid as err:')
+            writer.emit(3, 'errors[{!r}] = err.errors'.format(prop))
+            if prop in required:
+                writer.emit(1, 'else:')
+                writer.emit(2, "errors[{!r}] = ['Missing data for required field.']".format(prop))
+        writer.emit(1, 'for unknown in set(value).difference({!r}):'.format(
+            tuple(sorted(properties))))
+        writer.emit(2, "errors.setdefault(unknown, []).append('Unknown field')")
+        writer.emit(1, 'if errors:')
+        writer.emit(2, 'raise _Invalid(errors)')
+        writer.emit(1, 'return result')
+        return name
+
+    def _decoder(self, content):
+        content_type = next(iter(content))
+        if content_type not in ExtractorBuilder.CONTENT_DECODER_MAP:
+            raise UnsupportedContentTypeError(content_type)
+        return content_type, '_decode_json({})'
+
+    def _import_operation(self, op_id):
+        dot_idx = op_id.rfind('.')
+        if dot_idx == -1:
+            raise ValueError(op_id)
+        alias = self._next_name('_op')
+        self.imports.append('from {} import {} as {}'.format(op_id[:dot_idx],
+                                                            op_id[dot_idx+1:], alias))
+        return alias
+
+    def compile_operation(self, op_spec, head=False):
+        """Compile handler for a single operation.
+
+        :param head: whether to compile handler of HEAD requests derived from GET operation,
+         which calls the operation named in its `x-aubergine-head` extension, if any, and
+         doesn't serialize results.
+        :type head: bool
+        :returns: name of the generated function.
+        :rtype: str
+        :raises ValueError: if the operation declares resources or security requirements.
+        """
+        op_id = op_spec['operationId']
+        if op_spec.get(ResourceRegistry.SPEC_KEY):
+            raise ValueError('Operation {} declares resources, which compiled modules cannot '
+                             'inject.'.format(op_id))
+        requirements = op_spec.get(Authenticator.SPEC_KEY,
+                                   self.spec_dict.get(Authenticator.SPEC_KEY))
+        # Requirements consisting only of empty ones make authentication optional.
+        if requirements and any(requirements):
+            raise ValueError('Operation {} declares security requirements, which compiled '
+                             'modules do not enforce.'.format(op_id))
+        if head:
+            operation = self._import_operation(op_spec.get(HEAD_SPEC_KEY, op_id))
+        else:
+            operation = self._import_operation(op_id)
+        hooks = [self._import_operation(hook) for hook in declared_hooks(op_spec)]
+        params = []
+        for param in op_spec.get('parameters', tuple()):
+            if 'content' in param:
+                content_type, decode = self._decoder(param['content'])
+                schema_spec = param['content'][content_type]
+            else:
+                decode = '{}'
+                schema_spec = param['schema']
+            loader = self.compile_schema(schema_spec)
+            default = None
+            if 'default' in schema_spec and not param.get('required', False):
+                default = self.compile_default(loader, schema_spec['default'])
+            load = self.compile_cache(op_spec, param['name'], loader, decode)
+            params.append((param, load, default, is_packed(schema_spec)))
+        body = None
+        if 'requestBody' in op_spec:
+            content = op_spec['requestBody']['content']
+            content_type, decode = self._decoder(content)
+            loader = self.compile_schema(content[content_type]['schema'])
+            body = (op_spec['requestBody'].get('required', False),
+                    self.compile_cache(op_spec, None, loader, decode))
+
+        admission = self.compile_admission(op_spec)
+        deadline_policy = self.compile_deadline_policy(op_spec)
+
+        name = ('head_' if head else 'handle_') + op_id.replace('.', '_')
+        if name in self.handler_names:
+            name = self._next_name(name)
+        self.handler_names.add(name)
+        docstring = '"""{} {}."""'.format('Handle HEAD requests of' if head else 'Handle', op_id)
+        writer = self.writer
+        writer.emit(0)
+        writer.emit(0)
+        if deadline_policy is not None:
+            writer.emit(0, 'def _process_{}(req, resp, kwargs, deadline):'.format(name))
+        elif admission is not None:
+            writer.emit(0, 'def _process_{}(req, resp, kwargs):'.format(name))
+        else:
+            writer.emit(0, 'def {}(req, resp, **kwargs):'.format(name))
+            writer.emit(1, docstring)
+        writer.emit(1, "LOGGER.info('%s %s request received', req.method, req.path)")
+        for hook in hooks:
+            writer.emit(1, '{}(req, resp, kwargs)'.format(hook))
+        writer.emit(1, 'op_kws = {}')
+        if params:
+            writer.emit(1, 'try:')
+            for param, load, default, packed in params:
+                self._emit_param(param, load, default, packed)
+            writer.emit(1, 'except ValidationError as exc:')
+            writer.emit(2, 'raise falcon.HTTPBadRequest(*exc.errors)')
+            writer.emit(1, 'except MissingValueError as exc:')
+            writer.emit(2, "raise falcon.HTTPBadRequest({'error': 'parameter missing', "
+                        "'name': exc.name,")
+            writer.emit(2, "                             'location': exc.location})")
+        if body is not None:
+            required, load = body
+            writer.emit(1, 'raw = req.bounded_stream.read()')
+            writer.emit(1, 'if raw:')
+            writer.emit(2, "op_kws['body'] = {}".format(load.format('raw')))
+            if required:
+                writer.emit(1, 'else:')
+                writer.emit(2, 'raise MissingValueError(Location.BODY)')
+        if deadline_policy is None:
+            writer.emit(1, 'result = {}(**op_kws)'.format(operation))
+            writer.emit(1, 'if asyncio.iscoroutine(result):')
+            writer.emit(2, 'result = run_coroutine(result)')
+        else:
+            writer.emit(1, '# Time spent on extraction counts against the budget.')
+            writer.emit(1, 'deadline.check()')
+            writer.emit(1, 'with deadline_scope(deadline):')
+            writer.emit(2, 'result = {}(**op_kws)'.format(operation))
+            writer.emit(2, 'if asyncio.iscoroutine(result):')
+            writer.emit(3, 'result = run_coroutine(result, deadline)')
+        writer.emit(1, 'if isinstance(result, RawResponse):')
+        writer.emit(2, 'result.apply(resp)')
+        if not head:
+            writer.emit(1, 'else:')
+            writer.emit(2, 'resp.body = json.dumps(result, default=encode_result)')
+        if admission is not None or deadline_policy is not None:
+            self._emit_wrapper(name, docstring, admission, deadline_policy)
+        return name
+
+    def compile_admission(self, op_spec):
+        """Compile admission controller of given operation, shared with its derived handlers.
+
+        :returns: name of the controller, or None if the operation declares no limits.
+        :rtype: str
+        """
+        limits = op_spec.get(AdmissionController.SPEC_KEY)
+        if not limits:
+            return None
+        op_id = op_spec['operationId']
+        if op_id not in self.admissions:
+            AdmissionController.from_spec(op_spec)
+            name = self.admissions[op_id] = self._next_name('_admission')
+            writer = self.writer
+            writer.emit(0)
+            writer.emit(0)
+            writer.emit(0, '{} = AdmissionController.from_spec({!r})'.format(
+                name, {AdmissionController.SPEC_KEY: to_plain(limits)}))
+        return self.admissions[op_id]
+
+    def compile_deadline_policy(self, op_spec):
+        """Compile deadline policy of given operation, shared with its derived handlers.
+
+        :returns: name of the policy, or None if the operation declares no timeout.
+        :rtype: str
+        :raises ValueError: if the timeout is not positive.
+        """
+        timeout = op_spec.get(DeadlinePolicy.SPEC_KEY)
+        if timeout is None:
+            return None
+        op_id = op_spec['operationId']
+        if op_id not in self.deadline_policies:
+            DeadlinePolicy.from_spec(op_spec)
+            name = self.deadline_policies[op_id] = self._next_name('_deadline_policy')
+            writer = self.writer
+            writer.emit(0)
+            writer.emit(0)
+            writer.emit(0, '{} = DeadlinePolicy.from_spec({!r})'.format(
+                name, {DeadlinePolicy.SPEC_KEY: to_plain(timeout)}))
+        return self.deadline_policies[op_id]
+
+    def compile_cache(self, op_spec, param_name, loader, decode):
+        """Compile loading of a parameter or body through its validation cache, if any.
+
+        Caches are shared with handlers derived from the operation.
+
+        :param param_name: name of the parameter, or None for the body.
+        :type param_name: str
+        :param loader: name of the loader of the parameter's (or body's) schema.
+        :type loader: str
+        :param decode: format string decoding raw value given as its single placeholder.
+        :type decode: str
+        :returns: format string loading raw value given as its single placeholder.
+        :rtype: str
+        """
+        memoize = op_spec.get(ValidationCache.SPEC_KEY)
+        if not memoize:
+            return '{}({})'.format(loader, decode)
+        key = (op_spec['operationId'], param_name)
+        if key not in self.caches:
+            writer = self.writer
+            if decode != '{}':
+                raw_loader = self._next_name('_load_raw')
+                writer.emit(0)
+                writer.emit(0)
+                writer.emit(0, 'def {}(raw):'.format(raw_loader))
+                writer.emit(1, 'return {}({})'.format(loader, decode.format('raw')))
+                loader = raw_loader
+            cache = self._next_name('_cache')
+            writer.emit(0)
+            writer.emit(0)
+            writer.emit(0, '{} = ValidationCache.from_spec({!r})'.format(
+                cache, {ValidationCache.SPEC_KEY: to_plain(memoize)}))
+            self.caches[key] = '{}.load({{}}, {})'.format(cache, loader)
+        return self.caches[key]
+
+    def _emit_wrapper(self, name, docstring, admission, deadline_policy):
+        process = '_process_{}(req, resp, kwargs{})'.format(
+            name, ', deadline' if deadline_policy is not None else '')
+        writer = self.writer
+        writer.emit(0)
+        writer.emit(0)
+        writer.emit(0, 'def {}(req, resp, **kwargs):'.format(name))
+        writer.emit(1, docstring)
+        if deadline_policy is not None:
+            writer.emit(1, 'deadline = {}.deadline_for(req)'.format(deadline_policy))
+            writer.emit(1, 'deadline.check()')
+        if admission is None:
+            writer.emit(1, process)
+            return
+        writer.emit(1, 'if WARMUP_STATE.active:')
+        writer.emit(2, process)
+        writer.emit(2, 'return')
+        writer.emit(1, '# Rejection happens before the body is read or any parameter is validated.')
+        writer.emit(1, '{}.admit()'.format(admission))
+        writer.emit(1, 'try:')
+        writer.emit(2, process)
+        writer.emit(1, 'finally:')
+        writer.emit(2, '{}.release()'.format(admission))
+
+    def _emit_param(self, param, load, default, packed):
+        name = param['name']
+        location = param['in']
+        writer = self.writer
+        if location == 'path':
+            writer.emit(2, 'if {!r} in kwargs:'.format(name))
+            raw = 'kwargs[{!r}]'.format(name)
+        elif location == 'query' and packed:
+            # Packed arrays accept both repeated and comma delimited query parameters.
+            writer.emit(2, 'raw = req.get_param_as_list({!r})'.format(name))
+            writer.emit(2, 'if raw is not None:')
+            raw = "','.join(raw)"
+        else:
+            getter = 'get_param' if location == 'query' else 'get_header'
+            writer.emit(2, 'raw = req.{}({!r})'.format(getter, name))
+            writer.emit(2, 'if raw is not None:')
+            raw = 'raw'
+        writer.emit(3, 'op_kws[{!r}] = {}'.format(name, load.format(raw)))
+        if param.get('required', False):
+            writer.emit(2, 'else:')
+            writer.emit(3, 'raise MissingValueError(Location.{}, {!r})'.format(
+                location.upper(), name))
+        elif default is not None:
+            writer.emit(2, 'else:')
+            writer.emit(3, 'op_kws[{!r}] = {}'.format(name, default))
+
+
+def compile_app(app, source='specification'):
+    """Compile given app into source code of a Python module.
+
+    :param app: application to compile.
+    :type app: :py:class:`aubergine.Aubergine`
+    :param source: description of the spec's origin, used in module's docstring.
+    :type source: str
+    :returns: source code of the module.
+    :rtype: str
+    :raises ValueError: if some operation uses features compiled modules don't support.
+    """
+    return ModuleCompiler(app.spec_dict, app.get_base_path()).compile(source)
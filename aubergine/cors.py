@@ -0,0 +1,125 @@
+"""Responses to OPTIONS requests and CORS preflights, and CORS headers of other responses,
+precomputed per path."""
+import collections
+import falcon
+
+
+CorsSettings = collections.namedtuple(
+    'CorsSettings', ['origins', 'allow_headers', 'expose_headers', 'max_age', 'allow_credentials'])
+CorsSettings.__new__.__defaults__ = ((), (), 600, False)
+CorsSettings.__doc__ = """Application-wide CORS settings.
+
+:param origins: origins allowed to call the API, or '*' for all origins.
+:param allow_headers: request headers which cross-origin requests may carry.
+:param expose_headers: response headers exposed to cross-origin callers.
+:param max_age: number of seconds for which browsers may cache preflight responses.
+:param allow_credentials: whether cross-origin requests may carry credentials.
+"""
+
+
+class OptionsHandler:
+    """Handler of OPTIONS requests to a single path, never calling any operation.
+
+    All headers are computed once, when the handler is created. Plain OPTIONS requests get
+    204 with Allow header. CORS preflights (carrying Origin and Access-Control-Request-Method)
+    from allowed origins additionally get the CORS headers; preflights from other origins
+    get none, so browsers refuse the actual request.
+
+    :param path: path for which the handler is created.
+    :type path: str
+    :param methods: methods allowed for the path (OPTIONS is always added).
+    :type methods: iterable of str
+    :param cors: CORS settings. If None, preflights are answered like plain OPTIONS requests.
+    :type cors: :py:class:`CorsSettings`
+    """
+    __slots__ = ('path', 'allow', 'cors', 'preflight_headers')
+
+    def __init__(self, path, methods, cors=None):
+        self.path = path
+        self.allow = ', '.join(sorted({meth.upper() for meth in methods} | {'OPTIONS'}))
+        self.cors = cors
+        self.preflight_headers = {}
+        if cors is not None:
+            self.preflight_headers['Access-Control-Allow-Methods'] = self.allow
+            self.preflight_headers['Access-Control-Max-Age'] = str(cors.max_age)
+            if cors.allow_headers:
+                self.preflight_headers['Access-Control-Allow-Headers'] = ', '.join(
+                    cors.allow_headers)
+            if cors.allow_credentials:
+                self.preflight_headers['Access-Control-Allow-Credentials'] = 'true'
+
+    def handle_request(self, req, resp, **kwargs): # pylint: disable=unused-argument
+        """Respond to OPTIONS request."""
+        resp.status = falcon.HTTP_204
+        resp.set_header('Allow', self.allow)
+        resp.content_length = 0
+        if self.cors is None or req.get_header('Access-Control-Request-Method') is None:
+            return
+        origin = req.get_header('Origin')
+        allowed_origin = self.allowed_origin(origin)
+        if allowed_origin is None:
+            return
+        resp.set_header('Access-Control-Allow-Origin', allowed_origin)
+        if allowed_origin != '*':
+            resp.set_header('Vary', 'Origin')
+        resp.set_headers(self.preflight_headers)
+
+    def allowed_origin(self, origin):
+        """Get value of Access-Control-Allow-Origin for given origin, or None if not allowed."""
+        return allowed_origin(self.cors, origin)
+
+
+class CorsHandler:
+    """Handler adding CORS headers to responses of another handler, other than OPTIONS.
+
+    Responses to requests from allowed origins get Access-Control-Allow-Origin and, as
+    configured, Access-Control-Expose-Headers and Access-Control-Allow-Credentials, which
+    browsers read from actual responses rather than from preflights. Headers are set before
+    the request is handled, so that error responses carry them too.
+
+    :param path: path for which the handler is created.
+    :type path: str
+    :param handle: callable handling requests, like `handle_request` of request handlers.
+    :type handle: callable
+    :param cors: CORS settings.
+    :type cors: :py:class:`CorsSettings`
+    """
+    __slots__ = ('path', 'handle', 'cors', 'headers')
+
+    def __init__(self, path, handle, cors):
+        self.path = path
+        self.handle = handle
+        self.cors = cors
+        self.headers = {}
+        if cors.expose_headers:
+            self.headers['Access-Control-Expose-Headers'] = ', '.join(cors.expose_headers)
+        if cors.allow_credentials:
+            self.headers['Access-Control-Allow-Credentials'] = 'true'
+
+    def handle_request(self, req, resp, **kwargs):
+        """Set CORS headers of the response and let the wrapped handler process the request."""
+        if self.cors.origins != '*' or self.cors.allow_credentials:
+            # Allow-Origin depends on the origin, so caches have to tell origins apart.
+            resp.append_header('Vary', 'Origin')
+        origin = allowed_origin(self.cors, req.get_header('Origin'))
+        if origin is not None:
+            resp.set_header('Access-Control-Allow-Origin', origin)
+            resp.set_headers(self.headers)
+        self.handle(req, resp, **kwargs)
+
+
+def allowed_origin(cors, origin):
+    """Get value of Access-Control-Allow-Origin for given origin, or None if not allowed.
+
+    :param cors: CORS settings.
+    :type cors: :py:class:`CorsSettings`
+    :param origin: value of request's Origin header, or None if it has none.
+    :type origin: str
+    :rtype: str
+    """
+    if origin is None:
+        return None
+    if cors.origins == '*':
+        # Wildcard can't be used for requests with credentials.
+        return origin if cors.allow_credentials else '*'
+    return origin if origin in cors.origins else None
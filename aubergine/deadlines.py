@@ -0,0 +1,182 @@
+"""Per-request deadlines and time budgets of operations."""
+import asyncio
+from contextlib import contextmanager
+import logging
+import math
+import threading
+import time
+import falcon
+
+
+_LOCAL = threading.local()
+
+
+class Deadline:
+    """Point in time after which the result of a request is no longer useful.
+
+    :param expires: time (as returned by `clock`) at which the deadline passes.
+    :type expires: float
+    :param clock: callable returning current time in seconds since the epoch.
+    :type clock: callable
+    """
+    __slots__ = ('expires', 'clock')
+
+    def __init__(self, expires, clock=time.time):
+        self.expires = expires
+        self.clock = clock
+
+    def remaining(self):
+        """Number of seconds left before the deadline, 0 if it has already passed."""
+        return max(0.0, self.expires - self.clock())
+
+    def expired(self):
+        """Tell whether the deadline has already passed."""
+        return self.clock() >= self.expires
+
+    def check(self):
+        """Make sure the deadline has not passed yet.
+
+        :raises falcon.HTTPGatewayTimeout: if the deadline has already passed.
+        """
+        if self.expired():
+            raise falcon.HTTPGatewayTimeout(description='Request deadline exceeded.')
+
+
+class DeadlinePolicy:
+    """Policy computing deadlines of requests of a single operation.
+
+    Deadline of the request is the earlier of: its arrival time plus operation's timeout,
+    and the time given in request's deadline header (as seconds since the epoch).
+
+    :param timeout: number of seconds the operation is given to process a request, or None.
+    :type timeout: float
+    :param header: name of the header carrying deadline set by the client, or None if
+     such headers should be ignored.
+    :type header: str
+    :param clock: callable returning current time in seconds since the epoch.
+    :type clock: callable
+    """
+    __slots__ = ('timeout', 'header', 'clock')
+
+    SPEC_KEY = 'x-aubergine-timeout'
+
+    def __init__(self, timeout=None, header=None, clock=time.time):
+        self.timeout = timeout
+        self.header = header
+        self.clock = clock
+
+    def deadline_for(self, req):
+        """Compute deadline of given request, which should have just arrived.
+
+        :param req: request object.
+        :type req: :py:class:`falcon.Request`
+        :returns: the request's deadline or None if it has none.
+        :rtype: :py:class:`Deadline` or None
+        :raises falcon.HTTPBadRequest: if the deadline header is malformed.
+        """
+        expires = None
+        if self.timeout is not None:
+            expires = self.clock() + self.timeout
+        raw = req.get_header(self.header) if self.header is not None else None
+        if raw is not None:
+            try:
+                requested = float(raw)
+                if not math.isfinite(requested):
+                    # NaN never expires, hence it would disable the timeout.
+                    raise ValueError(raw)
+            except ValueError:
+                raise falcon.HTTPBadRequest(
+                    'Invalid header value',
+                    'Header {} should contain seconds since the epoch.'.format(self.header))
+            expires = requested if expires is None else min(expires, requested)
+        return None if expires is None else Deadline(expires, self.clock)
+
+    @classmethod
+    def from_spec(cls, op_spec, deadline_header=None):
+        """Create policy for operation described by `op_spec`.
+
+        The timeout is declared in seconds using `x-aubergine-timeout` extension, e.g.::
+
+            x-aubergine-timeout: 2.5
+
+        :param op_spec: operation's specification.
+        :type op_spec: Mapping
+        :param deadline_header: name of the header carrying client's deadline, or None.
+        :type deadline_header: str
+        :returns: policy for the operation or None if its requests have no deadlines.
+        :rtype: :py:class:`DeadlinePolicy` or None
+        :raises ValueError: if the timeout is not a positive, finite number.
+        """
+        timeout = op_spec.get(cls.SPEC_KEY)
+        if timeout is not None:
+            timeout = float(timeout)
+            if not 0 < timeout < math.inf:
+                raise ValueError('Timeout should be positive and finite, got {}.'.format(
+                    timeout))
+        if timeout is None and deadline_header is None:
+            return None
+        return cls(timeout, deadline_header)
+
+
+def current_deadline():
+    """Get deadline of the request processed by the current thread.
+
+    :rtype: :py:class:`Deadline` or None
+    """
+    return getattr(_LOCAL, 'deadline', None)
+
+
+def remaining_budget():
+    """Get number of seconds left for processing the current request.
+
+    Operations can use it to limit time of their downstream calls.
+
+    :returns: remaining seconds or None if the current request has no deadline.
+    :rtype: float
+    """
+    deadline = current_deadline()
+    return None if deadline is None else deadline.remaining()
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """Make given deadline current for the current thread within the block."""
+    previous = current_deadline()
+    _LOCAL.deadline = deadline
+    try:
+        yield
+    finally:
+        _LOCAL.deadline = previous
+
+
+def _event_loop():
+    loop = getattr(_LOCAL, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = _LOCAL.loop = asyncio.new_event_loop()
+    return loop
+
+
+async def _wait_for(coro, timeout):
+    # Awaited inside the running loop, so that wait_for picks it up on its own.
+    return await asyncio.wait_for(coro, timeout)
+
+
+def run_coroutine(coro, deadline=None):
+    """Run coroutine returned by an async operation to completion in this thread's loop.
+
+    If a deadline is given, the coroutine is cancelled when it passes.
+
+    :param coro: the coroutine to run.
+    :param deadline: deadline of the current request, or None.
+    :type deadline: :py:class:`Deadline`
+    :returns: the coroutine's result.
+    :raises falcon.HTTPGatewayTimeout: if the coroutine was cancelled.
+    """
+    loop = _event_loop()
+    if deadline is None:
+        return loop.run_until_complete(coro)
+    try:
+        return loop.run_until_complete(_wait_for(coro, deadline.remaining()))
+    except asyncio.TimeoutError:
+        logging.getLogger('aubergine.deadlines').warning('Operation cancelled after deadline.')
+        raise falcon.HTTPGatewayTimeout(description='Request deadline exceeded.')
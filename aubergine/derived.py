@@ -0,0 +1,51 @@
+"""Handlers of HEAD and OPTIONS requests derived from operations declared in the spec."""
+import copy
+import importlib
+from aubergine.cors import CorsHandler, OptionsHandler
+from aubergine import utils
+
+
+HEAD_SPEC_KEY = 'x-aubergine-head'
+
+
+def derive_handlers(path, handlers, path_spec, import_module=importlib.import_module,
+                    cors=None):
+    """Derive handlers of HEAD and OPTIONS requests for methods not present in the spec.
+
+    HEAD handler is a copy of GET handler that doesn't serialize results of the operation.
+    If GET operation declares `x-aubergine-head` extension (named like operationId), the
+    operation it refers to is called instead, so that responses to HEAD requests can be
+    computed more cheaply. OPTIONS handler responds with Allow and CORS headers precomputed
+    for the path, without calling any operation. If `cors` is given, handlers of all other
+    methods, declared ones included, are wrapped in :py:class:`aubergine.cors.CorsHandler`,
+    adding CORS headers to their responses.
+
+    :param path: path for which handlers are derived.
+    :type path: str
+    :param handlers: map: method (lowercase) -> handler of operations from the spec.
+    :type handlers: Mapping
+    :param path_spec: specification of the path.
+    :type path_spec: Mapping
+    :param import_module: callable used for loading HEAD operations.
+    :type import_module: callable
+    :param cors: CORS settings, or None if cross-origin requests are not supported.
+    :type cors: :py:class:`aubergine.cors.CorsSettings`
+    :returns: map: method (lowercase) -> handler to serve in addition to, or instead of
+     handlers of operations from the spec.
+    :rtype: dict
+    """
+    derived = {}
+    if 'get' in handlers and 'head' not in handlers:
+        head = copy.copy(handlers['get'])
+        head.serialize = False
+        head_name = path_spec['get'].get(HEAD_SPEC_KEY)
+        if head_name is not None:
+            head.operation = utils.resolve_callable(head_name, import_module)
+        derived['head'] = head
+    if cors is not None:
+        for meth, handler in list(handlers.items()) + list(derived.items()):
+            if meth != 'options':
+                derived[meth] = CorsHandler(path, handler.handle_request, cors)
+    if 'options' not in handlers:
+        derived['options'] = OptionsHandler(path, list(handlers) + list(derived), cors)
+    return derived
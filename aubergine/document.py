@@ -0,0 +1,123 @@
+"""Serving the OpenAPI document of the application."""
+import collections
+import gzip
+import hashlib
+import io
+import json
+import falcon
+import yaml
+
+
+Representation = collections.namedtuple('Representation', ['data', 'etag', 'encoding'])
+
+FORMATS = collections.OrderedDict([('json', 'application/json'),
+                                   ('yaml', 'application/x-yaml')])
+
+
+def _etag(data):
+    return '"{}"'.format(hashlib.sha256(data).hexdigest()[:32])
+
+
+def _gzip(data):
+    # Fixed mtime makes compressed bytes (and hence their ETag) identical across workers.
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as gzip_file:
+        gzip_file.write(data)
+    return buffer.getvalue()
+
+
+def serialize(document, fmt):
+    """Serialize OpenAPI document into given format ('json' or 'yaml')."""
+    if fmt == 'json':
+        return json.dumps(document, separators=(',', ':')).encode('utf-8')
+    return yaml.safe_dump(document, default_flow_style=False, allow_unicode=True).encode('utf-8')
+
+
+def accepts_gzip(header):
+    """Tell whether Accept-Encoding header allows gzip-encoded responses."""
+    for item in (header or '').split(','):
+        coding, _, params = item.partition(';')
+        if coding.strip().lower() not in ('gzip', '*'):
+            continue
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def etag_matches(header, etag):
+    """Tell whether If-None-Match header matches given ETag (using weak comparison)."""
+    if header is None:
+        return False
+    if header.strip() == '*':
+        return True
+    tags = (tag.strip() for tag in header.split(','))
+    return etag in (tag[2:] if tag.startswith('W/') else tag for tag in tags)
+
+
+class DocumentResource:
+    """Resource serving OpenAPI document serialized in a single format.
+
+    Both the plain and the gzip-compressed representations, together with their strong
+    ETags, are computed once when the resource is created. Requests with If-None-Match
+    matching the ETag get 304 without a body.
+
+    :param document: the OpenAPI document.
+    :type document: Mapping
+    :param fmt: format of the document, one of :py:data:`FORMATS`.
+    :type fmt: str
+    """
+    __slots__ = ('content_type', 'identity', 'compressed')
+
+    def __init__(self, document, fmt):
+        self.content_type = FORMATS[fmt]
+        data = serialize(document, fmt)
+        self.identity = Representation(data=data, etag=_etag(data), encoding=None)
+        compressed = _gzip(data)
+        self.compressed = Representation(data=compressed, etag=_etag(compressed),
+                                         encoding='gzip')
+
+    def on_get(self, req, resp):
+        """Serve the document."""
+        representation = self._respond(req, resp)
+        if resp.status != falcon.HTTP_304:
+            resp.data = representation.data
+
+    def on_head(self, req, resp):
+        """Serve headers of the document."""
+        representation = self._respond(req, resp)
+        if resp.status != falcon.HTTP_304:
+            resp.content_length = len(representation.data)
+
+    def _respond(self, req, resp):
+        if accepts_gzip(req.get_header('Accept-Encoding')):
+            representation = self.compressed
+        else:
+            representation = self.identity
+        resp.set_header('Vary', 'Accept-Encoding')
+        resp.etag = representation.etag
+        if etag_matches(req.get_header('If-None-Match'), representation.etag):
+            resp.status = falcon.HTTP_304
+            return representation
+        resp.content_type = self.content_type
+        if representation.encoding is not None:
+            resp.set_header('Content-Encoding', representation.encoding)
+        return representation
+
+
+def document_routes(route, document):
+    """Create resources serving the document in every supported format.
+
+    :param route: route of the document, without extension.
+    :type route: str
+    :param document: the OpenAPI document.
+    :type document: Mapping
+    :returns: mapping: route (with extension of the format) -> resource.
+    :rtype: :py:class:`collections.OrderedDict`
+    """
+    return collections.OrderedDict(('{}.{}'.format(route.rstrip('/'), fmt),
+                                    DocumentResource(document, fmt)) for fmt in FORMATS)
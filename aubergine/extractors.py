@@ -1,9 +1,14 @@
 """Extractors for various parts of the request."""
+import array
 import collections
+import copy
 from enum import Enum
 from functools import partial
-from falcon import HTTPBadRequest
+import logging
+import threading
 from aubergine.decoders import PlainDecoder, JSONDecoder
+from aubergine.packed import PackedSchema, is_packed
+from aubergine.records import Record, RecordFactory
 
 
 class Location(Enum):
@@ -16,6 +21,8 @@ class Location(Enum):
 
 ExtractionResult = collections.namedtuple('ExtractionResult', ['present', 'value'])
 
+NOT_PRESENT = ExtractionResult(present=False, value=None)
+
 
 class MissingValueError(ValueError):
     """An error raised when some parameter value was not present in request."""
@@ -34,6 +41,21 @@ class ValidationError(ValueError):
         self.errors = validation_errors
 
 
+class _Missing:
+    """Type of the :py:data:`MISSING` marker."""
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'MISSING'
+
+    def __bool__(self):
+        return False
+
+
+MISSING = _Missing()
+"""Marker returned by readers for values absent from the request."""
+
+
 class Extractor: # pylint: disable=too-few-public-methods
     """Class for extracting parameter (or body) value from the request.
 
@@ -45,13 +67,43 @@ class Extractor: # pylint: disable=too-few-public-methods
     :type required: bool
     :type read_data: callable for reading raw data from request. It should be possible
      to call it as read_data(request, **kwargs), where request is of the type
-     :py:class:`falcon.Request`.
+     :py:class:`falcon.Request`. It should return :py:data:`MISSING` if the value is
+     absent from the request.
+    :param coerce: callable converting decoded value to the type declared in the schema,
+     without validating it. Used only for requests that skip validation. Defaults to identity.
+    :type coerce: callable
+    :param location: location of the extracted value, reported when required one is missing.
+    :type location: :py:class:`Location`
+    :param name: name of the extracted parameter, reported when required one is missing.
+    :type name: str
+    :param default: value used when the (optional) value is absent from the request, already
+     loaded with the schema. If :py:data:`MISSING`, absent values are reported as not present.
+    :param cache: cache of validation results keyed by raw values, or None.
+    :type cache: :py:class:`ValidationCache`
+    :param materialize: callable converting validated (or coerced) values, e.g. into records
+     (see :py:class:`aubergine.records.RecordFactory`), or None.
+    :type materialize: callable
     """
-    def __init__(self, schema, decoder, required, read_data):
+    __slots__ = ('schema', 'decoder', 'read_data', 'required', 'coerce', 'location', 'name',
+                 'absent', 'copy_default', 'cache', 'materialize')
+
+    def __init__(self, schema, decoder, required, read_data, coerce=None, location=None,
+                 name=None, default=MISSING, cache=None, materialize=None):
         self.schema = schema
         self.decoder = decoder
         self.read_data = read_data
         self.required = required
+        self.coerce = coerce if coerce is not None else _identity
+        self.location = location
+        self.name = name
+        if default is MISSING:
+            self.absent = NOT_PRESENT
+        else:
+            self.absent = ExtractionResult(present=True, value=default)
+        # Mutable defaults are copied so that operations can't alter them for other requests.
+        self.copy_default = isinstance(default, (list, dict, Record, array.array))
+        self.cache = cache
+        self.materialize = materialize
 
     def extract(self, req, **kwargs):
         """Extract parameter from request and additional path arguments.
@@ -60,66 +112,259 @@ class Extractor: # pylint: disable=too-few-public-methods
         :type req: :py:class:`falcon.Request`
         :param kwargs: keyword arguments - path parameters as passed by `falcon`.
         :returns: a tuple containing information wheather parameter was present
-         in the request and, if so, its value.
+         in the request (or has a default) and, if so, its value.
         :rtype: :py:class:`ExtractionResult`
         :raises MissingValueError: if parameter was missing from request and the parameter
          is mandatory.
         :raises ValidationError: if parameter was present in the request but failed to validate
          against this extractor's schema.
         """
-        try:
-            raw = self.read_data(req, **kwargs)
-        except MissingValueError as err:
-            if self.required:
-                raise err
-            return ExtractionResult(present=False, value=None)
+        raw = self.read_data(req, **kwargs)
+        if raw is MISSING:
+            return self._absent()
+        if self.cache is not None:
+            return ExtractionResult(present=True, value=self.cache.load(raw, self._load))
+        return ExtractionResult(present=True, value=self._load(raw))
+
+    def _load(self, raw):
         decoded = self.decoder.decode(raw)
         data, errors = self.schema.load({'content': decoded})
         if errors:
             raise ValidationError(errors)
-        return ExtractionResult(present=True, value=data['content'])
+        return self._materialized(data['content'])
+
+    def extract_trusted(self, req, validate, path_params):
+        """Extract parameter from request of trusted caller, coercing it instead of validating.
+
+        :param req: request to extract value from
+        :type req: :py:class:`falcon.Request`
+        :param validate: if True, the value is validated as in :py:meth:`extract`, but
+         validation errors are only logged and the coerced value is returned instead.
+        :type validate: bool
+        :param path_params: path parameters as passed by `falcon`.
+        :type path_params: dict
+        :returns: a tuple containing information wheather parameter was present
+         in the request (or has a default) and, if so, its value.
+        :rtype: :py:class:`ExtractionResult`
+        :raises MissingValueError: if parameter was missing from request and the parameter
+         is mandatory.
+        :raises ValidationError: if value could not be coerced to the declared type.
+        """
+        raw = self.read_data(req, **path_params)
+        if raw is MISSING:
+            return self._absent()
+        decoded = self.decoder.decode(raw)
+        if validate:
+            data, errors = self.schema.load({'content': decoded})
+            if not errors:
+                return ExtractionResult(present=True, value=self._materialized(data['content']))
+            logging.getLogger('aubergine.validation').warning(
+                '%s %s: sampled value failed to validate: %s', req.method, req.path, errors)
+        try:
+            return ExtractionResult(present=True, value=self._materialized(self.coerce(decoded)))
+        except (TypeError, ValueError, AttributeError, OverflowError) as err:
+            raise ValidationError({'content': [str(err)]})
+
+    def _materialized(self, value):
+        return value if self.materialize is None else self.materialize(value)
+
+    def _absent(self):
+        if self.required:
+            raise MissingValueError(self.location, self.name)
+        if self.copy_default:
+            return ExtractionResult(present=True, value=copy.deepcopy(self.absent.value))
+        return self.absent
+
+
+CacheStats = collections.namedtuple('CacheStats', ['hits', 'misses', 'size', 'maxsize'])
+
+
+class ValidationCache:
+    """Bounded LRU cache of results of decoding and validating raw values.
+
+    Both loaded values and validation errors are cached. Values are stored as loaded and
+    copied whenever they are returned, so operations can't alter cached entries.
+
+    :param maxsize: maximum number of cached entries.
+    :type maxsize: int
+    :param max_key_length: raw values longer than this are never cached.
+    :type max_key_length: int
+    """
+    __slots__ = ('maxsize', 'max_key_length', 'hits', 'misses', '_entries', '_lock')
+
+    SPEC_KEY = 'x-aubergine-memoize'
+
+    def __init__(self, maxsize=256, max_key_length=65536):
+        self.maxsize = maxsize
+        self.max_key_length = max_key_length
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, raw, loader):
+        """Get loaded value for given raw value, calling `loader` on cache misses.
+
+        :param raw: raw value read from the request.
+        :type raw: bytes or str
+        :param loader: callable decoding and validating raw value.
+        :type loader: callable
+        :returns: copy of the loaded value.
+        :raises ValidationError: if the value (now or before) failed to validate.
+        """
+        if not isinstance(raw, (bytes, str)) or len(raw) > self.max_key_length:
+            return loader(raw)
+        with self._lock:
+            entry = self._entries.get(raw)
+            if entry is not None:
+                self._entries.move_to_end(raw)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is None:
+            try:
+                entry = (True, loader(raw))
+            except ValidationError as err:
+                entry = (False, err.errors)
+            with self._lock:
+                self._entries[raw] = entry
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        valid, result = entry
+        if not valid:
+            raise ValidationError(copy.deepcopy(result))
+        return _copied(result)
+
+    def stats(self):
+        """Get hit and miss counts and current size of this cache.
+
+        :rtype: :py:class:`CacheStats`
+        """
+        with self._lock:
+            return CacheStats(hits=self.hits, misses=self.misses, size=len(self._entries),
+                              maxsize=self.maxsize)
+
+    @classmethod
+    def from_spec(cls, op_spec):
+        """Create cache for extractors of operation described by `op_spec`.
+
+        Memoization is enabled using `x-aubergine-memoize` extension, e.g.::
+
+            x-aubergine-memoize:
+              size: 1024
+
+        :returns: cache or None if operation's extractors should not memoize results.
+        :rtype: :py:class:`ValidationCache` or None
+        """
+        memoize = op_spec.get(cls.SPEC_KEY)
+        if not memoize:
+            return None
+        if memoize is True:
+            return cls()
+        return cls(maxsize=memoize.get('size', 256),
+                   max_key_length=memoize.get('max-key-length', 65536))
+
+
+_IMMUTABLE_TYPES = (str, bytes, int, float, bool, type(None))
+
+
+def _copied(value):
+    return value if isinstance(value, _IMMUTABLE_TYPES) else copy.deepcopy(value)
+
+
+def load_default(schema, schema_spec):
+    """Load default value declared in given schema, so it doesn't have to be done per request.
+
+    :param schema: schema built from `schema_spec`.
+    :type schema: :py:class:`marshmallow.Schema`
+    :param schema_spec: OpenAPI schema object.
+    :type schema_spec: Mapping
+    :returns: loaded default value or :py:data:`MISSING` if schema declares no default.
+    :raises ValueError: if the default value does not conform to the schema.
+    """
+    if 'default' not in schema_spec:
+        return MISSING
+    data, errors = schema.load({'content': schema_spec['default']})
+    if errors:
+        raise ValueError('Invalid default value {!r}: {}'.format(schema_spec['default'], errors))
+    return data['content']
+
+
+def _identity(value):
+    return value
+
+
+def build_coercer(schema_spec):
+    """Build function converting decoded values to the type described by given schema.
+
+    Only conversions between primitive types are performed, mappings are passed as they
+    are, and nothing is validated.
+
+    :param schema_spec: OpenAPI schema object.
+    :type schema_spec: Mapping
+    :returns: function of a single argument.
+    :rtype: callable
+    """
+    typename = schema_spec.get('type', 'object')
+    if typename in PRIMITIVE_COERCERS:
+        return PRIMITIVE_COERCERS[typename]
+    if typename == 'array':
+        item_coercer = build_coercer(schema_spec.get('items', {}))
+        if item_coercer is not _identity:
+            return lambda value: [item_coercer(item) for item in value]
+    return _identity
+
+
+def _coerce_string(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+PRIMITIVE_COERCERS = {'integer': int, 'number': float, 'string': _coerce_string}
 
 def read_body(req, **_):
     """Read raw data from request body.
 
     This function is designed to be passed as `read_data` to :py:class:`Extractor` initializer.
+    Returns :py:data:`MISSING` if the body is empty.
     """
     result = req.bounded_stream.read()
-    if not result:
-        raise MissingValueError(Location.BODY)
-    return result
+    return result if result else MISSING
 
 def read_header(req, param_name, **_):
     """Read parameter's raw data from request header.
 
     Partial of this function, with fixed `param_name` can be passed to :py:class:`Extractor`
-    initializer.
+    initializer. Returns :py:data:`MISSING` if the header is absent.
     """
-    try:
-        return req.get_header(param_name, required=True)
-    except HTTPBadRequest:
-        raise MissingValueError(Location.HEADER, param_name)
+    value = req.get_header(param_name)
+    return MISSING if value is None else value
 
 def read_query(req, param_name, **_):
     """Read parameter's raw data from request query args.
 
     Partial of this function, with fixed `param_name` can be passed to :py:class:`Extractor`
-    initializer.
+    initializer. Returns :py:data:`MISSING` if the parameter is absent.
     """
-    try:
-        return req.get_param(param_name, required=True)
-    except HTTPBadRequest:
-        raise MissingValueError(Location.QUERY, param_name)
+    value = req.get_param(param_name)
+    return MISSING if value is None else value
+
+def read_query_list(req, param_name, **_):
+    """Read raw data of array parameter from request query args, as a comma separated list.
+
+    Both exploded (``v=1&v=2``) and comma delimited (``v=1,2``) forms are accepted. Partial of
+    this function, with fixed `param_name` can be passed to :py:class:`Extractor` initializer.
+    Returns :py:data:`MISSING` if the parameter is absent.
+    """
+    value = req.get_param_as_list(param_name)
+    return MISSING if value is None else ','.join(value)
 
 def read_path(_req, param_name, **kwargs):
     """Read parameter's raw data from path parameters.
 
     Partial of this function, with fixed `param_name` can be passed to :py:class:`Extractor`
-    initializer.
+    initializer. Returns :py:data:`MISSING` if the parameter is absent.
     """
-    if param_name not in kwargs:
-        raise MissingValueError(Location.PATH, param_name)
-    return kwargs[param_name]
+    return kwargs.get(param_name, MISSING)
 
 
 class UnsupportedContentTypeError(ValueError):
@@ -127,15 +372,67 @@ class UnsupportedContentTypeError(ValueError):
 
 
 class ExtractorBuilder:
-    """Class for building Extractors."""
+    """Class for building Extractors.
+
+    Decoders and readers are stateless, hence a single instance of each decoder and a single
+    reader per parameter location and name is shared by all extractors built by the same
+    builder. Values of schemas using `x-aubergine-record` extension are materialized into
+    records (see :py:class:`aubergine.records.RecordFactory`). Parameters and bodies whose
+    schema uses `x-aubergine-packed` extension are validated in bulk and extracted as packed
+    arrays (see :py:class:`aubergine.packed.PackedSchema`).
+    """
 
     def __init__(self, schema_builder):
         self.schema_builder = schema_builder
+        self.records = RecordFactory()
+        self._decoders = {}
+        self._readers = {}
 
     CONTENT_DECODER_MAP = {'application/json': JSONDecoder}
 
     READER_MAP = {'path': read_path, 'query': read_query, 'header': read_header}
 
+    PACKED_READER_MAP = dict(READER_MAP, query=read_query_list)
+
+    PLAIN_DECODER = PlainDecoder()
+
+    def get_decoder(self, content_type):
+        """Get decoder instance for given content type.
+
+        :raises UnsupportedContentTypeError: if there is no decoder for given content type.
+        """
+        try:
+            return self._decoders[content_type]
+        except KeyError:
+            pass
+        if content_type not in self.CONTENT_DECODER_MAP:
+            raise UnsupportedContentTypeError(content_type)
+        return self._decoders.setdefault(content_type, self.CONTENT_DECODER_MAP[content_type]())
+
+    def get_reader(self, location, name, packed=False):
+        """Get reader of parameter with given location and name.
+
+        If `packed` is True, the reader of query parameters accepts repeated parameters.
+        """
+        key = (location, name, packed)
+        try:
+            return self._readers[key]
+        except KeyError:
+            reader_map = self.PACKED_READER_MAP if packed else self.READER_MAP
+            return self._readers.setdefault(key, partial(reader_map[location], param_name=name))
+
+    def build_schema(self, schema_spec):
+        """Build schema for given spec, packed one if it uses `x-aubergine-packed` extension."""
+        if is_packed(schema_spec):
+            return PackedSchema.from_spec(schema_spec)
+        return self.schema_builder.build(schema_spec)
+
+    def build_coercer(self, schema, schema_spec):
+        """Build function coercing values for given schema, built by :py:meth:`build_schema`."""
+        if isinstance(schema, PackedSchema):
+            return schema.coerce
+        return build_coercer(schema_spec)
+
     def build_param_extractor(self, param_spec):
         """Build extractor for parameter described by given mapping.
 
@@ -146,20 +443,25 @@ class ExtractorBuilder:
         :returns: Extractor that can be used to extract parameters value from the request.
         :rtype: `Extractor`
         """
-        reader = partial(self.READER_MAP[param_spec['in']], param_name=param_spec['name'])
         kwargs = {}
         if 'content' in param_spec:
             content_type = next(iter(param_spec['content'].keys()))
-            if content_type not in self.CONTENT_DECODER_MAP:
-                raise UnsupportedContentTypeError(content_type)
             schema_spec = param_spec['content'][content_type]
-            kwargs['decoder'] = self.CONTENT_DECODER_MAP[content_type]()
-            kwargs['schema'] = self.schema_builder.build(schema_spec)
+            kwargs['decoder'] = self.get_decoder(content_type)
         else:
-            kwargs['decoder'] = PlainDecoder()
-            kwargs['schema'] = self.schema_builder.build(param_spec['schema'])
+            schema_spec = param_spec['schema']
+            kwargs['decoder'] = self.PLAIN_DECODER
+        reader = self.get_reader(param_spec['in'], param_spec['name'], is_packed(schema_spec))
+        kwargs['schema'] = self.build_schema(schema_spec)
+        kwargs['coerce'] = self.build_coercer(kwargs['schema'], schema_spec)
+        kwargs['materialize'] = self.records.materializer(schema_spec)
         kwargs['required'] = param_spec.get('required', False)
-        return Extractor(read_data=reader, **kwargs)
+        if not kwargs['required']:
+            kwargs['default'] = load_default(kwargs['schema'], schema_spec)
+            if kwargs['materialize'] is not None and kwargs['default'] is not MISSING:
+                kwargs['default'] = kwargs['materialize'](kwargs['default'])
+        return Extractor(read_data=reader, location=Location(param_spec['in']),
+                         name=param_spec['name'], **kwargs)
 
     def build_body_extractor(self, body_spec):
         """Build extractor for body as described by given mapping.
@@ -176,13 +478,14 @@ class ExtractorBuilder:
            one of those.
         """
         content_type = next(iter(body_spec['content']))
-
-        if content_type not in self.CONTENT_DECODER_MAP:
-            raise UnsupportedContentTypeError(content_type)
-
-        decoder = self.CONTENT_DECODER_MAP[content_type]()
+        decoder = self.get_decoder(content_type)
+        schema_spec = body_spec['content'][content_type]['schema']
+        schema = self.build_schema(schema_spec)
         return Extractor(
-            schema=self.schema_builder.build(body_spec['content'][content_type]['schema']),
+            schema=schema,
             decoder=decoder,
             required=body_spec.get('required', False),
-            read_data=read_body)
+            read_data=read_body,
+            coerce=self.build_coercer(schema, schema_spec),
+            location=Location.BODY,
+            materialize=self.records.materializer(schema_spec))
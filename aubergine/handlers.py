@@ -1,8 +1,37 @@
 """Request handlers."""
+import array
+import asyncio
 import json
 import logging
+import threading
+import time
 import falcon
+from aubergine.deadlines import deadline_scope, run_coroutine
 from aubergine.extractors import ValidationError, MissingValueError
+from aubergine.metrics import SERVER_ERROR, outcome_for
+from aubergine.packed import encode_packed
+from aubergine.records import encode_record
+from aubergine.responses import RawResponse
+
+
+def encode_result(obj):
+    """Encode records and packed arrays returned by operations, as `default` of `json.dumps`.
+
+    Packed arrays are converted to lists in a single call, which `json` encodes natively.
+    """
+    if isinstance(obj, array.array):
+        return encode_packed(obj)
+    return encode_record(obj)
+
+
+class _WarmupState(threading.local):
+    """Thread-local flag telling whether the current thread sends warm-up requests."""
+    active = False
+
+
+WARMUP_STATE = _WarmupState()
+"""Flag set by :py:class:`aubergine.warmup.Warmup`, making handlers skip admission and
+authentication of requests sent by the warm-up thread."""
 
 
 class RequestHandler:
@@ -14,16 +43,66 @@ class RequestHandler:
     :type operation: callable
     :param body_extractor: an extractor for request body.
     :param params_extractors: a collection of parameter extractors.
+    :param validation_policy: policy relaxing validation for trusted callers. If None,
+     all requests are fully validated.
+    :type validation_policy: :py:class:`aubergine.validation.ValidationPolicy`
+    :param admission: controller admitting or rejecting requests before they are processed.
+     If None, all requests are admitted.
+    :type admission: :py:class:`aubergine.admission.AdmissionController`
+    :param deadline_policy: policy computing deadlines of requests. If None, requests have
+     no deadlines.
+    :type deadline_policy: :py:class:`aubergine.deadlines.DeadlinePolicy`
+    :param profiler: profiler of selected requests. If None, requests are never profiled.
+    :type profiler: :py:class:`aubergine.profiling.RequestProfiler`
+    :param background: executor of tasks scheduled by the operation with
+     :py:func:`aubergine.background.schedule`. If None, operation can't schedule tasks.
+    :type background: :py:class:`aubergine.background.BackgroundExecutor`
+    :param resources: resources passed to the operation as additional keyword arguments.
+    :type resources: :py:class:`aubergine.resources.ResourceBinding`
+    :param hooks: callable invoked with request, response and path parameters before
+     anything is extracted from the request (see :py:func:`aubergine.hooks.chain_hooks`).
+     If None, there are no hooks.
+    :type hooks: callable
+    :param serialize: whether results of the operation are serialized into the response
+     body. Handlers of HEAD requests don't serialize them.
+    :type serialize: bool
+    :param metrics: recorder of durations and outcomes of requests. If None, requests are
+     not recorded.
+    :type metrics: :py:class:`aubergine.metrics.OperationMetrics`
+    :param security: policy authenticating requests before they are admitted, called like
+     hooks. If None, requests are not authenticated.
+    :type security: :py:class:`aubergine.security.SecurityPolicy`
     """
-    def __init__(self, path, operation, body_extractor, params_extractors):
+    __slots__ = ('path', 'operation', 'body_extractor', 'params_extractors', 'validation_policy',
+                 'admission', 'deadline_policy', 'profiler', 'background', 'resources', 'hooks',
+                 'serialize', 'metrics', 'security')
+
+    def __init__(self, path, operation, body_extractor, params_extractors,
+                 validation_policy=None, admission=None, deadline_policy=None, profiler=None,
+                 background=None, resources=None, hooks=None, serialize=True, metrics=None,
+                 security=None):
         self.path = path
         self.operation = operation
         self.body_extractor = body_extractor
         self.params_extractors = params_extractors
+        self.validation_policy = validation_policy
+        self.admission = admission
+        self.deadline_policy = deadline_policy
+        self.profiler = profiler
+        self.background = background
+        self.resources = resources
+        self.hooks = hooks
+        self.serialize = serialize
+        self.metrics = metrics
+        self.security = security
 
     def handle_request(self, req, resp, **kwargs):
         """Process incoming request.
 
+        Results of the operation are serialized to JSON (records, see
+        :py:mod:`aubergine.records`, as objects), unless the operation returns
+        :py:class:`aubergine.responses.RawResponse`, whose content is sent as-is.
+
         :param req: request object.
         :type req: :py:class:`falcon.Request`
         :param resp: response being built.
@@ -31,19 +110,98 @@ class RequestHandler:
         :param kwargs: placeholder for possibly present path parameters.
         :returns: None
         """
+        metrics = self.metrics
+        if metrics is None:
+            self._profile_request(req, resp, kwargs)
+            return
+        start = time.perf_counter()
+        outcome = SERVER_ERROR
+        try:
+            self._profile_request(req, resp, kwargs)
+            outcome = outcome_for(resp.status)
+        except falcon.HTTPError as err:
+            outcome = outcome_for(err.status)
+            raise
+        finally:
+            metrics.record(time.perf_counter() - start, outcome)
+
+    def _profile_request(self, req, resp, kwargs):
+        profiler = self.profiler
+        if profiler is not None and profiler.should_profile(req):
+            profiler.profile(self._handle_request, req, resp, kwargs)
+        else:
+            self._handle_request(req, resp, kwargs)
+
+    def _handle_request(self, req, resp, kwargs):
+        background = self.background
+        if background is None:
+            self._admit_request(req, resp, kwargs)
+            return
+        with background.collect() as tasks:
+            self._admit_request(req, resp, kwargs)
+        # Reached only if the response is ready, tasks of failed requests are discarded.
+        background.submit_all(tasks)
+
+    def _admit_request(self, req, resp, kwargs):
+        # Unauthenticated requests are rejected before they can take admission tokens.
+        if self.security is not None and not WARMUP_STATE.active:
+            self.security(req, resp, kwargs)
+        deadline = None
+        if self.deadline_policy is not None:
+            deadline = self.deadline_policy.deadline_for(req)
+            if deadline is not None:
+                deadline.check()
+        admission = self.admission
+        if admission is None or WARMUP_STATE.active:
+            self._process_request(req, resp, kwargs, deadline)
+            return
+        # Rejection happens before the body is read or any parameter is validated.
+        admission.admit()
+        try:
+            self._process_request(req, resp, kwargs, deadline)
+        finally:
+            admission.release()
+
+    def _process_request(self, req, resp, kwargs, deadline):
         logger = logging.getLogger('aubergine.request_handler')
         logger.info('%s %s request received', req.method, req.path)
-        op_kws = self.get_parameter_dict(req, **kwargs)
+        if self.hooks is not None:
+            self.hooks(req, resp, kwargs)
+        policy = self.validation_policy
+        if policy is not None and policy.trusted_source(req):
+            sample = policy.should_sample()
+        else:
+            sample = None
+        op_kws = self._extract_parameters(req, kwargs, sample)
 
         if self.body_extractor is not None:
-            extraction_result = self.body_extractor.extract(req)
+            extraction_result = self._extract(self.body_extractor, req, {}, sample)
             if extraction_result.present:
                 op_kws['body'] = extraction_result.value
                 logger.debug('%s %s: body present: %s', req.method, req.path, op_kws['body'])
             else:
                 logger.debug('%s %s: body not present in the request.', req.method, req.path)
 
-        resp.body = json.dumps(self.operation(**op_kws))
+        if self.resources is not None:
+            op_kws.update(self.resources.kwargs())
+        if deadline is None:
+            result = self._call_operation(op_kws, None)
+        else:
+            # Time spent on extraction counts against the budget.
+            deadline.check()
+            with deadline_scope(deadline):
+                result = self._call_operation(op_kws, deadline)
+        if isinstance(result, RawResponse):
+            # Pre-encoded content is passed to falcon as-is.
+            result.apply(resp)
+        elif self.serialize:
+            resp.body = json.dumps(result, default=encode_result)
+
+    def _call_operation(self, op_kws, deadline):
+        result = self.operation(**op_kws)
+        if asyncio.iscoroutine(result):
+            return run_coroutine(result, deadline)
+        return result
 
     def get_parameter_dict(self, req, **kwargs):
         """Create a dictionary of parameters from request and (possibly) path parameters.
@@ -54,11 +212,22 @@ class RequestHandler:
         :returns: a mapping of parameter names into the extracted values.
         :rtype: dict
         """
+        return self._extract_parameters(req, kwargs, None)
+
+    @staticmethod
+    def _extract(extractor, req, path_params, sample):
+        # sample is None for fully validated requests, and for trusted ones it tells
+        # whether the request was sampled for (non-rejecting) validation.
+        if sample is None:
+            return extractor.extract(req, **path_params)
+        return extractor.extract_trusted(req, sample, path_params)
+
+    def _extract_parameters(self, req, path_params, sample):
         logger = logging.getLogger('aubergine.request_handler')
         extracted = {}
         try:
             for name, extractor in self.params_extractors.items():
-                present, value = extractor.extract(req, **kwargs)
+                present, value = self._extract(extractor, req, path_params, sample)
                 if present:
                     logger.debug('%s %s: param %s: %s', req.method, req.path, name, value)
                     extracted[name] = value
@@ -0,0 +1,55 @@
+"""Operation-level hooks declared in the specification."""
+
+SPEC_KEY = 'x-aubergine-hooks'
+
+
+def declared_hooks(op_spec):
+    """Get names of hooks declared in operation's `x-aubergine-hooks` extension.
+
+    Hooks are named like operations (module path, dot, attribute) and run in the order
+    they are declared, e.g.::
+
+        x-aubergine-hooks:
+          - myapp.hooks.request_id
+          - myapp.auth.require_user
+
+    :param op_spec: operation's specification.
+    :type op_spec: Mapping
+    :returns: names of hooks, in the order of execution.
+    :rtype: list of str
+    :raises ValueError: if some hook is declared more than once.
+    """
+    names = op_spec.get(SPEC_KEY) or []
+    if isinstance(names, str):
+        names = [names]
+    names = list(names)
+    if len(set(names)) != len(names):
+        raise ValueError('Operation {} declares duplicate hooks: {}.'.format(
+            op_spec.get('operationId'), names))
+    return names
+
+
+def chain_hooks(hooks):
+    """Combine hooks into a single callable invoked by the request handler.
+
+    Every hook is called with the request, the response and the mapping of path parameters,
+    before parameters and body are extracted. Hooks reject requests by raising
+    :py:class:`falcon.HTTPError` and pass data to operations through `req.context`.
+
+    :param hooks: hooks in the order of execution.
+    :type hooks: sequence of callables
+    :returns: callable running all the hooks, the hook itself if there is only one of them,
+     or None if there are no hooks.
+    """
+    hooks = tuple(hooks)
+    if not hooks:
+        return None
+    if len(hooks) == 1:
+        return hooks[0]
+
+    def run_hooks(req, resp, params):
+        for hook in hooks:
+            hook(req, resp, params)
+
+    run_hooks.hooks = hooks
+    return run_hooks
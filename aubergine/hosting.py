@@ -0,0 +1,122 @@
+"""Hosting several aubergine apps in a single process and a single falcon API."""
+import collections
+import json
+import threading
+import falcon
+from nadia.api import SchemaBuilder
+from aubergine.common import Loggable, join_route, to_plain
+from aubergine.extractors import CacheStats, ExtractorBuilder
+
+
+class CachingSchemaBuilder(Loggable):
+    """Schema builder reusing schemas built for structurally equal schema specs.
+
+    Specs are compared by their canonical JSON form, hence the same component used by
+    several operations or several specifications is built only once.
+
+    :param wrapped: the actual schema builder.
+    :type wrapped: :py:class:`nadia.api.SchemaBuilder`
+    """
+
+    def __init__(self, wrapped):
+        self.wrapped = wrapped
+        self.hits = 0
+        self.misses = 0
+        self._schemas = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls):
+        """Create caching builder wrapping the default nadia's schema builder."""
+        return cls(SchemaBuilder.create())
+
+    def build(self, schema_spec):
+        """Build schema for given spec, or return one built earlier for an equal spec."""
+        key = json.dumps(to_plain(schema_spec), sort_keys=True, default=repr)
+        with self._lock:
+            schema = self._schemas.get(key)
+            if schema is not None:
+                self.hits += 1
+                return schema
+            self.misses += 1
+        schema = self.wrapped.build(schema_spec)
+        with self._lock:
+            return self._schemas.setdefault(key, schema)
+
+    def stats(self):
+        """Get statistics of this builder's cache.
+
+        :rtype: :py:class:`aubergine.extractors.CacheStats`
+        """
+        with self._lock:
+            return CacheStats(hits=self.hits, misses=self.misses, size=len(self._schemas),
+                              maxsize=None)
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
+
+
+class Host(Loggable):
+    """Host of several aubergine apps mounted onto a single falcon API under distinct prefixes.
+
+    All mounted apps share a single extractor builder, and hence its schema cache, decoders
+    and parameter readers, while their routes and handlers stay separate.
+
+    :param ex_factory: extractor builder shared by all apps. Defaults to
+     :py:class:`aubergine.extractors.ExtractorBuilder` using :py:class:`CachingSchemaBuilder`.
+    :type ex_factory: :py:class:`aubergine.extractors.ExtractorBuilder`
+    """
+
+    def __init__(self, ex_factory=None):
+        if ex_factory is None:
+            ex_factory = ExtractorBuilder(CachingSchemaBuilder.create())
+        self.ex_factory = ex_factory
+        self.mounts = collections.OrderedDict()
+
+    def mount(self, prefix, app, **kwargs):
+        """Mount app under given prefix.
+
+        :param prefix: path prepended to app's base path, e.g. '/admin'.
+        :type prefix: str
+        :param app: the app to mount.
+        :type app: :py:class:`aubergine.Aubergine`
+        :param kwargs: options passed to app's :py:meth:`aubergine.Aubergine.build_api`,
+         overriding the ones given to :py:meth:`build_api` of the host.
+        :raises ValueError: if some app is already mounted under the same prefix.
+        """
+        prefix = prefix.rstrip('/')
+        if prefix in self.mounts:
+            raise ValueError('Prefix {} is already used.'.format(prefix or '/'))
+        self.mounts[prefix] = (app, kwargs)
+
+    def build_api(self, api_factory=falcon.API, **kwargs):
+        """Build falcon API serving all mounted apps.
+
+        :param api_factory: a callable to obtain API instance from.
+        :type api_factory: callable
+        :param kwargs: options passed to :py:meth:`aubergine.Aubergine.build_api` of every
+         app, except 'ex_factory' and 'prefix', which are set by the host.
+        :returns: an API object
+        :rtype: :py:class:`falcon.API`
+        :raises ValueError: if routes of mounted apps overlap.
+        """
+        self._check_routes()
+        api = api_factory()
+        for prefix, (app, app_kwargs) in self.mounts.items():
+            self.logger.info('Mounting %s under %s', app.spec_dict['info']['title'],
+                             prefix or '/')
+            options = dict(kwargs, **app_kwargs)
+            options.update(ex_factory=self.ex_factory, prefix=prefix)
+            app.build_api(lambda: api, **options)
+        return api
+
+    def _check_routes(self):
+        owners = {}
+        for prefix, (app, _) in self.mounts.items():
+            base_path = prefix + app.get_base_path()
+            for path in app.spec_dict['paths']:
+                route = join_route(base_path, path)
+                if route in owners:
+                    raise ValueError('Route {} is served by both {} and {}.'.format(
+                        route, owners[route], app.spec_dict['info']['title']))
+                owners[route] = app.spec_dict['info']['title']
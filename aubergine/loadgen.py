@@ -0,0 +1,350 @@
+"""Synthetic load generated from OpenAPI specification."""
+import collections
+import http.client
+import json
+import logging
+import random
+import threading
+import time
+from urllib.parse import quote, urlencode, urlparse
+from falcon import testing
+
+
+SyntheticRequest = collections.namedtuple(
+    'SyntheticRequest', ['operation_id', 'method', 'path', 'query_string', 'headers', 'body',
+                         'valid'])
+
+OperationReport = collections.namedtuple('OperationReport',
+                                         ['requests', 'statuses', 'throughput', 'latency'])
+
+LoadReport = collections.namedtuple('LoadReport', ['operations', 'requests', 'duration'])
+
+PERCENTILES = (50, 90, 99, 100)
+
+
+def schema_type(schema):
+    """Get type of values described by given schema, inferring it if it's not declared."""
+    if 'type' in schema:
+        return schema['type']
+    if 'properties' in schema:
+        return 'object'
+    if 'items' in schema:
+        return 'array'
+    return 'string'
+
+
+class SampleGenerator:
+    """Generator of random values valid (or not) against JSON schemas.
+
+    :param rng: source of randomness.
+    :type rng: :py:class:`random.Random`
+    """
+
+    ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else random.Random()
+
+    def valid(self, schema):
+        """Generate value conforming to given schema."""
+        if 'enum' in schema:
+            return self.rng.choice(list(schema['enum']))
+        return getattr(self, '_valid_' + schema_type(schema))(schema)
+
+    def invalid(self, schema):
+        """Generate value violating given schema, or None if it's impossible to do so."""
+        kind = schema_type(schema)
+        if 'enum' in schema:
+            return '~' + ''.join(str(value) for value in schema['enum'])
+        if kind in ('integer', 'number', 'boolean'):
+            return 'not-a-' + kind
+        if kind == 'string':
+            if 'maxLength' in schema:
+                return 'x' * (schema['maxLength'] + 1)
+            return None
+        if kind == 'object':
+            required = list(schema.get('required', ()))
+            if required:
+                value = self.valid(schema)
+                value.pop(self.rng.choice(required), None)
+                return value
+        return 'not-an-' + kind
+
+    def _valid_string(self, schema):
+        low = schema.get('minLength', 1)
+        high = schema.get('maxLength', max(low, 12))
+        return ''.join(self.rng.choice(self.ALPHABET)
+                       for _ in range(self.rng.randint(low, max(low, high))))
+
+    def _valid_integer(self, schema):
+        low = schema.get('minimum', 0)
+        return self.rng.randint(low, schema.get('maximum', low + 1000))
+
+    def _valid_number(self, schema):
+        low = schema.get('minimum', 0.0)
+        return self.rng.uniform(low, schema.get('maximum', low + 1000.0))
+
+    def _valid_boolean(self, _schema):
+        return self.rng.random() < 0.5
+
+    def _valid_array(self, schema):
+        low = schema.get('minItems', 0)
+        high = schema.get('maxItems', low + 3)
+        return [self.valid(schema.get('items', {})) for _ in range(self.rng.randint(low, high))]
+
+    def _valid_object(self, schema):
+        required = set(schema.get('required', ()))
+        return {name: self.valid(prop_schema)
+                for name, prop_schema in schema.get('properties', {}).items()
+                if name in required or self.rng.random() < 0.5}
+
+
+def _to_text(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, list):
+        return ','.join(_to_text(item) for item in value)
+    return str(value)
+
+
+class RequestFactory:
+    """Factory of requests to operations of an API, generated from its specification.
+
+    :param spec_dict: mapping defining OpenAPI specification.
+    :type spec_dict: Mapping
+    :param base_path: base path of the API, prepended to every path.
+    :type base_path: str
+    :param invalid_ratio: fraction of generated requests deliberately made invalid.
+    :type invalid_ratio: float
+    :param rng: source of randomness.
+    :type rng: :py:class:`random.Random`
+    """
+
+    def __init__(self, spec_dict, base_path='', invalid_ratio=0.0, rng=None):
+        self.base_path = base_path.rstrip('/')
+        self.invalid_ratio = invalid_ratio
+        self.rng = rng if rng is not None else random.Random()
+        self.samples = SampleGenerator(self.rng)
+        self.operations = [(op_spec['operationId'], meth.upper(), path, op_spec)
+                           for path, path_spec in spec_dict['paths'].items()
+                           for meth, op_spec in path_spec.items()]
+
+    @classmethod
+    def from_app(cls, app, **kwargs):
+        """Create factory for given :py:class:`aubergine.Aubergine` app."""
+        return cls(app.spec_dict, app.get_base_path(), **kwargs)
+
+    def generate(self, operation, valid=True):
+        """Generate request to given operation.
+
+        Invalid requests have exactly one fault: a malformed parameter, missing required
+        parameter or malformed body. If the operation accepts every request, a valid one
+        is generated instead.
+
+        :param operation: tuple (operationId, method, path, operation's spec), as found
+         in :py:attr:`operations`.
+        :param valid: whether the request should be valid.
+        :type valid: bool
+        :rtype: :py:class:`SyntheticRequest`
+        """
+        op_id, method, path, op_spec = operation
+        values = collections.OrderedDict()
+        faults = []
+        for param in op_spec.get('parameters', ()):
+            schema = self._param_schema(param)
+            if param.get('required', False) or self.rng.random() < 0.5:
+                values[param['name']] = (param, self.samples.valid(schema))
+            if param.get('required', False) and param['in'] != 'path':
+                faults.append(('missing', param))
+            if self.samples.invalid(schema) is not None:
+                faults.append(('param', param))
+        body_spec = op_spec.get('requestBody')
+        body = None
+        if body_spec is not None:
+            content_type, media = next(iter(body_spec['content'].items()))
+            body = self.samples.valid(media.get('schema', {}))
+            if self.samples.invalid(media.get('schema', {})) is not None:
+                faults.append(('body', media.get('schema', {})))
+        if not valid and faults:
+            kind, target = self.rng.choice(faults)
+            if kind == 'missing':
+                values.pop(target['name'], None)
+            elif kind == 'param':
+                values[target['name']] = (target,
+                                          self.samples.invalid(self._param_schema(target)))
+            else:
+                body = self.samples.invalid(target)
+        else:
+            valid = True
+        query, headers = [], {}
+        for name, (param, value) in values.items():
+            text = json.dumps(value) if 'content' in param else _to_text(value)
+            if param['in'] == 'path':
+                path = path.replace('{' + name + '}', quote(text, safe=''))
+            elif param['in'] == 'query':
+                query.append((name, text))
+            elif param['in'] == 'header':
+                headers[name] = text
+        if body is not None:
+            headers['Content-Type'] = content_type
+            body = json.dumps(body)
+        return SyntheticRequest(operation_id=op_id, method=method, path=self.base_path + path,
+                                query_string=urlencode(query), headers=headers, body=body,
+                                valid=valid)
+
+    def stream(self):
+        """Generate infinite stream of requests to randomly chosen operations."""
+        while True:
+            operation = self.rng.choice(self.operations)
+            yield self.generate(operation, valid=self.rng.random() >= self.invalid_ratio)
+
+    @staticmethod
+    def _param_schema(param):
+        if 'content' in param:
+            return next(iter(param['content'].values())).get('schema', {})
+        return param.get('schema', {})
+
+
+class TestClientTarget:
+    """Target sending requests to an in-process WSGI app.
+
+    :param api: WSGI application, e.g. created by :py:meth:`aubergine.Aubergine.build_api`.
+    """
+    __test__ = False
+
+    def __init__(self, api):
+        self.client = testing.TestClient(api)
+
+    def send(self, request):
+        """Send request and return status code of the response.
+
+        Unhandled exceptions are reported as 500, as a WSGI server would respond.
+        """
+        try:
+            result = self.client.simulate_request(
+                request.method, request.path, query_string=request.query_string or None,
+                headers=request.headers, body=request.body)
+        except Exception: # pylint: disable=broad-except
+            logging.getLogger('aubergine.loadgen').debug('Unhandled exception in %s',
+                                                         request.operation_id, exc_info=True)
+            return 500
+        return result.status_code
+
+
+class HttpTarget:
+    """Target sending requests to an HTTP server, over one connection per thread.
+
+    :param base_url: URL of the server, e.g. http://localhost:8000.
+    :type base_url: str
+    :param timeout: socket timeout in seconds.
+    :type timeout: float
+    """
+
+    def __init__(self, base_url, timeout=10.0):
+        url = urlparse(base_url)
+        self.host = url.hostname
+        self.port = url.port
+        self.prefix = url.path.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def send(self, request):
+        """Send request and return status code of the response."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port,
+                                                                 timeout=self.timeout)
+        url = self.prefix + request.path
+        if request.query_string:
+            url += '?' + request.query_string
+        try:
+            conn.request(request.method, url, body=request.body, headers=request.headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise
+        return response.status
+
+
+def percentile(sorted_values, pct):
+    """Get nearest-rank percentile of sorted sequence of values."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_load(target, requests, rate, count=None, duration=None, clock=time.perf_counter,
+             sleep=time.sleep):
+    """Replay requests against target at fixed rate and measure their latencies.
+
+    Requests are sent from a single thread on a fixed schedule. Latency is measured from
+    the scheduled send time, so if the target can't keep up, the queueing delay is
+    included instead of silently lowering the rate.
+
+    :param target: object with `send` method accepting :py:class:`SyntheticRequest` and
+     returning status code, e.g. :py:class:`TestClientTarget` or :py:class:`HttpTarget`.
+    :param requests: iterable of requests to send.
+    :param rate: target number of requests per second.
+    :type rate: float
+    :param count: maximum number of requests to send.
+    :type count: int
+    :param duration: maximum number of seconds to send requests for.
+    :type duration: float
+    :rtype: :py:class:`LoadReport`
+    """
+    if rate <= 0:
+        raise ValueError('Rate should be positive, got {}.'.format(rate))
+    if count is None and duration is None:
+        raise ValueError('Either count or duration has to be given.')
+    logger = logging.getLogger('aubergine.loadgen')
+    latencies = collections.defaultdict(list)
+    statuses = collections.defaultdict(collections.Counter)
+    interval = 1.0 / rate
+    start = clock()
+    sent = 0
+    for request in requests:
+        scheduled = start + sent * interval
+        if duration is not None and scheduled - start >= duration:
+            break
+        delay = scheduled - clock()
+        if delay > 0:
+            sleep(delay)
+        try:
+            status = target.send(request)
+        except (OSError, http.client.HTTPException) as exc:
+            logger.warning('Request to %s failed: %s', request.operation_id, exc)
+            status = 'error'
+        latencies[request.operation_id].append(clock() - scheduled)
+        statuses[request.operation_id][status] += 1
+        sent += 1
+        if count is not None and sent >= count:
+            break
+    elapsed = clock() - start
+    operations = collections.OrderedDict()
+    for op_id in sorted(latencies):
+        values = sorted(latencies[op_id])
+        operations[op_id] = OperationReport(
+            requests=len(values), statuses=statuses[op_id],
+            throughput=len(values) / elapsed if elapsed > 0 else float('inf'),
+            latency=collections.OrderedDict((pct, percentile(values, pct))
+                                            for pct in PERCENTILES))
+    return LoadReport(operations=operations, requests=sent, duration=elapsed)
+
+
+def format_report(report):
+    """Get human readable summary of load test."""
+    lines = ['{} requests in {:.2f}s'.format(report.requests, report.duration),
+             '{:<30} {:>8} {:>9} {}  {}'.format(
+                 'operation', 'requests', 'req/s',
+                 ' '.join('{:>9}'.format('p{}'.format(pct)) for pct in PERCENTILES),
+                 'statuses')]
+    for op_id, op_report in report.operations.items():
+        lines.append('{:<30} {:>8} {:>9.1f} {}  {}'.format(
+            op_id, op_report.requests, op_report.throughput,
+            ' '.join('{:>7.2f}ms'.format(op_report.latency[pct] * 1000) for pct in PERCENTILES),
+            ', '.join('{}: {}'.format(status, num)
+                      for status, num in sorted(op_report.statuses.items(), key=str))))
+    return '\n'.join(lines)
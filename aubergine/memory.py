@@ -0,0 +1,54 @@
+"""Reporting memory used by runtime objects of the built app."""
+import collections
+import sys
+from aubergine.common import deep_sizeof
+
+
+MemoryReport = collections.namedtuple('MemoryReport', ['routes', 'components', 'total'])
+
+
+def memory_report(routes):
+    """Estimate memory occupied by handlers and their components, per route and per type.
+
+    Objects shared between routes (e.g. decoders, readers of commonly named parameters)
+    are counted only once, for the first route using them. Operations themselves and
+    classes are not counted.
+
+    :param routes: map: route -> (map: method -> request handler).
+    :type routes: Mapping
+    :returns: bytes used by every route, bytes used by every type of component (handler,
+     extractor, schema, decoder, reader) and the grand total.
+    :rtype: :py:class:`MemoryReport`
+    """
+    seen = set()
+    components = collections.OrderedDict(
+        (name, 0) for name in ('handler', 'extractor', 'schema', 'decoder', 'reader'))
+    per_route = collections.OrderedDict()
+
+    def _count(component, obj, deep=True):
+        if id(obj) in seen:
+            return 0
+        if deep:
+            size = deep_sizeof(obj, seen)
+        else:
+            seen.add(id(obj))
+            size = sys.getsizeof(obj)
+        components[component] += size
+        return size
+
+    for route, handlers in routes.items():
+        size = 0
+        for handler in handlers.values():
+            size += _count('handler', handler, deep=False)
+            extractors = dict(handler.params_extractors)
+            size += _count('handler', handler.params_extractors, deep=False)
+            if handler.body_extractor is not None:
+                extractors['body'] = handler.body_extractor
+            for extractor in extractors.values():
+                size += _count('extractor', extractor, deep=False)
+                size += _count('schema', extractor.schema)
+                size += _count('decoder', extractor.decoder)
+                size += _count('reader', extractor.read_data)
+        per_route[route] = size
+    return MemoryReport(routes=per_route, components=components,
+                        total=sum(per_route.values()))
@@ -0,0 +1,349 @@
+"""Per-operation request metrics shared by all worker processes through a memory-mapped file."""
+import bisect
+import collections
+import contextlib
+import fcntl
+import mmap
+import operator
+import os
+import threading
+import zlib
+from aubergine.common import Loggable
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+OUTCOMES = ('ok', 'client_error', 'server_error')
+OK, CLIENT_ERROR, SERVER_ERROR = range(len(OUTCOMES))
+
+# The file is an array of unsigned 64-bit cells: header, table of operation names and slots
+# of worker processes. Slot 0 accumulates counts of workers which have exited.
+MAGIC = int.from_bytes(b'AUBMETR1', 'little')
+VERSION = 1
+(H_MAGIC, H_VERSION, H_SLOTS, H_MAX_OPERATIONS, H_BUCKETS, H_BUCKETS_CRC,
+ H_OPERATIONS) = range(7)
+HEADER_CELLS = 8
+NAME_SIZE = 128
+SLOT_HEADER_CELLS = 2
+# Cells of a single operation in a slot: one counter per outcome, sum of durations in
+# microseconds and one counter per histogram bucket (the last one for +Inf).
+DURATION = len(OUTCOMES)
+FIRST_BUCKET = DURATION + 1
+
+OperationStats = collections.namedtuple(
+    'OperationStats', ['count', 'outcomes', 'duration_sum', 'buckets'])
+OperationStats.__doc__ = """Statistics of a single operation aggregated across all workers.
+
+:param count: number of handled requests.
+:param outcomes: mapping: outcome ('ok', 'client_error' or 'server_error') -> count.
+:param duration_sum: total time spent handling the requests, in seconds.
+:param buckets: cumulative counts of requests not longer than consecutive bucket bounds,
+ the last one being +Inf (hence equal to `count`).
+"""
+
+
+def outcome_for(status):
+    """Get outcome of request answered with given status line, e.g. '404 Not Found'."""
+    if status.startswith('5'):
+        return SERVER_ERROR
+    if status.startswith('4'):
+        return CLIENT_ERROR
+    return OK
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsStore(Loggable):
+    """Store of per-operation request counters and duration histograms shared by processes.
+
+    Every worker process claims its own slot in the file on its first request and is the only
+    writer of that slot, so updates are plain increments of mapped memory, serialized only
+    between threads of the same process. Operation names and slots are assigned under a
+    file lock, which readers also take to aggregate all slots. Slots of workers that are no
+    longer alive are folded into a common slot when reclaimed, so counters never go back
+    when workers restart.
+
+    Create the store in the master process before forking, or in every worker with the same
+    arguments. Stale files of earlier runs are reused unless `reset` is True, which is only
+    safe before any worker uses the file.
+
+    :param path: path of the file backing the store. It is created if it doesn't exist.
+    :type path: str
+    :param route: route (not prefixed with the base path) under which aggregated metrics
+     are served in Prometheus text format. If None, they aren't served.
+    :type route: str
+    :param slots: maximum number of worker processes alive at the same time.
+    :type slots: int
+    :param max_operations: maximum number of distinct operations recorded.
+    :type max_operations: int
+    :param buckets: upper bounds of duration histogram buckets, in seconds.
+    :type buckets: sequence of float
+    :param reset: if True, contents of an existing file are discarded.
+    :type reset: bool
+    :raises ValueError: if the existing file was created with different geometry.
+    """
+
+    def __init__(self, path, route='/metrics', slots=64, max_operations=256,
+                 buckets=DEFAULT_BUCKETS, reset=False):
+        self.path = path
+        self.route = route
+        self.slots = slots
+        self.max_operations = max_operations
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        self._op_cells = FIRST_BUCKET + len(self.buckets) + 1
+        self._slot_cells = SLOT_HEADER_CELLS + max_operations * self._op_cells
+        self._names_offset = HEADER_CELLS * 8
+        self._slots_start = HEADER_CELLS + max_operations * NAME_SIZE // 8
+        size = (self._slots_start + (slots + 1) * self._slot_cells) * 8
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._pid = None
+        self._base = None
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._locked():
+            if reset:
+                os.ftruncate(self._fd, 0)
+            fresh = os.fstat(self._fd).st_size == 0
+            if fresh:
+                os.ftruncate(self._fd, size)
+            elif os.fstat(self._fd).st_size != size:
+                raise ValueError('Metrics file {} was created with different settings.'
+                                 .format(path))
+            self._mmap = mmap.mmap(self._fd, size)
+            self._cells = memoryview(self._mmap).cast('Q')
+            if fresh:
+                self._write_header()
+            else:
+                self._check_header()
+
+    def _geometry(self):
+        crc = zlib.crc32(repr(self.buckets).encode('ascii'))
+        return {H_MAGIC: MAGIC, H_VERSION: VERSION, H_SLOTS: self.slots,
+                H_MAX_OPERATIONS: self.max_operations, H_BUCKETS: len(self.buckets),
+                H_BUCKETS_CRC: crc}
+
+    def _write_header(self):
+        for cell, value in self._geometry().items():
+            self._cells[cell] = value
+
+    def _check_header(self):
+        if any(self._cells[cell] != value for cell, value in self._geometry().items()):
+            raise ValueError('Metrics file {} was created with different settings.'
+                             .format(self.path))
+
+    @contextlib.contextmanager
+    def _locked(self):
+        # POSIX record locks are held per process, so they exclude forked workers from each
+        # other, while the thread lock excludes threads of a single process.
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def register(self, name):
+        """Get index of operation with given name, registering it if it's not known yet.
+
+        :param name: name of the operation, usually its operationId.
+        :type name: str
+        :rtype: int
+        :raises ValueError: if the name is too long or no more operations can be registered.
+        """
+        encoded = name.encode('utf-8')
+        if not encoded or len(encoded) > NAME_SIZE:
+            raise ValueError('Operation name {!r} cannot be stored in metrics.'.format(name))
+        with self._locked():
+            count = self._cells[H_OPERATIONS]
+            for index in range(count):
+                if self._name(index) == encoded:
+                    return index
+            if count == self.max_operations:
+                raise ValueError('Metrics of at most {} operations can be stored.'.format(
+                    self.max_operations))
+            offset = self._names_offset + count * NAME_SIZE
+            self._mmap[offset:offset + NAME_SIZE] = encoded.ljust(NAME_SIZE, b'\0')
+            self._cells[H_OPERATIONS] = count + 1
+            return count
+
+    def _name(self, index):
+        offset = self._names_offset + index * NAME_SIZE
+        return self._mmap[offset:offset + NAME_SIZE].rstrip(b'\0')
+
+    def bind(self, op_spec):
+        """Get recorder of requests of operation described by `op_spec`.
+
+        :rtype: :py:class:`OperationMetrics`
+        """
+        return OperationMetrics(self, self.register(op_spec['operationId']))
+
+    def record(self, index, duration, outcome):
+        """Record single request of the operation with given index.
+
+        :param index: index of the operation, as returned by :py:meth:`register`.
+        :type index: int
+        :param duration: time spent handling the request, in seconds.
+        :type duration: float
+        :param outcome: one of :py:data:`OK`, :py:data:`CLIENT_ERROR`, :py:data:`SERVER_ERROR`.
+        :type outcome: int
+        """
+        if self._pid != os.getpid():
+            self._claim()
+        base = self._base
+        if base is None:
+            return
+        offset = base + index * self._op_cells
+        bucket = offset + FIRST_BUCKET + bisect.bisect_left(self.buckets, duration)
+        cells = self._cells
+        with self._update_lock:
+            cells[offset + outcome] += 1
+            cells[offset + DURATION] += int(duration * 1000000)
+            cells[bucket] += 1
+
+    def _slot_start(self, slot):
+        return self._slots_start + slot * self._slot_cells
+
+    def _claim(self):
+        with self._locked():
+            pid = os.getpid()
+            if self._pid == pid:
+                return
+            self._pid = pid
+            self._base = None
+            for slot in range(1, self.slots + 1):
+                start = self._slot_start(slot)
+                owner = self._cells[start]
+                if owner and owner != pid and _alive(owner):
+                    continue
+                if owner:
+                    self._retire(start)
+                self._cells[start] = pid
+                self._base = start + SLOT_HEADER_CELLS
+                self.logger.info('Process %d records metrics in slot %d', pid, slot)
+                return
+            self.logger.warning('All %d metrics slots are taken, requests handled by process %d '
+                                'are not recorded.', self.slots, pid)
+
+    def _retire(self, start):
+        cells = self._cells
+        size = cells[H_OPERATIONS] * self._op_cells
+        source = start + SLOT_HEADER_CELLS
+        target = self._slot_start(0) + SLOT_HEADER_CELLS
+        for i in range(size):
+            value = cells[source + i]
+            if value:
+                cells[target + i] += value
+                cells[source + i] = 0
+        cells[start] = 0
+
+    def workers(self):
+        """Get ids of processes which currently own slots."""
+        with self._locked():
+            return [self._cells[self._slot_start(slot)] for slot in range(1, self.slots + 1)
+                    if self._cells[self._slot_start(slot)]]
+
+    def snapshot(self):
+        """Aggregate statistics of all operations across all slots.
+
+        :returns: mapping: operation name -> its statistics, in order of registration.
+        :rtype: :py:class:`collections.OrderedDict`
+        """
+        with self._locked():
+            count = self._cells[H_OPERATIONS]
+            names = [self._name(index).decode('utf-8') for index in range(count)]
+            size = count * self._op_cells
+            totals = [0] * size
+            for slot in range(self.slots + 1):
+                start = self._slot_start(slot)
+                if slot and not self._cells[start]:
+                    continue
+                base = start + SLOT_HEADER_CELLS
+                totals = list(map(operator.add, totals, self._cells[base:base + size]))
+        stats = collections.OrderedDict()
+        for index, name in enumerate(names):
+            cells = totals[index * self._op_cells:(index + 1) * self._op_cells]
+            cumulative = []
+            for value in cells[FIRST_BUCKET:]:
+                cumulative.append(value + (cumulative[-1] if cumulative else 0))
+            stats[name] = OperationStats(
+                count=sum(cells[:DURATION]),
+                outcomes=dict(zip(OUTCOMES, cells[:DURATION])),
+                duration_sum=cells[DURATION] / 1000000,
+                buckets=tuple(cumulative))
+        return stats
+
+    def render(self):
+        """Render aggregated statistics in Prometheus text exposition format.
+
+        :rtype: str
+        """
+        stats = self.snapshot()
+        lines = ['# HELP aubergine_requests_total Requests handled, by operation and outcome.',
+                 '# TYPE aubergine_requests_total counter']
+        for name, op_stats in stats.items():
+            for outcome in OUTCOMES:
+                lines.append('aubergine_requests_total{{operation="{}",outcome="{}"}} {}'.format(
+                    _escape(name), outcome, op_stats.outcomes[outcome]))
+        lines.extend(['# HELP aubergine_request_duration_seconds Time spent handling requests.',
+                      '# TYPE aubergine_request_duration_seconds histogram'])
+        bounds = [repr(bound) for bound in self.buckets] + ['+Inf']
+        for name, op_stats in stats.items():
+            label = 'operation="{}"'.format(_escape(name))
+            for bound, value in zip(bounds, op_stats.buckets):
+                lines.append('aubergine_request_duration_seconds_bucket{{{},le="{}"}} {}'.format(
+                    label, bound, value))
+            lines.append('aubergine_request_duration_seconds_sum{{{}}} {!r}'.format(
+                label, op_stats.duration_sum))
+            lines.append('aubergine_request_duration_seconds_count{{{}}} {}'.format(
+                label, op_stats.count))
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class OperationMetrics:
+    """Recorder of requests of a single operation.
+
+    :param store: store the requests are recorded in.
+    :type store: :py:class:`MetricsStore`
+    :param index: index of the operation in the store.
+    :type index: int
+    """
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def record(self, duration, outcome):
+        """Record single request taking `duration` seconds and ending with given outcome."""
+        self.store.record(self.index, duration, outcome)
+
+
+class MetricsResource:
+    """Resource serving metrics aggregated across all workers.
+
+    :param store: the metrics store.
+    :type store: :py:class:`MetricsStore`
+    """
+    __slots__ = ('store',)
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, store):
+        self.store = store
+
+    def on_get(self, req, resp): # pylint: disable=unused-argument
+        """Serve aggregated metrics."""
+        resp.content_type = self.CONTENT_TYPE
+        resp.body = self.store.render()
@@ -0,0 +1,178 @@
+"""Homogeneous numeric arrays validated in bulk and delivered as :py:class:`array.array`."""
+import array
+import math
+
+
+SPEC_KEY = 'x-aubergine-packed'
+
+TYPECODES = {('integer', None): 'q', ('integer', 'int64'): 'q', ('integer', 'int32'): 'i',
+             ('number', None): 'd', ('number', 'double'): 'd', ('number', 'float'): 'f'}
+
+ARRAY_KEYS = frozenset(['type', 'items', 'minItems', 'maxItems', 'default', 'description',
+                        'title', 'example', SPEC_KEY])
+
+ITEM_KEYS = frozenset(['type', 'format', 'minimum', 'maximum', 'exclusiveMinimum',
+                       'exclusiveMaximum', 'description', 'title', 'example'])
+
+_CONVERTERS = {'q': int, 'i': int, 'd': float, 'f': float}
+
+# Single precision items are parsed and checked as doubles, and narrowed afterwards.
+_WIDE_TYPECODES = {'f': 'd'}
+
+FLOAT32_MAX = 3.4028234663852886e38
+
+
+def is_packed(schema_spec):
+    """Tell whether given schema uses `x-aubergine-packed` extension."""
+    return bool(schema_spec.get(SPEC_KEY))
+
+
+def encode_packed(obj):
+    """Encode packed arrays as JSON arrays, intended as `default` argument of :py:func:`json.dumps`.
+
+    :raises TypeError: if `obj` is not a packed array.
+    """
+    if isinstance(obj, array.array):
+        return obj.tolist()
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(obj).__name__))
+
+
+class PackedSchema:
+    """Schema of a packed numeric array, used by extractors in place of a marshmallow schema.
+
+    Values are converted into :py:class:`array.array` of the item type in a single call and
+    constraints are checked on the whole array, without validating items one by one. Packed
+    arrays support the buffer protocol, so that e.g. `numpy.frombuffer` can wrap them without
+    copying. Values read from query, header or path are comma separated lists. Booleans
+    are not distinguished from 0 and 1. Items of number arrays have to be finite, and those
+    of float arrays are checked before they are narrowed to single precision.
+
+    :param typecode: typecode of the created arrays.
+    :type typecode: str
+    :param min_items: minimum length of the array, or None.
+    :type min_items: int
+    :param max_items: maximum length of the array, or None.
+    :type max_items: int
+    :param minimum: lower bound of the items, or None.
+    :param maximum: upper bound of the items, or None.
+    :param exclusive_minimum: whether items have to be strictly greater than `minimum`.
+    :type exclusive_minimum: bool
+    :param exclusive_maximum: whether items have to be strictly less than `maximum`.
+    :type exclusive_maximum: bool
+    """
+    __slots__ = ('typecode', 'min_items', 'max_items', 'minimum', 'maximum',
+                 'exclusive_minimum', 'exclusive_maximum', '_convert', '_wide_typecode')
+
+    def __init__(self, typecode, min_items=None, max_items=None, minimum=None, maximum=None,
+                 exclusive_minimum=False, exclusive_maximum=False):
+        self.typecode = typecode
+        self.min_items = min_items
+        self.max_items = max_items
+        self.minimum = minimum
+        self.maximum = maximum
+        self.exclusive_minimum = exclusive_minimum
+        self.exclusive_maximum = exclusive_maximum
+        self._convert = _CONVERTERS[typecode]
+        self._wide_typecode = _WIDE_TYPECODES.get(typecode, typecode)
+
+    @classmethod
+    def from_spec(cls, schema_spec):
+        """Create schema for given OpenAPI array schema using `x-aubergine-packed` extension.
+
+        :param schema_spec: OpenAPI schema object.
+        :type schema_spec: Mapping
+        :rtype: :py:class:`PackedSchema`
+        :raises ValueError: if the schema is not an array of integers or numbers, or uses
+         keywords that can't be checked in bulk (e.g. enum or multipleOf).
+        """
+        items = schema_spec.get('items', {})
+        if schema_spec.get('type') != 'array':
+            raise ValueError('Only arrays can be packed, got type {}.'.format(
+                schema_spec.get('type')))
+        key = (items.get('type'), items.get('format'))
+        if key not in TYPECODES:
+            raise ValueError('Items of packed arrays have to be integers or numbers, got {} {}.'
+                             .format(*key))
+        unsupported = sorted(
+            [name for name in schema_spec if name not in ARRAY_KEYS and not name.startswith('x-')]
+            + [name for name in items if name not in ITEM_KEYS and not name.startswith('x-')])
+        if unsupported:
+            raise ValueError('Packed arrays do not support {}.'.format(', '.join(unsupported)))
+        return cls(TYPECODES[key],
+                   min_items=schema_spec.get('minItems'),
+                   max_items=schema_spec.get('maxItems'),
+                   minimum=items.get('minimum'),
+                   maximum=items.get('maximum'),
+                   exclusive_minimum=items.get('exclusiveMinimum', False),
+                   exclusive_maximum=items.get('exclusiveMaximum', False))
+
+    def coerce(self, value):
+        """Convert decoded value into packed array without checking constraints.
+
+        :raises TypeError: if the value is not a list of numbers or a comma separated string.
+        :raises ValueError: if some item is not a number.
+        :raises OverflowError: if some item doesn't fit into the array's item type.
+        """
+        return self._narrow(self._pack(value))
+
+    def load(self, data):
+        """Load value stored under 'content' key, in the same way as marshmallow schemas do.
+
+        :param data: mapping with a single key 'content'.
+        :type data: Mapping
+        :returns: pair of loaded data and errors, exactly one of which is empty.
+        :rtype: tuple
+        """
+        try:
+            packed = self._pack(data['content'])
+        except (TypeError, ValueError, OverflowError) as err:
+            return {}, {'content': ['Not a valid packed array: {}'.format(err)]}
+        errors = self.check(packed)
+        if errors:
+            return {}, {'content': errors}
+        return {'content': self._narrow(packed)}, {}
+
+    def check(self, packed):
+        """Check constraints of the schema on given packed array.
+
+        :param packed: array of the schema's item type, or of doubles for float arrays.
+        :type packed: :py:class:`array.array`
+        :returns: list of error messages, empty if the array is valid.
+        :rtype: list
+        """
+        errors = []
+        if self.min_items is not None and len(packed) < self.min_items:
+            errors.append('Shorter than minimum length {}.'.format(self.min_items))
+        if self.max_items is not None and len(packed) > self.max_items:
+            errors.append('Longer than maximum length {}.'.format(self.max_items))
+        if not packed:
+            return errors
+        if packed.typecode in 'fd' and not all(map(math.isfinite, packed)):
+            # Bounds can't be checked with min and max when there are NaNs.
+            errors.append('Items have to be finite numbers.')
+            return errors
+        lowest, highest = min(packed), max(packed)
+        if self.minimum is not None:
+            if lowest < self.minimum or (self.exclusive_minimum and lowest == self.minimum):
+                errors.append('Item {} is less than minimum {}.'.format(lowest, self.minimum))
+        if self.maximum is not None:
+            if highest > self.maximum or (self.exclusive_maximum and highest == self.maximum):
+                errors.append('Item {} is greater than maximum {}.'.format(highest, self.maximum))
+        if self.typecode == 'f' and max(-lowest, highest) > FLOAT32_MAX:
+            errors.append('Items have to fit into single precision floats.')
+        return errors
+
+    def _pack(self, value):
+        typecode = self._wide_typecode
+        if isinstance(value, str):
+            return array.array(typecode, map(self._convert, value.split(',')) if value else ())
+        if not isinstance(value, list):
+            raise TypeError('Expected a list of numbers, got {}.'.format(type(value).__name__))
+        return array.array(typecode, value)
+
+    def _narrow(self, packed):
+        if packed.typecode == self.typecode:
+            return packed
+        if packed and max(-min(packed), max(packed)) > FLOAT32_MAX:
+            raise OverflowError('Item does not fit into single precision float.')
+        return array.array(self.typecode, packed)
@@ -0,0 +1,153 @@
+"""Profiling of selected requests and aggregating the collected profiles."""
+import collections
+import cProfile
+import hmac
+import logging
+import os
+import pstats
+import random
+import time
+from aubergine.common import Loggable
+
+
+ProfileSettings = collections.namedtuple('ProfileSettings',
+                                         ['directory', 'header', 'token', 'profile_factory'])
+ProfileSettings.__new__.__defaults__ = ('X-Aubergine-Profile', None, cProfile.Profile)
+ProfileSettings.__doc__ = """Application-wide profiling settings.
+
+:param directory: directory to which profiles are dumped.
+:param header: name of the header requesting profiling of the request.
+:param token: secret which the header has to carry for the request to be profiled. If None,
+ profiling can't be requested using the header.
+:param profile_factory: callable creating profilers. They should have enable, disable and
+ dump_stats methods, like :py:class:`cProfile.Profile` which is used by default.
+"""
+
+DUMP_SUFFIX = '.pstats'
+
+
+class RequestProfiler(Loggable):
+    """Profiler of requests of a single operation.
+
+    :param operation_id: operationId of the profiled operation, used for naming dumps.
+    :type operation_id: str
+    :param settings: application-wide profiling settings.
+    :type settings: :py:class:`ProfileSettings`
+    :param rate: fraction of requests profiled regardless of the header.
+    :type rate: float
+    :param sample: callable returning random numbers from [0, 1).
+    :type sample: callable
+    """
+    __slots__ = ('operation_id', 'settings', 'rate', 'sample')
+
+    SPEC_KEY = 'x-aubergine-profile'
+
+    def __init__(self, operation_id, settings, rate=0.0, sample=random.random):
+        self.operation_id = operation_id
+        self.settings = settings
+        self.rate = rate
+        self.sample = sample
+
+    def should_profile(self, req):
+        """Tell whether given request should be profiled.
+
+        :param req: request object.
+        :type req: :py:class:`falcon.Request`
+        :rtype: bool
+        """
+        if self.rate > 0.0 and self.sample() < self.rate:
+            return True
+        token = self.settings.token
+        if token is None:
+            return False
+        value = req.get_header(self.settings.header)
+        # compare_digest refuses str with non-ASCII characters, which clients can send.
+        return value is not None and hmac.compare_digest(value.encode('utf-8'),
+                                                         token.encode('utf-8'))
+
+    def profile(self, func, *args):
+        """Call `func` with given arguments under profiler and dump collected stats.
+
+        If the profiler can't be started, `func` is called without profiling.
+
+        :returns: whatever `func` returns.
+        """
+        try:
+            profiler = self.settings.profile_factory()
+            profiler.enable()
+        except Exception: # pylint: disable=broad-except
+            self.logger.exception('Failed to start profiling %s', self.operation_id)
+            return func(*args)
+        try:
+            return func(*args)
+        finally:
+            profiler.disable()
+            path = os.path.join(self.settings.directory, dump_name(self.operation_id))
+            try:
+                profiler.dump_stats(path)
+                self.logger.info('Profile of %s written to %s', self.operation_id, path)
+            except OSError:
+                self.logger.exception('Failed to write profile of %s', self.operation_id)
+
+    @classmethod
+    def from_spec(cls, op_spec, settings):
+        """Create profiler for operation described by `op_spec`.
+
+        The fraction of profiled requests is declared using `x-aubergine-profile`, e.g.::
+
+            x-aubergine-profile:
+              rate: 0.001
+
+        :param op_spec: operation's specification.
+        :type op_spec: Mapping
+        :param settings: application-wide profiling settings, or None if profiling is off.
+        :type settings: :py:class:`ProfileSettings`
+        :returns: profiler or None if none of operation's requests can be profiled.
+        :rtype: :py:class:`RequestProfiler` or None
+        :raises ValueError: if the rate is not between 0 and 1.
+        """
+        if settings is None:
+            return None
+        rate = float(op_spec.get(cls.SPEC_KEY, {}).get('rate', 0.0))
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError('Profiling rate should be between 0 and 1, got {}.'.format(rate))
+        if rate == 0.0 and settings.token is None:
+            return None
+        return cls(op_spec['operationId'], settings, rate)
+
+
+def dump_name(operation_id, timestamp=None, pid=None):
+    """Construct name of the file to which profile of an operation is dumped."""
+    timestamp = time.time() if timestamp is None else timestamp
+    pid = os.getpid() if pid is None else pid
+    return '{}.{}.{}{}'.format(operation_id, int(timestamp * 1e6), pid, DUMP_SUFFIX)
+
+
+def operation_of(filename):
+    """Extract operationId from the name of a profile dump, or None if it's not a dump."""
+    if not filename.endswith(DUMP_SUFFIX):
+        return None
+    parts = filename[:-len(DUMP_SUFFIX)].rsplit('.', 2)
+    return parts[0] if len(parts) == 3 else None
+
+
+def aggregate_profiles(directory):
+    """Combine profiles dumped to given directory, per operation.
+
+    :param directory: directory containing profile dumps.
+    :type directory: str
+    :returns: mapping operationId -> (combined stats, number of profiles), sorted by
+     operationId.
+    :rtype: :py:class:`collections.OrderedDict`
+    """
+    logger = logging.getLogger('aubergine.profiling')
+    paths = collections.defaultdict(list)
+    for filename in sorted(os.listdir(directory)):
+        operation_id = operation_of(filename)
+        if operation_id is None:
+            logger.debug('Skipping %s, not a profile dump.', filename)
+        else:
+            paths[operation_id].append(os.path.join(directory, filename))
+    return collections.OrderedDict(
+        (operation_id, (pstats.Stats(*paths[operation_id]), len(paths[operation_id])))
+        for operation_id in sorted(paths))
@@ -0,0 +1,136 @@
+"""Compact, slotted records materialized from validated object values."""
+import json
+import keyword
+from aubergine.common import to_plain
+
+
+SPEC_KEY = 'x-aubergine-record'
+
+
+class Record:
+    """Base class of record classes created by :py:func:`record_class`.
+
+    Records are compared by values of their fields. Fields absent from the materialized
+    value are None.
+    """
+    __slots__ = ()
+    _fields = ()
+
+    def _asdict(self):
+        """Get mapping: field name -> value."""
+        return {name: getattr(self, name) for name in self._fields}
+
+    def __eq__(self, other):
+        if type(other) is not type(self): # pylint: disable=unidiomatic-typecheck
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join(
+            '{}={!r}'.format(name, getattr(self, name)) for name in self._fields))
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self._fields)
+
+    def __setstate__(self, state):
+        for name, value in zip(self._fields, state):
+            setattr(self, name, value)
+
+
+def record_class(name, fields):
+    """Create record class with given fields, stored in slots.
+
+    :param name: name of the class.
+    :type name: str
+    :param fields: names of the fields, which are also (optional) arguments of the initializer,
+     in the same order.
+    :type fields: sequence of str
+    :rtype: type
+    :raises ValueError: if some field name is not a valid identifier.
+    """
+    fields = tuple(fields)
+    for field in fields:
+        if not field.isidentifier() or keyword.iskeyword(field) or field.startswith('_'):
+            raise ValueError('Property {!r} of record {} cannot be used as an attribute.'
+                             .format(field, name))
+    # The initializer is generated, like namedtuple's, to avoid loops over fields per object.
+    source = 'def __init__(self{}):\n{}'.format(
+        ''.join(', {}=None'.format(field) for field in fields),
+        ''.join('    self.{0} = {0}\n'.format(field) for field in fields) or '    pass\n')
+    namespace = {}
+    exec(source, namespace) # pylint: disable=exec-used
+    return type(name, (Record,), {'__slots__': fields, '_fields': fields,
+                                  '__init__': namespace['__init__'], '__module__': __name__})
+
+
+def encode_record(obj):
+    """Encode records as JSON objects, intended as `default` argument of :py:func:`json.dumps`.
+
+    :raises TypeError: if `obj` is not a record.
+    """
+    if isinstance(obj, Record):
+        return obj._asdict() # pylint: disable=protected-access
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(obj).__name__))
+
+
+def _nullable(convert):
+    return lambda value: None if value is None else convert(value)
+
+
+class RecordFactory:
+    """Factory of functions materializing validated values into records.
+
+    Objects whose schema sets `x-aubergine-record` extension are materialized into instances
+    of a record class generated for the schema. The extension's value, if it's a string,
+    is the name of the class, otherwise schema's title is used. Structurally equal schemas
+    share a single class.
+    """
+
+    def __init__(self):
+        self._classes = {}
+
+    def materializer(self, schema_spec):
+        """Build function converting values validated against given schema into records.
+
+        :param schema_spec: OpenAPI schema object.
+        :type schema_spec: Mapping
+        :returns: function of a single argument, or None if the schema doesn't use records.
+        :rtype: callable
+        """
+        if 'items' in schema_spec:
+            item = self.materializer(schema_spec['items'])
+            if item is None:
+                return None
+            item = _nullable(item)
+            return lambda value: [item(element) for element in value]
+        nested = {}
+        for name, prop_spec in schema_spec.get('properties', {}).items():
+            convert = self.materializer(prop_spec)
+            if convert is not None:
+                nested[name] = _nullable(convert)
+        if not schema_spec.get(SPEC_KEY):
+            if not nested:
+                return None
+            return lambda value: dict(
+                value, **{name: nested[name](value[name]) for name in nested if name in value})
+        cls = self.record_class(schema_spec)
+        fields = cls._fields # pylint: disable=protected-access
+        if not nested:
+            return lambda value: cls(*map(value.get, fields))
+        converters = [nested.get(name) for name in fields]
+        return lambda value: cls(*[value.get(name) if convert is None else
+                                   convert(value.get(name))
+                                   for name, convert in zip(fields, converters)])
+
+    def record_class(self, schema_spec):
+        """Get record class for given object schema, creating it on first use."""
+        key = json.dumps(to_plain(schema_spec), sort_keys=True, default=repr)
+        if key not in self._classes:
+            name = schema_spec[SPEC_KEY]
+            if not isinstance(name, str):
+                name = schema_spec.get('title', 'Record').replace(' ', '')
+            cls = record_class(name, schema_spec.get('properties', {}))
+            self._classes.setdefault(key, cls)
+        return self._classes[key]
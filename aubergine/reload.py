@@ -0,0 +1,254 @@
+"""Hot reloading of the specification without restarting the application."""
+import collections
+import os
+import threading
+import falcon
+from falcon.routing import compile_uri_template
+from aubergine.common import Loggable, join_route
+from aubergine.derived import derive_handlers
+from aubergine import utils
+
+
+PathsDiff = collections.namedtuple('PathsDiff', ['added', 'removed', 'changed'])
+
+
+def diff_paths(old_paths, new_paths):
+    """Compute differences between two `paths` sections of the specification.
+
+    :param old_paths: `paths` section of the currently served specification.
+    :type old_paths: Mapping
+    :param new_paths: `paths` section of the new specification.
+    :type new_paths: Mapping
+    :returns: sets of (path, method) pairs that were added, removed or changed.
+    :rtype: :py:class:`PathsDiff`
+    """
+    old_ops = {(path, meth) for path, path_spec in old_paths.items() for meth in path_spec}
+    new_ops = {(path, meth) for path, path_spec in new_paths.items() for meth in path_spec}
+    changed = {(path, meth) for path, meth in old_ops & new_ops
+               if old_paths[path][meth] != new_paths[path][meth]}
+    return PathsDiff(added=new_ops - old_ops, removed=old_ops - new_ops, changed=changed)
+
+
+def _security_of(spec_dict):
+    return (spec_dict.get('security'),
+            spec_dict.get('components', {}).get('securitySchemes'))
+
+
+class ReloadableResource(Loggable):
+    """Resource dispatching requests to handlers that can be swapped at runtime.
+
+    Handlers are kept in a single mapping which is replaced as a whole on reload,
+    hence requests that already obtained their handler finish on it, while all
+    subsequent ones use the new set of handlers.
+
+    :param path: path this resource is created for.
+    :type path: str
+    :param handlers: map: method -> request handler.
+    :type handlers: mapping: str -> :py:class:`aubergine.handlers.RequestHandler`
+    """
+    __slots__ = ('path', 'handlers')
+
+    def __init__(self, path, handlers):
+        self.path = path
+        self.handlers = {meth.upper(): handler for meth, handler in handlers.items()}
+
+    def swap(self, handlers):
+        """Atomically replace handlers used by this resource."""
+        self.handlers = {meth.upper(): handler for meth, handler in handlers.items()}
+
+    def dispatch(self, method, req, resp, **kwargs):
+        """Forward request to the handler currently registered for given method."""
+        handlers = self.handlers
+        if not handlers:
+            raise falcon.HTTPNotFound()
+        if method not in handlers:
+            raise falcon.HTTPMethodNotAllowed(sorted(handlers))
+        handlers[method].handle_request(req, resp, **kwargs)
+
+    def on_options(self, req, resp, **kwargs):
+        """Respond to OPTIONS request, taking into account currently registered methods."""
+        if 'OPTIONS' in self.handlers:
+            self.dispatch('OPTIONS', req, resp, **kwargs)
+            return
+        resp.status = falcon.HTTP_204
+        resp.set_header('Allow', ', '.join(sorted(set(self.handlers) | {'OPTIONS'})))
+        resp.content_length = 0
+
+
+def _make_responder(method):
+    def responder(self, req, resp, **kwargs):
+        self.dispatch(method, req, resp, **kwargs)
+    responder.__name__ = 'on_' + method.lower()
+    return responder
+
+for _method in falcon.HTTP_METHODS:
+    if _method != 'OPTIONS':
+        setattr(ReloadableResource, 'on_' + _method.lower(), _make_responder(_method))
+
+
+class ReloadableRoutes:
+    """Sink dispatching requests to resources of paths added by reloads.
+
+    Falcon's router is not safe to modify while it serves requests, so paths added to the
+    specification are not registered with the API. Instead, this sink is added when the API
+    is built, and requests of paths unknown to the router are matched against its table,
+    which is replaced as a whole whenever a path is added. Added paths are matched only if
+    none of the paths known to the router matches.
+    """
+    __slots__ = ('table',)
+
+    def __init__(self):
+        self.table = ()
+
+    def add(self, route, resource):
+        """Atomically add route (a URI template) served by given resource."""
+        _, pattern = compile_uri_template(route)
+        self.table = self.table + ((pattern, resource),)
+
+    def __call__(self, req, resp, **kwargs):
+        for pattern, resource in self.table:
+            match = pattern.match(req.path)
+            if match is not None:
+                responder = getattr(resource, 'on_' + req.method.lower(), None)
+                if responder is None:
+                    raise falcon.HTTPMethodNotAllowed(sorted(resource.handlers))
+                responder(req, resp, **match.groupdict())
+                return
+        raise falcon.HTTPNotFound()
+
+
+class SpecWatcher(Loggable):
+    """Watcher reloading application's routes when its specification file changes.
+
+    Only operations that differ between old and new `paths` sections are rebuilt,
+    handlers of all other operations are kept as they are.
+
+    :param app: application whose specification is watched.
+    :type app: :py:class:`aubergine.Aubergine`
+    :param routes: sink registered with the API, serving paths added by reloads.
+    :type routes: :py:class:`ReloadableRoutes`
+    :param resources: map: path -> resource registered for this path.
+    :type resources: dict
+    :param base_path: base path under which routes are registered.
+    :type base_path: str
+    :param ex_factory: extractor factory used for building new handlers.
+    :param import_module: callable used for loading operations.
+    :param interval: number of seconds between consecutive checks of the file.
+    :type interval: float
+    :param options: additional keyword arguments passed to `utils.create_handler`.
+    :type options: dict
+    :param cors: CORS settings of derived and wrapped handlers.
+    :type cors: :py:class:`aubergine.cors.CorsSettings`
+    """
+
+    def __init__(self, app, routes, resources, base_path, ex_factory, import_module,
+                 interval=1.0, options=None, cors=None):
+        self.app = app
+        self.routes = routes
+        self.resources = resources
+        self.base_path = base_path
+        self.ex_factory = ex_factory
+        self.import_module = import_module
+        self.interval = interval
+        self.options = options or {}
+        self.cors = cors
+        self._mtime = os.stat(app.spec_path).st_mtime
+        self._failed_mtime = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start watching the specification file in a daemon thread."""
+        self._thread = threading.Thread(target=self._run, name='aubergine-spec-watcher',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching the specification file."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """Reload specification if its file was modified since the last successful reload.
+
+        Failed reloads are retried on subsequent checks, since the file may have been read
+        while being written and completed later without changing its modification time.
+
+        :returns: True if the specification was reloaded, False otherwise.
+        :rtype: bool
+        """
+        try:
+            mtime = os.stat(self.app.spec_path).st_mtime
+        except OSError:
+            self.logger.exception('Cannot stat specification file %s.', self.app.spec_path)
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            self.reload()
+        except Exception: # pylint: disable=broad-except
+            if mtime != self._failed_mtime:
+                self.logger.exception('Reloading specification failed, keeping the old one.')
+            self._failed_mtime = mtime
+            return False
+        self._mtime = mtime
+        self._failed_mtime = None
+        return True
+
+    def reload(self):
+        """Load specification file again and swap handlers of operations that changed."""
+        new_app = type(self.app).from_file(self.app.spec_path,
+                                           lazy=self.app.spec_loader is not None)
+        new_spec = new_app.spec_dict
+        if new_spec['servers'] != self.app.spec_dict['servers']:
+            self.logger.warning('Servers section changed, new base path will not be applied.')
+        diff = diff_paths(self.app.spec_dict['paths'], new_spec['paths'])
+        options = dict(self.options)
+        if 'security' in options:
+            # Policies are bound to schemes and default requirements of the spec they were
+            # built for, hence all operations are rebuilt when those change.
+            options['security'] = options['security'].for_spec(new_spec)
+            if _security_of(new_spec) != _security_of(self.app.spec_dict):
+                common = {(path, meth) for path, path_spec in new_spec['paths'].items()
+                          for meth in path_spec} - diff.added
+                diff = diff._replace(changed=diff.changed | common)
+        self.logger.info('Reloading specification: %d added, %d removed, %d changed operations.',
+                         len(diff.added), len(diff.removed), len(diff.changed))
+
+        # Build everything first, so that a broken operation leaves old routes untouched.
+        rebuilt = {(path, meth): utils.create_handler(path, new_spec['paths'][path][meth],
+                                                      self.ex_factory, self.import_module,
+                                                      **options)
+                   for path, meth in diff.added | diff.changed}
+        new_handlers = {}
+        for path, meth in diff.added | diff.changed | diff.removed:
+            if path not in new_handlers:
+                # Routes hold only handlers of declared operations, derived ones are rebuilt.
+                new_handlers[path] = dict(self.app.routes.get(join_route(self.base_path, path),
+                                                              {}))
+            if (path, meth) in rebuilt:
+                new_handlers[path][meth] = rebuilt[path, meth]
+            else:
+                new_handlers[path].pop(meth, None)
+
+        for path, handlers in new_handlers.items():
+            self.app.routes[join_route(self.base_path, path)] = handlers
+            served = dict(handlers)
+            if handlers:
+                served.update(derive_handlers(path, handlers, new_spec['paths'][path],
+                                              self.import_module, self.cors))
+            if path in self.resources:
+                self.resources[path].swap(served)
+            else:
+                self.logger.info('Adding route for new path %s', path)
+                resource = ReloadableResource(path, served)
+                self.resources[path] = resource
+                self.routes.add(join_route(self.base_path, path), resource)
+        self.app.spec_dict = new_spec
+        self.options = options
+        self.app.spec_loader = new_app.spec_loader
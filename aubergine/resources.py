@@ -0,0 +1,125 @@
+"""Per-process resources (connection pools, sessions, caches) injected into operations."""
+import os
+import threading
+from aubergine.common import Loggable
+
+
+class ResourceRegistry(Loggable):
+    """Registry of resource providers.
+
+    Every resource is created by its factory at most once per process, on first use, so that
+    resources like connection pools are never shared between forked workers.
+
+    :param providers: mapping: resource name -> factory (callable without arguments).
+    :type providers: Mapping
+    """
+
+    SPEC_KEY = 'x-aubergine-resources'
+
+    def __init__(self, providers=None):
+        self._factories = {}
+        self._closers = {}
+        self._instances = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        # Incremented whenever instances are released, so that bindings drop them.
+        self.generation = 0
+        for name, factory in (providers or {}).items():
+            self.register(name, factory)
+
+    def register(self, name, factory, close=None):
+        """Register provider of a resource.
+
+        :param name: name of the resource, as used in operations' specs.
+        :type name: str
+        :param factory: callable without arguments creating the resource.
+        :type factory: callable
+        :param close: callable releasing the resource, called with it as the only argument.
+        :type close: callable
+        """
+        self._factories[name] = factory
+        if close is not None:
+            self._closers[name] = close
+
+    def get(self, name):
+        """Get instance of given resource for the current process, creating it if needed."""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Instances inherited from the parent process must not be used.
+                self._instances = {}
+                self._pid = os.getpid()
+            if name not in self._instances:
+                self.logger.info('Initializing resource %s in process %d', name, self._pid)
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def close(self):
+        """Release all resources created in the current process."""
+        with self._lock:
+            instances = self._instances if self._pid == os.getpid() else {}
+            self._instances = {}
+            self.generation += 1
+        for name, instance in instances.items():
+            if name in self._closers:
+                self._closers[name](instance)
+
+    def bind(self, op_spec, reserved=()):
+        """Resolve resources declared by operation into keyword arguments it accepts.
+
+        Resources are declared using `x-aubergine-resources` extension, either as a list
+        of names (passed as keyword arguments of the same names) or as a mapping from
+        keyword arguments to names, e.g.::
+
+            x-aubergine-resources:
+              db: orders_db
+              session: http
+
+        :param op_spec: operation's specification.
+        :type op_spec: Mapping
+        :param reserved: names of keyword arguments already used for parameters.
+        :type reserved: collection of str
+        :returns: binding of resources or None if operation declares no resources.
+        :rtype: :py:class:`ResourceBinding` or None
+        :raises ValueError: if unknown resource is declared or its keyword argument is
+         already used by a parameter.
+        """
+        declared = op_spec.get(self.SPEC_KEY)
+        if not declared:
+            return None
+        if hasattr(declared, 'items'):
+            pairs = list(declared.items())
+        else:
+            pairs = [(name, name) for name in declared]
+        for kwarg, name in pairs:
+            if name not in self._factories:
+                raise ValueError('Operation {} uses unknown resource {}.'.format(
+                    op_spec.get('operationId'), name))
+            if kwarg in reserved:
+                raise ValueError('Resource argument {} of operation {} clashes with its '
+                                 'parameter.'.format(kwarg, op_spec.get('operationId')))
+        return ResourceBinding(self, pairs)
+
+
+class ResourceBinding:
+    """Resources resolved for a single operation.
+
+    :param registry: registry providing the resources.
+    :type registry: :py:class:`ResourceRegistry`
+    :param pairs: sequence of pairs (keyword argument, resource name).
+    """
+    __slots__ = ('registry', 'pairs', '_kwargs', '_pid', '_generation')
+
+    def __init__(self, registry, pairs):
+        self.registry = registry
+        self.pairs = tuple(pairs)
+        self._kwargs = None
+        self._pid = None
+        self._generation = None
+
+    def kwargs(self):
+        """Get keyword arguments with instances of resources for the current process."""
+        if self._pid != os.getpid() or self._generation != self.registry.generation:
+            self._generation = self.registry.generation
+            self._kwargs = {kwarg: self.registry.get(name) for kwarg, name in self.pairs}
+            self._pid = os.getpid()
+        return self._kwargs
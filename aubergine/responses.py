@@ -0,0 +1,44 @@
+"""Responses returned by operations which already hold serialized content."""
+import mmap
+import falcon
+
+
+class RawResponse:
+    """Marker of operation's result that should be sent as-is, without serialization.
+
+    :param data: content of the response: bytes (written to `resp.data`), or a file-like
+     object or mmap (written to `resp.stream`).
+    :type data: bytes, file-like object or :py:class:`mmap.mmap`
+    :param content_type: value of Content-Type header of the response.
+    :type content_type: str
+    :param status: status of the response, either as a code or as a full status line.
+    :type status: int or str
+    :param length: length of streamed content, sent as Content-Length. Computed for
+     mmaps, optional for other streams.
+    :type length: int
+    """
+    __slots__ = ('data', 'content_type', 'status', 'length')
+
+    def __init__(self, data, content_type='application/json', status=falcon.HTTP_200,
+                 length=None):
+        self.data = data
+        self.content_type = content_type
+        self.status = falcon.get_http_status(status) if isinstance(status, int) else status
+        if length is None and isinstance(data, mmap.mmap):
+            length = len(data)
+        self.length = length
+
+    def apply(self, resp):
+        """Write this response to falcon's response object, without copying its content.
+
+        :param resp: response being built.
+        :type resp: :py:class:`falcon.Response`
+        """
+        resp.status = self.status
+        resp.content_type = self.content_type
+        if isinstance(self.data, bytes):
+            resp.data = self.data
+        else:
+            resp.stream = self.data
+            if self.length is not None:
+                resp.stream_len = self.length
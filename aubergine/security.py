@@ -0,0 +1,241 @@
+"""Enforcement of security requirements declared in the specification."""
+import base64
+import binascii
+import collections
+import copy
+import hashlib
+import threading
+import time
+import falcon
+from aubergine.common import Loggable
+
+
+class TTLCache:
+    """Bounded, thread-safe cache whose entries expire after given time.
+
+    When the cache is full, the least recently used entry is evicted.
+
+    :param maxsize: maximum number of entries.
+    :type maxsize: int
+    :param clock: callable returning current time in seconds.
+    :type clock: callable
+    """
+
+    def __init__(self, maxsize=1024, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get value stored under given key.
+
+        :returns: pair (found, value), where value is None if it wasn't found or expired.
+        :rtype: tuple
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires <= self.clock():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def put(self, key, value, ttl):
+        """Store value under given key for `ttl` seconds."""
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SecurityScheme:
+    """Security scheme from `components.securitySchemes`, extracting credentials from requests.
+
+    Supported are `apiKey` schemes (in header, query or cookie) and `http` schemes `bearer`
+    and `basic`. Credentials of basic scheme are pairs (username, password), of the other
+    schemes strings.
+
+    :param name: name of the scheme.
+    :type name: str
+    :param spec: specification of the scheme.
+    :type spec: Mapping
+    :raises ValueError: if the scheme is not supported.
+    """
+    __slots__ = ('name', 'kind', 'location', 'param_name')
+
+    def __init__(self, name, spec):
+        self.name = name
+        if spec.get('type') == 'apiKey' and spec.get('in') in ('header', 'query', 'cookie'):
+            self.kind, self.location, self.param_name = 'apiKey', spec['in'], spec['name']
+        elif spec.get('type') == 'http' and spec.get('scheme', '').lower() in ('bearer', 'basic'):
+            self.kind, self.location, self.param_name = spec['scheme'].lower(), 'header', None
+        else:
+            raise ValueError('Security scheme {} of type {} is not supported.'.format(
+                name, spec.get('type')))
+
+    @property
+    def challenge(self):
+        """Challenge sent in WWW-Authenticate header when credentials are missing."""
+        if self.kind == 'apiKey':
+            return 'ApiKey {}="{}"'.format(self.location, self.param_name)
+        return self.kind.capitalize()
+
+    def credential(self, req):
+        """Get credential carried by request, or None if it has none (or a malformed one)."""
+        if self.kind == 'apiKey':
+            if self.location == 'header':
+                return req.get_header(self.param_name)
+            if self.location == 'query':
+                return req.get_param(self.param_name)
+            return req.cookies.get(self.param_name)
+        scheme, _, value = (req.get_header('Authorization') or '').partition(' ')
+        if scheme.lower() != self.kind or not value.strip():
+            return None
+        if self.kind == 'bearer':
+            return value.strip()
+        try:
+            decoded = base64.b64decode(value.strip()).decode('utf-8')
+        except (binascii.Error, UnicodeDecodeError):
+            return None
+        username, sep, password = decoded.partition(':')
+        return (username, password) if sep else None
+
+
+class Authenticator(Loggable):
+    """Authenticator verifying credentials with user supplied verifiers.
+
+    Verifiers are called with the credential (see :py:class:`SecurityScheme`) and should
+    return the authenticated principal, or None if the credential is invalid. Their results
+    are cached, keyed on the digest of the credential, for `ttl` seconds if successful and
+    for `negative_ttl` seconds otherwise. Exceptions raised by verifiers are not cached.
+
+    :param verifiers: mapping: name of security scheme -> verifier.
+    :type verifiers: Mapping
+    :param cache_size: maximum number of cached verification results.
+    :type cache_size: int
+    :param ttl: number of seconds for which successful verifications are cached.
+    :type ttl: float
+    :param negative_ttl: number of seconds for which failed verifications are cached.
+    :type negative_ttl: float
+    :param clock: callable returning current time in seconds.
+    :type clock: callable
+    """
+
+    SPEC_KEY = 'security'
+
+    def __init__(self, verifiers, cache_size=1024, ttl=60.0, negative_ttl=5.0,
+                 clock=time.monotonic):
+        self.verifiers = dict(verifiers)
+        self.cache = TTLCache(cache_size, clock)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.schemes = {}
+        self.default_security = None
+
+    def for_spec(self, spec_dict):
+        """Get authenticator using security schemes and default requirements of given spec.
+
+        The returned authenticator shares verifiers and cache with this one.
+
+        :param spec_dict: mapping defining OpenAPI specification.
+        :type spec_dict: Mapping
+        :rtype: :py:class:`Authenticator`
+        """
+        bound = copy.copy(self)
+        bound.schemes = dict(spec_dict.get('components', {}).get('securitySchemes', {}))
+        bound.default_security = spec_dict.get(self.SPEC_KEY)
+        return bound
+
+    def policy_for(self, op_spec):
+        """Create policy enforcing security requirements of an operation.
+
+        Operation's `security` overrides the spec-wide one. Requirements are alternatives,
+        and all schemes of a single requirement have to be satisfied. An empty requirement
+        makes authentication optional.
+
+        :param op_spec: operation's specification.
+        :type op_spec: Mapping
+        :returns: policy, or None if the operation has no security requirements.
+        :rtype: :py:class:`SecurityPolicy`
+        :raises ValueError: if a requirement uses undeclared or unsupported scheme, or
+         scheme without a verifier.
+        """
+        requirements = op_spec.get(self.SPEC_KEY, self.default_security)
+        if not requirements:
+            return None
+        alternatives = []
+        for requirement in requirements:
+            schemes = []
+            for name in requirement:
+                if name not in self.schemes:
+                    raise ValueError('Operation {} requires undeclared security scheme {}.'
+                                     .format(op_spec.get('operationId'), name))
+                if name not in self.verifiers:
+                    raise ValueError('No verifier given for security scheme {}.'.format(name))
+                schemes.append(SecurityScheme(name, self.schemes[name]))
+            alternatives.append(tuple(schemes))
+        return SecurityPolicy(self, alternatives)
+
+    def verify(self, scheme, credential):
+        """Verify credential of given scheme, using cached result if there is one.
+
+        :returns: authenticated principal or None if the credential is invalid.
+        """
+        digest = hashlib.sha256(repr(credential).encode('utf-8')).digest()
+        key = (scheme.name, digest)
+        found, principal = self.cache.get(key)
+        if found:
+            return principal
+        principal = self.verifiers[scheme.name](credential)
+        self.cache.put(key, principal, self.ttl if principal is not None else self.negative_ttl)
+        return principal
+
+
+class SecurityPolicy:
+    """Policy enforcing security requirements of a single operation, called like hooks but
+    before the request is admitted.
+
+    Requests satisfying some requirement get the principal authenticated by the first of
+    its schemes in `req.context['principal']`, and principals of all its schemes in
+    `req.context['principals']`. All other requests are rejected with 401. The empty
+    requirement (optional authentication) is tried after all others, so that requests
+    carrying valid credentials are authenticated even if it's declared first.
+
+    :param authenticator: authenticator verifying the credentials.
+    :type authenticator: :py:class:`Authenticator`
+    :param alternatives: sequence of tuples of :py:class:`SecurityScheme`.
+    """
+    __slots__ = ('authenticator', 'alternatives', 'challenges')
+
+    def __init__(self, authenticator, alternatives):
+        self.authenticator = authenticator
+        # Stable sort moving empty requirements, which always succeed, to the end.
+        self.alternatives = tuple(sorted(alternatives, key=lambda schemes: not schemes))
+        self.challenges = sorted({scheme.challenge for schemes in self.alternatives
+                                  for scheme in schemes})
+
+    def __call__(self, req, resp, params): # pylint: disable=unused-argument
+        for schemes in self.alternatives:
+            principals = collections.OrderedDict()
+            for scheme in schemes:
+                credential = scheme.credential(req)
+                if credential is None:
+                    break
+                principal = self.authenticator.verify(scheme, credential)
+                if principal is None:
+                    break
+                principals[scheme.name] = principal
+            else:
+                req.context['principal'] = next(iter(principals.values()), None)
+                req.context['principals'] = principals
+                return
+        raise falcon.HTTPUnauthorized('Unauthorized', 'Valid credentials are required.',
+                                      challenges=self.challenges)
@@ -0,0 +1,188 @@
+"""Lazy, sharing loader of OpenAPI specification documents."""
+import collections
+from collections.abc import Mapping, Sequence
+import os
+import re
+import sys
+from urllib.parse import urljoin
+from urllib.request import urlopen
+import yaml
+from aubergine.common import Loggable, deep_sizeof
+
+
+Footprint = collections.namedtuple('Footprint', ['raw_bytes', 'node_bytes', 'nodes', 'refs'])
+
+
+class SpecNode:
+    """Base class for read-only nodes of lazily resolved specification.
+
+    Children of the node are wrapped (and `$ref`s in them resolved) when they are first
+    accessed and then cached, hence each part of the document is materialized at most once.
+
+    :param raw: raw object (as obtained from YAML parser) wrapped by this node.
+    :param loader: loader used for resolving references.
+    :type loader: :py:class:`SpecLoader`
+    :param doc_uri: identifier of the document this node belongs to.
+    :type doc_uri: str
+    """
+    __slots__ = ('raw', 'loader', 'doc_uri', '_children')
+
+    def __init__(self, raw, loader, doc_uri):
+        self.raw = raw
+        self.loader = loader
+        self.doc_uri = doc_uri
+        self._children = {}
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __getitem__(self, key):
+        try:
+            return self._children[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable keys (e.g. slices) are never cached.
+            return self.loader.wrap(self.raw[key], self.doc_uri)
+        child = self.loader.wrap(self.raw[key], self.doc_uri)
+        return self._children.setdefault(key, child)
+
+
+class SpecMapping(SpecNode, Mapping):
+    """Node of the specification wrapping a mapping."""
+    __slots__ = ()
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    def __contains__(self, key):
+        return key in self.raw
+
+    def __repr__(self):
+        return 'SpecMapping({!r})'.format(self.raw)
+
+
+class SpecSequence(SpecNode, Sequence): # pylint: disable=too-many-ancestors
+    """Node of the specification wrapping a sequence."""
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return False
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'SpecSequence({!r})'.format(self.raw)
+
+
+class SpecLoader(Loggable):
+    """Loader of specification resolving references lazily and sharing resolved objects.
+
+    Contrary to inlining referenced components, every reference target is materialized
+    only once, and all places referring to it share the very same node.
+
+    :param base_dir: directory against which local references are resolved.
+    :type base_dir: str
+    :param load_yaml: callable used for parsing documents.
+    :type load_yaml: callable
+    :param open_local: callable used for opening local files.
+    :param open_remote: callable used for opening remote documents.
+    """
+
+    SCHEMA_REGEXP = re.compile('[A-Za-z]+://')
+
+    ROOT_URI = ''
+
+    def __init__(self, base_dir='.', load_yaml=yaml.safe_load, open_local=open,
+                 open_remote=urlopen):
+        self.base_dir = base_dir
+        self.load_yaml = load_yaml
+        self.open_local = open_local
+        self.open_remote = open_remote
+        self.documents = {}
+        self.refs = {}
+
+    def load(self, content):
+        """Load root document from given string or stream.
+
+        :returns: root node of the specification.
+        :rtype: :py:class:`SpecMapping`
+        """
+        raw = self.load_yaml(content)
+        self.documents[self.ROOT_URI] = self.wrap(raw, self.ROOT_URI)
+        return self.documents[self.ROOT_URI]
+
+    def wrap(self, raw, doc_uri):
+        """Wrap raw object in a node (or resolve it, if it is a reference)."""
+        if isinstance(raw, Mapping):
+            if '$ref' in raw:
+                return self.resolve(raw['$ref'], doc_uri)
+            return SpecMapping(raw, self, doc_uri)
+        if isinstance(raw, list):
+            return SpecSequence(raw, self, doc_uri)
+        return raw
+
+    def resolve(self, reference, doc_uri):
+        """Resolve reference found in document identified by `doc_uri`.
+
+        :returns: node shared by all references pointing to the same target.
+        """
+        key = (doc_uri, reference)
+        try:
+            return self.refs[key]
+        except KeyError:
+            pass
+        location, _, pointer = reference.partition('#')
+        target_uri = self._document_uri(location, doc_uri) if location else doc_uri
+        node = self._document(target_uri)
+        for token in pointer.split('/')[1:] if pointer else []:
+            token = token.replace('~1', '/').replace('~0', '~')
+            node = node[int(token)] if isinstance(node, SpecSequence) else node[token]
+        return self.refs.setdefault(key, node)
+
+    def _document_uri(self, location, doc_uri):
+        if self.SCHEMA_REGEXP.match(location):
+            return location
+        if self.SCHEMA_REGEXP.match(doc_uri):
+            # Relative references in remote documents point to documents on the same host.
+            return urljoin(doc_uri, location)
+        base = os.path.dirname(doc_uri) if doc_uri else self.base_dir
+        return os.path.normpath(os.path.join(base, location))
+
+    def _document(self, uri):
+        if uri not in self.documents:
+            self.logger.info('Loading referenced document %s', uri)
+            opener = self.open_remote if self.SCHEMA_REGEXP.match(uri) else self.open_local
+            with opener(uri) as stream:
+                raw = self.load_yaml(stream.read())
+            self.documents.setdefault(uri, self.wrap(raw, uri))
+        return self.documents[uri]
+
+    def footprint(self):
+        """Report memory used by documents loaded and nodes materialized so far.
+
+        :returns: sizes (in bytes) of raw documents and of materialized nodes, number
+         of materialized nodes and number of distinct references resolved.
+        :rtype: :py:class:`Footprint`
+        """
+        seen = set()
+        raw_bytes = sum(deep_sizeof(doc.raw, seen) for doc in self.documents.values()
+                        if isinstance(doc, SpecNode))
+        node_bytes = 0
+        nodes = 0
+        stack = [doc for doc in self.documents.values() if isinstance(doc, SpecNode)]
+        visited = set()
+        while stack:
+            node = stack.pop()
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+            nodes += 1
+            # pylint: disable=protected-access
+            node_bytes += sys.getsizeof(node) + sys.getsizeof(node._children)
+            stack.extend(child for child in node._children.values()
+                         if isinstance(child, SpecNode))
+        return Footprint(raw_bytes=raw_bytes, node_bytes=node_bytes, nodes=nodes,
+                         refs=len({id(node) for node in self.refs.values()}))
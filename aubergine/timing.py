@@ -0,0 +1,105 @@
+"""Measuring time spent in various phases of building the app."""
+import collections
+from contextlib import contextmanager
+import threading
+import time
+
+
+PhaseTiming = collections.namedtuple('PhaseTiming', ['seconds', 'calls'])
+
+
+class BuildTimer:
+    """Accumulator of time spent in named phases of app's startup.
+
+    Phases can be entered concurrently from many threads, in which case their totals
+    are sums of times measured in every thread and may exceed the wall time.
+
+    :param clock: callable returning current time in seconds.
+    :type clock: callable
+    """
+
+    SPEC_LOAD = 'spec_load'
+    SCHEMA_COMPILE = 'schema_compile'
+    MODULE_IMPORT = 'module_import'
+    HANDLERS_BUILD = 'handlers_build'
+    ROUTE_REGISTRATION = 'route_registration'
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._totals = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        """Record that given phase took given number of seconds."""
+        with self._lock:
+            total, calls = self._totals.get(phase, (0.0, 0))
+            self._totals[phase] = PhaseTiming(seconds=total + seconds, calls=calls + 1)
+
+    @contextmanager
+    def phase(self, phase):
+        """Context manager measuring time spent in its body as a given phase."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.add(phase, self.clock() - start)
+
+    def wrap(self, phase, func):
+        """Wrap given callable so that time spent in all its calls is counted as phase."""
+        def _timed(*args, **kwargs):
+            with self.phase(phase):
+                return func(*args, **kwargs)
+        return _timed
+
+    def report(self):
+        """Get times recorded so far.
+
+        :returns: mapping phase -> total time and number of measurements, in the order
+         in which phases were first recorded.
+        :rtype: :py:class:`collections.OrderedDict`
+        """
+        with self._lock:
+            return collections.OrderedDict(self._totals)
+
+    def format_report(self):
+        """Get human readable report of times recorded so far."""
+        return '\n'.join('{:<20} {:>10.4f}s {:>8} calls'.format(phase, timing.seconds,
+                                                                 timing.calls)
+                         for phase, timing in self.report().items())
+
+
+@contextmanager
+def timed_phase(timer, phase):
+    """Measure time of given phase with given timer, unless the timer is None."""
+    if timer is None:
+        yield
+    else:
+        with timer.phase(phase):
+            yield
+
+
+class TimedExtractorBuilder:
+    """Proxy of extractor builder counting time spent in building extractors.
+
+    :param wrapped: the actual extractor builder.
+    :type wrapped: :py:class:`aubergine.extractors.ExtractorBuilder`
+    :param timer: timer to record time in.
+    :type timer: :py:class:`BuildTimer`
+    """
+
+    def __init__(self, wrapped, timer):
+        self.wrapped = wrapped
+        self.timer = timer
+
+    def build_param_extractor(self, param_spec):
+        """Build parameter extractor, recording the time as schema compilation."""
+        with self.timer.phase(BuildTimer.SCHEMA_COMPILE):
+            return self.wrapped.build_param_extractor(param_spec)
+
+    def build_body_extractor(self, body_spec):
+        """Build body extractor, recording the time as schema compilation."""
+        with self.timer.phase(BuildTimer.SCHEMA_COMPILE):
+            return self.wrapped.build_body_extractor(body_spec)
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
@@ -2,7 +2,14 @@
 from collections import Callable
 import logging
 import importlib
+from aubergine.admission import AdmissionController
+from aubergine.deadlines import DeadlinePolicy
+from aubergine.extractors import ValidationCache
 from aubergine.handlers import RequestHandler
+from aubergine.hooks import chain_hooks, declared_hooks
+from aubergine.profiling import RequestProfiler
+from aubergine.resources import ResourceRegistry
+from aubergine.validation import ValidationPolicy
 
 
 def create_resource(handlers):
@@ -19,14 +26,91 @@ def create_resource(handlers):
     """
     path = next(iter(handlers.values())).path
     attrs = {'on_' + meth.lower(): handler.handle_request for meth, handler in handlers.items()}
+    attrs['__slots__'] = ()
     cls = type('Resource<{}>'.format(path), tuple(), attrs)
     return cls()
 
 
-def create_handler(path, op_spec, extractor_factory, import_module=importlib.import_module):
-    """Create handler from given specification."""
+def _bind_resources(registry, op_spec, param_ex):
+    if registry is None:
+        if op_spec.get(ResourceRegistry.SPEC_KEY):
+            raise ValueError('Operation {} declares resources but no resource registry was '
+                             'given.'.format(op_spec['operationId']))
+        return None
+    return registry.bind(op_spec, reserved=set(param_ex).union(('body',)))
+
+
+def resolve_callable(name, import_module=importlib.import_module):
+    """Resolve dotted name of an operation or hook into the callable it refers to.
+
+    :param name: module path and attribute name joined with a dot, like operationId.
+    :type name: str
+    :param import_module: callable used for loading the module.
+    :type import_module: callable
+    :raises ValueError: if the name doesn't contain a dot.
+    :raises TypeError: if the resolved object is not callable.
+    """
     logger = logging.getLogger('create_handler')
+    dot_idx = name.rfind('.')
+    if dot_idx == -1:
+        logger.error('Cannot split %s into module/package and attr part.', name)
+        raise ValueError(name)
+    module = import_module(name[:dot_idx])
+    obj = getattr(module, name[dot_idx+1:])
+    if not isinstance(obj, Callable):
+        logger.error('Object %s is not callable, it cannot serve as an operation.', name)
+        raise TypeError(name)
+    return obj
+
+
+def create_handler(path, op_spec, extractor_factory, import_module=importlib.import_module,
+                   trusted_source=None, deadline_header=None, profiling=None, background=None,
+                   resources=None, security=None, metrics=None):
+    """Create handler from given specification.
 
+    If operation enables `x-aubergine-memoize`, each of its extractors gets its own
+    :py:class:`aubergine.extractors.ValidationCache`.
+
+    Limits declared in operation's `x-aubergine-limits` are enforced by the handler's
+    :py:class:`aubergine.admission.AdmissionController`, and the timeout declared in
+    its `x-aubergine-timeout` by the handler's :py:class:`aubergine.deadlines.DeadlinePolicy`.
+
+    Hooks declared in operation's `x-aubergine-hooks` are resolved like its operationId
+    and combined with :py:func:`aubergine.hooks.chain_hooks`. If the operation has security
+    requirements, the policy enforcing them runs before admission and all hooks.
+
+    :param path: path for which the handler is created.
+    :type path: str
+    :param op_spec: specification of the operation.
+    :type op_spec: Mapping
+    :param extractor_factory: factory used for building extractors.
+    :type extractor_factory: :py:class:`aubergine.extractors.ExtractorBuilder`
+    :param import_module: callable used for loading the operation.
+    :type import_module: callable
+    :param trusted_source: predicate telling whether request comes from a trusted caller,
+     whose requests are validated according to operation's `x-aubergine-validation`.
+    :type trusted_source: callable
+    :param deadline_header: name of the header in which clients may pass the deadline of
+     their requests (as seconds since the epoch). If None, such headers are ignored.
+    :type deadline_header: str
+    :param profiling: profiling settings. If None, requests of the operation are never
+     profiled. Otherwise they can be profiled on demand, and at the rate given in
+     operation's `x-aubergine-profile`.
+    :type profiling: :py:class:`aubergine.profiling.ProfileSettings`
+    :param background: executor of tasks scheduled by the operation. If None, the operation
+     can't schedule background tasks.
+    :type background: :py:class:`aubergine.background.BackgroundExecutor`
+    :param resources: registry of resources which operation can declare in its
+     `x-aubergine-resources` extension.
+    :type resources: :py:class:`aubergine.resources.ResourceRegistry`
+    :param security: authenticator enforcing operation's security requirements. If None,
+     they are ignored.
+    :type security: :py:class:`aubergine.security.Authenticator`
+    :param metrics: store in which durations and outcomes of operation's requests are
+     recorded, under its operationId. If None, requests are not recorded.
+    :type metrics: :py:class:`aubergine.metrics.MetricsStore`
+    :rtype: :py:class:`aubergine.handlers.RequestHandler`
+    """
     if 'requestBody' in op_spec:
         body_ex = extractor_factory.build_body_extractor(op_spec['requestBody'])
     else:
@@ -36,18 +120,24 @@ def create_handler(path, op_spec, extractor_factory, import_module=importlib.imp
     for param in op_spec.get('parameters', tuple()):
         param_ex[param['name']] = extractor_factory.build_param_extractor(param)
 
-    op_id = op_spec['operationId']
-    dot_idx = op_spec['operationId'].rfind('.')
-    if dot_idx == -1:
-        logger.error('Cannot split operationId into module/package and attr part.')
-        raise ValueError(op_spec['operationId'])
-    module = import_module(op_id[:dot_idx])
-    operation = getattr(module, op_id[dot_idx+1:])
-    if not isinstance(operation, Callable):
-        logger.error('Object %s is not callable, it cannot serve as an operation.', op_id)
-        raise TypeError(op_id)
+    if op_spec.get(ValidationCache.SPEC_KEY):
+        for extractor in [body_ex, *param_ex.values()]:
+            if extractor is not None:
+                extractor.cache = ValidationCache.from_spec(op_spec)
+
+    operation = resolve_callable(op_spec['operationId'], import_module)
+    hooks = [resolve_callable(name, import_module) for name in declared_hooks(op_spec)]
 
     return RequestHandler(path=path,
                           operation=operation,
                           body_extractor=body_ex,
-                          params_extractors=param_ex)
+                          params_extractors=param_ex,
+                          validation_policy=ValidationPolicy.from_spec(op_spec, trusted_source),
+                          admission=AdmissionController.from_spec(op_spec),
+                          deadline_policy=DeadlinePolicy.from_spec(op_spec, deadline_header),
+                          profiler=RequestProfiler.from_spec(op_spec, profiling),
+                          background=background,
+                          resources=_bind_resources(resources, op_spec, param_ex),
+                          hooks=chain_hooks(hooks),
+                          security=security.policy_for(op_spec) if security is not None else None,
+                          metrics=metrics.bind(op_spec) if metrics is not None else None)
@@ -0,0 +1,79 @@
+"""Validation policies for requests coming from trusted callers."""
+from enum import Enum
+import logging
+import random
+from aubergine.common import Loggable
+
+
+class ValidationMode(Enum):
+    """Possible modes of validating requests of trusted callers."""
+    FULL = 'full'
+    SAMPLED = 'sampled'
+    COERCE = 'coerce'
+
+
+class ValidationPolicy(Loggable):
+    """Policy deciding how requests of trusted callers are validated.
+
+    Requests for which `trusted_source` returns False are always fully validated.
+    Requests of trusted callers are either validated for a fraction `rate` of them, with
+    violations logged but not rejected (SAMPLED mode), or only decoded and coerced to
+    declared types (COERCE mode).
+
+    :param mode: validation mode for trusted callers.
+    :type mode: :py:class:`ValidationMode`
+    :param trusted_source: predicate telling whether request comes from a trusted caller.
+    :type trusted_source: callable accepting :py:class:`falcon.Request`
+    :param rate: fraction of trusted requests validated in SAMPLED mode.
+    :type rate: float
+    :param sample: callable returning random numbers from [0, 1).
+    :type sample: callable
+    """
+    __slots__ = ('mode', 'trusted_source', 'rate', 'sample')
+
+    SPEC_KEY = 'x-aubergine-validation'
+
+    def __init__(self, mode, trusted_source, rate=0.0, sample=random.random):
+        self.mode = mode
+        self.trusted_source = trusted_source
+        self.rate = rate if mode == ValidationMode.SAMPLED else 0.0
+        self.sample = sample
+
+    def should_sample(self):
+        """Tell whether the current trusted request should be validated (without rejecting)."""
+        return self.rate > 0.0 and self.sample() < self.rate
+
+    @classmethod
+    def from_spec(cls, op_spec, trusted_source):
+        """Create policy for operation described by `op_spec`.
+
+        The policy is declared using `x-aubergine-validation` extension, e.g.::
+
+            x-aubergine-validation:
+              mode: sampled
+              rate: 0.01
+
+        :param op_spec: operation's specification.
+        :type op_spec: Mapping
+        :param trusted_source: predicate telling whether request comes from a trusted caller.
+        :type trusted_source: callable or None
+        :returns: policy for the operation or None if all its requests should be fully
+         validated.
+        :rtype: :py:class:`ValidationPolicy` or None
+        :raises ValueError: if mode or rate given in the spec are invalid.
+        """
+        policy_spec = op_spec.get(cls.SPEC_KEY)
+        if policy_spec is None:
+            return None
+        mode = ValidationMode(policy_spec.get('mode', ValidationMode.FULL.value))
+        rate = float(policy_spec.get('rate', 0.0))
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError('Sampling rate should be between 0 and 1, got {}.'.format(rate))
+        if mode == ValidationMode.FULL:
+            return None
+        if trusted_source is None:
+            logging.getLogger(cls.__name__).warning(
+                'Operation %s declares validation policy but no trusted source predicate '
+                'was given, all its requests will be validated.', op_spec.get('operationId'))
+            return None
+        return cls(mode, trusted_source, rate)
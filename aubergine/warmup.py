@@ -0,0 +1,184 @@
+"""Warming up freshly built APIs before they receive traffic."""
+import collections
+import json
+import random
+import threading
+import time
+import falcon
+from aubergine.common import Loggable, join_route
+from aubergine.handlers import WARMUP_STATE
+
+
+WarmupSettings = collections.namedtuple(
+    'WarmupSettings', ['rounds', 'stub_operations', 'readiness_route', 'background', 'seed'])
+WarmupSettings.__new__.__defaults__ = (3, True, '/ready', True, None)
+WarmupSettings.__doc__ = """Settings of the warm-up phase run after the API is built.
+
+:param rounds: number of synthetic valid requests sent to every operation.
+:param stub_operations: if True, operations are replaced by no-op stubs for requests sent
+ during the warm-up, so that only aubergine's part of the handler chain is warmed up. If
+ False, operations are called with the synthetic arguments, which also warms up their
+ lazy imports and caches, but they have to tolerate such requests.
+:param readiness_route: route of the readiness check, not prefixed with the base path
+ (only with the prefix the app is mounted under).
+:param background: if True, the warm-up runs in a background thread and the API is returned
+ immediately, reporting not ready until the warm-up finishes.
+:param seed: seed of the random generator of requests, for reproducible warm-ups.
+"""
+
+WarmupReport = collections.namedtuple('WarmupReport',
+                                      ['requests', 'statuses', 'duration', 'skipped'])
+WarmupReport.__doc__ = """Summary of a finished warm-up.
+
+:param requests: number of sent requests.
+:param statuses: mapping: operationId -> counter of response statuses.
+:param duration: duration of the warm-up, in seconds.
+:param skipped: operationIds of operations that were not warmed up, because they require
+ authentication and aren't stubbed, or all their requests were rejected with 401 or 403.
+"""
+
+UNAUTHORIZED_STATUSES = frozenset([401, 403])
+
+
+class _WarmupOperation:
+    """Operation replaced by a no-op for requests sent by the warm-up."""
+    __slots__ = ('operation',)
+
+    def __init__(self, operation):
+        self.operation = operation
+
+    def __call__(self, **kwargs):
+        if WARMUP_STATE.active:
+            return None
+        return self.operation(**kwargs)
+
+
+class Warmup(Loggable):
+    """Warm-up of a single API, tracking whether it's ready to receive traffic.
+
+    Every operation gets the configured number of synthetic valid requests, generated from
+    its specification by :py:class:`aubergine.loadgen.RequestFactory` and sent through the
+    whole API (routing, extraction, validation and serialization). Warm-up requests bypass
+    admission, so they don't take tokens of rate limits, and authentication of stubbed
+    operations. Operations requiring authentication aren't warmed up unless they're stubbed.
+    Failed requests are logged, but never prevent the API from becoming ready.
+
+    :param app: the app whose API is warmed up.
+    :type app: :py:class:`aubergine.Aubergine`
+    :param settings: settings of the warm-up.
+    :type settings: :py:class:`WarmupSettings`
+    """
+
+    def __init__(self, app, settings):
+        self.app = app
+        self.settings = settings
+        self.report = None
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self):
+        """Tell whether the warm-up has finished."""
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Wait until the warm-up finishes.
+
+        :returns: True if the warm-up finished, False if the timeout passed first.
+        :rtype: bool
+        """
+        return self._done.wait(timeout)
+
+    def start(self, api):
+        """Warm up given API, in a background thread if configured so."""
+        if self.settings.background:
+            self._thread = threading.Thread(target=self.run, args=(api,),
+                                            name='aubergine-warmup', daemon=True)
+            self._thread.start()
+        else:
+            self.run(api)
+
+    def run(self, api):
+        """Warm up given API in the current thread and mark it ready afterwards."""
+        try:
+            self.report = self._send_requests(api)
+            self.logger.info('Warm-up finished: %d requests in %.2fs', self.report.requests,
+                             self.report.duration)
+        except Exception: # pylint: disable=broad-except
+            self.logger.exception('Warm-up failed, marking the API ready anyway.')
+        finally:
+            self._done.set()
+
+    def _send_requests(self, api):
+        # Imported here, so that importing aubergine doesn't load falcon.testing and loadgen.
+        # pylint: disable=import-outside-toplevel
+        from aubergine.loadgen import RequestFactory, TestClientTarget
+        base_path = self.app.prefix + self.app.get_base_path()
+        factory = RequestFactory(self.app.spec_dict, base_path,
+                                 rng=random.Random(self.settings.seed))
+        target = TestClientTarget(api)
+        handlers = [handler for route_handlers in self.app.routes.values()
+                    for handler in route_handlers.values()]
+        skipped = []
+        operations = []
+        for operation in factory.operations:
+            op_id, meth, path, _ = operation
+            handler = self.app.routes[join_route(base_path, path)][meth.lower()]
+            if handler.security is not None and not self.settings.stub_operations:
+                self.logger.info('Not warming up %s, which requires authentication.', op_id)
+                skipped.append(op_id)
+            else:
+                operations.append(operation)
+        if self.settings.stub_operations:
+            for handler in handlers:
+                handler.operation = _WarmupOperation(handler.operation)
+        statuses = collections.defaultdict(collections.Counter)
+        start = time.perf_counter()
+        WARMUP_STATE.active = True
+        try:
+            for _ in range(self.settings.rounds):
+                for operation in operations:
+                    request = factory.generate(operation)
+                    status = target.send(request)
+                    if status >= 500:
+                        self.logger.warning('Warm-up request to %s failed with %d.',
+                                            request.operation_id, status)
+                    statuses[request.operation_id][status] += 1
+        finally:
+            WARMUP_STATE.active = False
+            if self.settings.stub_operations:
+                for handler in handlers:
+                    if isinstance(handler.operation, _WarmupOperation):
+                        handler.operation = handler.operation.operation
+        for op_id, counts in statuses.items():
+            if set(counts) <= UNAUTHORIZED_STATUSES:
+                self.logger.warning('All warm-up requests to %s were rejected as unauthorized.',
+                                    op_id)
+                skipped.append(op_id)
+        return WarmupReport(requests=sum(sum(counts.values()) for counts in statuses.values()),
+                            statuses=dict(statuses), duration=time.perf_counter() - start,
+                            skipped=tuple(skipped))
+
+
+class ReadinessResource:
+    """Resource reporting whether the API finished its warm-up.
+
+    Responds with 200 once the warm-up has finished, and with 503 before that, so that
+    load balancers don't route traffic to workers that are still cold.
+
+    :param warmup: warm-up of the API.
+    :type warmup: :py:class:`Warmup`
+    """
+    __slots__ = ('warmup',)
+
+    def __init__(self, warmup):
+        self.warmup = warmup
+
+    def on_get(self, req, resp): # pylint: disable=unused-argument
+        """Report readiness of the API."""
+        if self.warmup.ready:
+            resp.body = json.dumps({'status': 'ready'})
+        else:
+            resp.status = falcon.HTTP_503
+            resp.set_header('Retry-After', '1')
+            resp.body = json.dumps({'status': 'warming up'})
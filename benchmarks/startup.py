@@ -0,0 +1,202 @@
+"""Benchmark of aubergine's startup time and memory across synthetic specs of growing size.
+
+Every spec size is measured in a separate interpreter, so that measurements of larger
+specs are not affected by garbage left by smaller ones. Results are written as JSON::
+
+    python benchmarks/startup.py --sizes 10 100 1000 10000 -o startup.json
+
+Besides per-phase numbers, the output contains `scaling`: ratios of build time between
+consecutive sizes divided by ratio of the sizes. Values noticeably above 1 indicate
+super-linear behaviour.
+"""
+import argparse
+import functools
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+import yaml
+from aubergine import Aubergine
+from aubergine.timing import BuildTimer
+
+
+# Schemas reference only these leaf models, so that (inlined) references don't chain and
+# the expanded spec grows linearly with the number of schemas.
+NUM_LEAVES = 5
+
+SCALAR_TYPES = ({'type': 'string'}, {'type': 'integer', 'format': 'int64'},
+                {'type': 'number'}, {'type': 'string', 'maxLength': 64})
+
+
+def generate_spec(num_operations):
+    """Generate OpenAPI spec with given number of operations.
+
+    Operations come in pairs (GET with query and path parameters, POST with a body) on
+    separate paths. Bodies and responses reference a pool of component schemas, which in
+    turn reference a few leaf schemas, and a few parameters are shared components.
+    """
+    num_schemas = max(NUM_LEAVES, num_operations // 20)
+    schemas = {}
+    for idx in range(num_schemas):
+        properties = {'field{}'.format(num): dict(SCALAR_TYPES[(idx + num) % len(SCALAR_TYPES)])
+                      for num in range(6)}
+        if idx >= NUM_LEAVES:
+            properties['parent'] = {
+                '$ref': '#/components/schemas/Model{}'.format(idx % NUM_LEAVES)}
+            properties['siblings'] = {'type': 'array', 'items': {
+                '$ref': '#/components/schemas/Model{}'.format((idx + 1) % NUM_LEAVES)}}
+        schemas['Model{}'.format(idx)] = {'type': 'object', 'required': ['field0'],
+                                          'properties': properties}
+    parameters = {
+        'Limit': {'name': 'limit', 'in': 'query', 'schema': {'type': 'integer'}},
+        'Offset': {'name': 'offset', 'in': 'query', 'schema': {'type': 'integer'}},
+        'RequestId': {'name': 'X-Request-Id', 'in': 'header', 'schema': {'type': 'string'}}}
+    paths = {}
+    for idx in range(0, num_operations, 2):
+        schema_ref = {'$ref': '#/components/schemas/Model{}'.format(idx % num_schemas)}
+        response = {'200': {'description': 'ok',
+                            'content': {'application/json': {'schema': schema_ref}}}}
+        paths['/resource{}/{{id}}'.format(idx)] = {
+            'get': {'operationId': 'ops.get_{}'.format(idx),
+                    'parameters': [{'$ref': '#/components/parameters/Limit'},
+                                   {'$ref': '#/components/parameters/Offset'},
+                                   {'$ref': '#/components/parameters/RequestId'},
+                                   {'name': 'id', 'in': 'path', 'required': True,
+                                    'schema': {'type': 'integer'}},
+                                   {'name': 'filter{}'.format(idx), 'in': 'query',
+                                    'schema': {'type': 'string'}}],
+                    'responses': response}}
+        if idx + 1 < num_operations:
+            paths['/resource{}'.format(idx)] = {
+                'post': {'operationId': 'ops.create_{}'.format(idx),
+                         'requestBody': {'required': True, 'content': {
+                             'application/json': {'schema': dict(schema_ref)}}},
+                         'responses': response}}
+    return {'openapi': '3.0.0', 'info': {'title': 'Synthetic', 'version': '1.0.0'},
+            'servers': [{'url': '/api'}], 'paths': paths,
+            'components': {'schemas': schemas, 'parameters': parameters}}
+
+
+class _Operations(types.ModuleType):
+    """Module-like object providing a no-op operation for every operationId."""
+
+    def __getattr__(self, name):
+        return lambda **kwargs: None
+
+
+def _object_count():
+    gc.collect()
+    return len(gc.get_objects())
+
+
+def _measure_phase(func, trace):
+    objects_before = _object_count()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, {'seconds': seconds, 'peak_bytes': peak,
+                    'objects': _object_count() - objects_before}
+
+
+def measure(spec_path, lazy=False):
+    """Measure loading the spec and building the API, in the current interpreter.
+
+    Times are measured in a run without memory tracing, and peak memory in a separate,
+    traced run, since tracing slows allocations down considerably.
+    """
+    operations = _Operations('ops')
+    results = {}
+    for trace in (False, True):
+        timer = BuildTimer()
+        app, load = _measure_phase(
+            lambda: Aubergine.from_file(spec_path, lazy=lazy, timer=timer), trace)
+        _, build = _measure_phase(
+            functools.partial(app.build_api, import_module=lambda name: operations, timer=timer),
+            trace)
+        if trace:
+            results['from_file']['peak_bytes'] = load['peak_bytes']
+            results['build_api']['peak_bytes'] = build['peak_bytes']
+        else:
+            results['from_file'] = load
+            results['build_api'] = build
+            results['phases'] = {phase: timing.seconds
+                                 for phase, timing in timer.report().items()}
+        del app
+    return results
+
+
+def run_size(num_operations, directory, lazy):
+    """Generate spec of given size and measure it in a fresh interpreter."""
+    spec_path = os.path.join(directory, 'spec_{}.yml'.format(num_operations))
+    with open(spec_path, 'w') as spec_file:
+        yaml.safe_dump(generate_spec(num_operations), spec_file, default_flow_style=False)
+    result_path = spec_path + '.json'
+    command = [sys.executable, os.path.abspath(__file__), '--child', spec_path,
+               '--output', result_path]
+    if lazy:
+        command.append('--lazy')
+    # build_api greets on stdout, so the child writes its results to a file.
+    subprocess.check_call(command, stdout=subprocess.DEVNULL)
+    with open(result_path) as result_file:
+        result = json.load(result_file)
+    result['operations'] = num_operations
+    result['spec_bytes'] = os.path.getsize(spec_path)
+    return result
+
+
+def scaling(results):
+    """Compute ratios of build time growth to spec size growth between consecutive sizes."""
+    ratios = []
+    for smaller, larger in zip(results, results[1:]):
+        size_ratio = larger['operations'] / smaller['operations']
+        ratios.append({
+            'from': smaller['operations'], 'to': larger['operations'],
+            'from_file': larger['from_file']['seconds'] / smaller['from_file']['seconds']
+                         / size_ratio,
+            'build_api': larger['build_api']['seconds'] / smaller['build_api']['seconds']
+                         / size_ratio})
+    return ratios
+
+
+def main(argv=None):
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                        help='numbers of operations in generated specs')
+    parser.add_argument('--lazy', action='store_true', help='load specs with SpecLoader')
+    parser.add_argument('-o', '--output', default='-', help='path of JSON output, "-" for stdout')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        with open(args.output, 'w') as output:
+            json.dump(measure(args.child, lazy=args.lazy), output)
+        return 0
+    with tempfile.TemporaryDirectory() as directory:
+        results = []
+        for size in sorted(args.sizes):
+            sys.stderr.write('Measuring {} operations...\n'.format(size))
+            results.append(run_size(size, directory, args.lazy))
+    report = json.dumps({'python': platform.python_version(), 'lazy': args.lazy,
+                         'results': results, 'scaling': scaling(results)}, indent=2)
+    if args.output == '-':
+        sys.stdout.write(report + '\n')
+    else:
+        with open(args.output, 'w') as output:
+            output.write(report + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
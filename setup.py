@@ -26,5 +26,6 @@ setup(
     author='Konrad Jałowiecki <dexter2206@gmail.com>',
     author_email='dexter2206@gmail.com',
     packages=find_packages(exclude=['tests', 'tests.*', 'examples']),
+    entry_points={'console_scripts': ['aubergine=aubergine.cli:main']},
     keywords='openapi rest api'
 )
@@ -0,0 +1,154 @@
+"""Fixtures and helpers shared by test modules."""
+import sys
+import types
+import pytest
+from aubergine.compiler import compile_app
+
+
+BOOKSTORE_OPERATIONS = {
+    'get_all': lambda **kwargs: sorted(kwargs.items()),
+    'add_book': lambda body: dict(body, id=1)}
+
+SPEC_CONTENT = """
+openapi: "3.0.0"
+servers:
+  - url: /v1/rest
+info:
+  version: 1.0.0
+  title: Bookstore
+  description: A sample API for testing aubergine's main class
+  termsOfService: http://swagger.io/terms/
+  contact:
+    name: dexter2206
+    email: dexter2206@gmail.com
+  license:
+    name: MIT
+paths:
+  /books:
+    get:
+      operationId: bookstore.get_all
+      parameters:
+        - name: type
+          in: query
+          description: genre to filter by
+          required: false
+          schema:
+            type: string
+        - name: limit
+          in: query
+          description: maximum number of books to return
+          required: false
+          schema:
+            type: integer
+            format: int32
+      responses:
+        '200':
+          description: book response
+          content:
+            application/json:
+              schema:
+                type: array
+                items:
+                  $ref: '#/components/schemas/Book'
+        default:
+          description: unexpected error
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Error'
+    post:
+      description: Creates a new book in the store.
+      operationId: bookstore.add_book
+      requestBody:
+        description: Book to add to the store
+        required: true
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/NewBook'
+      responses:
+        '200':
+          description: book response
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Book'
+        default:
+          description: unexpected error
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Error'
+components:
+  schemas:
+    Book:
+      required:
+        - id
+        - title
+      properties:
+        id:
+          type: integer
+          format: int64
+        title:
+          type: string
+        author:
+          type: string
+        genre:
+          type: string
+    NewBook:
+      required:
+        - title
+      properties:
+        title:
+          type: string
+        author:
+          type: string
+        genre:
+          type: string
+    Error:
+      required:
+        - code
+        - message
+      properties:
+        code:
+          type: integer
+          format: int32
+        message:
+          type: string
+"""
+
+
+def compile_module(app, name='compiled'):
+    """Compile given app and import the resulting module."""
+    module = types.ModuleType(name)
+    exec(compile_app(app), module.__dict__) # pylint: disable=exec-used
+    return module
+
+def compiled_api(app):
+    """Compile given app and get API of the resulting module."""
+    return compile_module(app).api
+
+
+@pytest.fixture(name='bookstore_operations')
+def _bookstore_operations():
+    """Fixture providing functions overriding or adding bookstore operations.
+
+    Test modules override it to change behaviour of operations for all their tests.
+    """
+    return {}
+
+@pytest.fixture(name='bookstore')
+def _bookstore(request, monkeypatch, mocker, bookstore_operations):
+    """Fixture providing fake bookstore module with operations used in the bookstore spec.
+
+    Every operation is a mock calling function from :py:data:`BOOKSTORE_OPERATIONS`, or
+    from `bookstore_operations` fixture. Single tests can pass further overrides by
+    parametrizing this fixture indirectly with a mapping: operation name -> function.
+    """
+    operations = dict(BOOKSTORE_OPERATIONS, **bookstore_operations)
+    operations.update(getattr(request, 'param', {}))
+    module = types.ModuleType('bookstore')
+    for name, func in operations.items():
+        setattr(module, name, mocker.Mock(side_effect=func))
+    monkeypatch.setitem(sys.modules, 'bookstore', module)
+    return module
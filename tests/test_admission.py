@@ -0,0 +1,142 @@
+"""Test cases for admission control."""
+from falcon import HTTPServiceUnavailable, HTTPTooManyRequests, Request, testing
+import pytest
+import ymlref
+from aubergine import Aubergine
+from aubergine.admission import AdmissionController, TokenBucket
+from aubergine.common import to_plain
+from aubergine.handlers import RequestHandler
+from tests.conftest import SPEC_CONTENT, compiled_api
+
+
+class FakeClock:
+    """Clock whose time is advanced manually."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(name='clock')
+def _clock():
+    """Fixture providing fake clock."""
+    return FakeClock()
+
+@pytest.fixture(name='http_req')
+def _http_req(mocker):
+    """Fixture providing HTTP Request mock."""
+    return mocker.Mock(spec=Request)
+
+def test_bucket_refills(clock):
+    """TokenBucket should allow bursts up to its capacity and refill at its rate."""
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.retry_after() == pytest.approx(0.5)
+    clock.now = 0.5
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    clock.now = 10.0
+    assert bucket.tokens <= 2.0
+    assert bucket.try_acquire()
+
+def test_no_controller_without_limits():
+    """AdmissionController.from_spec should return None if operation declares no limits."""
+    assert AdmissionController.from_spec({'operationId': 'a.b'}) is None
+
+def test_controller_from_spec():
+    """AdmissionController.from_spec should build controller from x-aubergine-limits."""
+    controller = AdmissionController.from_spec(
+        {'x-aubergine-limits': {'concurrency': 4, 'rate': 10, 'burst': 3, 'retry-after': 5}})
+    assert controller.concurrency == 4
+    assert controller.bucket.rate == 10.0
+    assert controller.bucket.capacity == 3.0
+    assert controller.retry_after == 5
+
+@pytest.mark.parametrize('limits', [{'rate': 0}, {'rate': -1}, {'rate': 5, 'burst': 0.5},
+                                    {'concurrency': 0}])
+def test_rejects_limits_refusing_everything(limits):
+    """AdmissionController.from_spec should refuse limits which would reject all requests."""
+    with pytest.raises(ValueError):
+        AdmissionController.from_spec({'x-aubergine-limits': limits})
+
+def test_rejects_invalid_status():
+    """AdmissionController should accept only 429 and 503 as rejection statuses."""
+    with pytest.raises(ValueError):
+        AdmissionController(concurrency=1, status=500)
+
+def test_rejects_over_rate(clock):
+    """AdmissionController should reject rate limited requests with 429 and Retry-After."""
+    controller = AdmissionController(bucket=TokenBucket(rate=0.5, capacity=1, clock=clock))
+    controller.admit()
+    with pytest.raises(HTTPTooManyRequests) as exc_info:
+        controller.admit()
+    assert exc_info.value.headers['Retry-After'] == '2'
+
+def test_rejects_over_concurrency():
+    """AdmissionController should reject requests over concurrency limit until released."""
+    controller = AdmissionController(concurrency=1, retry_after=3)
+    controller.admit()
+    with pytest.raises(HTTPServiceUnavailable) as exc_info:
+        controller.admit()
+    assert exc_info.value.headers['Retry-After'] == '3'
+    controller.release()
+    controller.admit()
+
+def test_concurrency_rejections_keep_tokens(clock):
+    """Requests rejected over concurrency limit should not use up the rate limit."""
+    controller = AdmissionController(concurrency=1,
+                                     bucket=TokenBucket(rate=0.5, capacity=2, clock=clock))
+    controller.admit()
+    for _ in range(3):
+        with pytest.raises(HTTPServiceUnavailable):
+            controller.admit()
+    controller.release()
+    controller.admit()
+
+def test_uses_configured_status():
+    """AdmissionController should use configured status for all rejections."""
+    controller = AdmissionController(concurrency=1, status=429)
+    controller.admit()
+    with pytest.raises(HTTPTooManyRequests):
+        controller.admit()
+
+def test_handler_rejects_before_extraction(http_req, mocker):
+    """RequestHandler should reject requests before using any of its extractors."""
+    extractor = mocker.Mock()
+    operation = mocker.Mock()
+    handler = RequestHandler(path='/a', operation=operation, body_extractor=extractor,
+                             params_extractors={'id': extractor},
+                             admission=AdmissionController(concurrency=1))
+    handler.admission.admit()
+    with pytest.raises(HTTPServiceUnavailable):
+        handler.handle_request(http_req, mocker.Mock())
+    extractor.extract.assert_not_called()
+    operation.assert_not_called()
+
+def test_handler_releases_on_error(http_req, mocker):
+    """RequestHandler should release concurrency slot even if the operation fails."""
+    operation = mocker.Mock(side_effect=RuntimeError)
+    handler = RequestHandler(path='/a', operation=operation, body_extractor=None,
+                             params_extractors={},
+                             admission=AdmissionController(concurrency=1))
+    with pytest.raises(RuntimeError):
+        handler.handle_request(http_req, mocker.Mock())
+    handler.admission.admit()
+
+@pytest.mark.usefixtures('bookstore')
+@pytest.mark.parametrize('create_api', [Aubergine.build_api, compiled_api])
+def test_api_enforces_declared_limits(create_api):
+    """Built and compiled APIs should reject requests over limits shared by GET and HEAD."""
+    spec_dict = to_plain(ymlref.load(SPEC_CONTENT))
+    spec_dict['paths']['/books']['get']['x-aubergine-limits'] = {'rate': 0.001, 'burst': 2}
+    client = testing.TestClient(create_api(Aubergine(spec_dict)))
+    assert client.simulate_get('/v1/rest/books').status_code == 200
+    assert client.simulate_head('/v1/rest/books').status_code == 200
+    result = client.simulate_get('/v1/rest/books')
+    assert result.status_code == 429
+    assert result.headers['Retry-After']
+    assert client.simulate_post('/v1/rest/books', body='{"title": "Dune"}').status_code == 200
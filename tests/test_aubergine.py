@@ -5,6 +5,7 @@ import pytest
 import ymlref
 from aubergine.extractors import ExtractorBuilder
 from aubergine import Aubergine
+from tests.conftest import SPEC_CONTENT
 
 
 @pytest.fixture(name='mock_open')
@@ -61,111 +62,3 @@ def test_respects_base_path(api_factory, extractor_factory, import_module, spec_
     app = Aubergine(spec_dict)
     app.build_api(api_factory, ex_factory=extractor_factory, import_module=import_module)
     api_factory().add_route.assert_called_once_with('/v1/rest/books', mocker.ANY)
-
-SPEC_CONTENT = """
-openapi: "3.0.0"
-servers:
-  - url: /v1/rest
-info:
-  version: 1.0.0
-  title: Bookstore
-  description: A sample API for testing aubergine's main class
-  termsOfService: http://swagger.io/terms/
-  contact:
-    name: dexter2206
-    email: dexter2206@gmail.com
-  license:
-    name: MIT
-paths:
-  /books:
-    get:
-      operationId: bookstore.get_all
-      parameters:
-        - name: type
-          in: query
-          description: genre to filter by
-          required: false
-          schema:
-            type: string
-        - name: limit
-          in: query
-          description: maximum number of books to return
-          required: false
-          schema:
-            type: integer
-            format: int32
-      responses:
-        '200':
-          description: book response
-          content:
-            application/json:
-              schema:
-                type: array
-                items:
-                  $ref: '#/components/schemas/Book'
-        default:
-          description: unexpected error
-          content:
-            application/json:
-              schema:
-                $ref: '#/components/schemas/Error'
-    post:
-      description: Creates a new book in the store.
-      operationId: bookstore.add_book
-      requestBody:
-        description: Book to add to the store
-        required: true
-        content:
-          application/json:
-            schema:
-              $ref: '#/components/schemas/NewBook'
-      responses:
-        '200':
-          description: book response
-          content:
-            application/json:
-              schema:
-                $ref: '#/components/schemas/Book'
-        default:
-          description: unexpected error
-          content:
-            application/json:
-              schema:
-                $ref: '#/components/schemas/Error'
-components:
-  schemas:
-    Book:
-      required:
-        - id
-        - title
-      properties:
-        id:
-          type: integer
-          format: int64
-        title:
-          type: string
-        author:
-          type: string
-        genre:
-          type: string
-    NewBook:
-      required:
-        - title
-      properties:
-        title:
-          type: string
-        author:
-          type: string
-        genre:
-          type: string
-    Error:
-      required:
-        - code
-        - message
-      properties:
-        code:
-          type: integer
-          format: int32
-        message:
-          type: string
-"""
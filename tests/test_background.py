@@ -0,0 +1,81 @@
+"""Test cases for background tasks."""
+import threading
+from falcon import HTTPNotFound, Request
+import pytest
+from aubergine.background import BackgroundExecutor, schedule
+from aubergine.handlers import RequestHandler
+
+
+@pytest.fixture(name='executor')
+def _executor():
+    """Fixture providing background executor, shut down after the test."""
+    executor = BackgroundExecutor(max_workers=2, max_pending=2)
+    yield executor
+    executor.shutdown(timeout=5)
+
+@pytest.fixture(name='http_req')
+def _http_req(mocker):
+    """Fixture providing HTTP Request mock."""
+    return mocker.Mock(spec=Request)
+
+def test_schedule_requires_request():
+    """The schedule function should refuse to work outside of a request."""
+    with pytest.raises(RuntimeError):
+        schedule(print, 'lost')
+
+def test_runs_tasks_and_counts_them(executor):
+    """BackgroundExecutor should run tasks and count completed and failed ones."""
+    results = []
+    executor.submit(results.append, 1)
+    executor.submit(lambda: 1 / 0)
+    assert executor.drain(timeout=5)
+    assert results == [1]
+    stats = executor.stats()
+    assert (stats.submitted, stats.completed, stats.failed, stats.pending) == (2, 1, 1, 0)
+
+def test_drops_tasks_over_limit(executor):
+    """BackgroundExecutor should drop tasks above its pending limit."""
+    release = threading.Event()
+    assert executor.submit(release.wait)
+    assert executor.submit(release.wait)
+    assert not executor.submit(release.wait)
+    assert executor.stats().rejected == 1
+    assert executor.stats().pending == 2
+    release.set()
+    assert executor.drain(timeout=5)
+
+def test_rejects_after_shutdown(executor):
+    """BackgroundExecutor should not accept tasks once it's shut down."""
+    assert executor.shutdown(timeout=5)
+    assert not executor.submit(print)
+
+def test_handler_runs_tasks_after_response(executor, http_req, mocker):
+    """RequestHandler should submit scheduled tasks only after the response is set."""
+    resp = mocker.Mock()
+    seen = []
+
+    def _operation():
+        schedule(lambda: seen.append(resp.body))
+        return {'ok': True}
+
+    handler = RequestHandler(path='/a', operation=_operation, body_extractor=None,
+                             params_extractors={}, background=executor)
+    handler.handle_request(http_req, resp)
+    assert executor.drain(timeout=5)
+    assert seen == ['{"ok": true}']
+
+def test_handler_discards_tasks_of_failed_requests(executor, http_req, mocker):
+    """RequestHandler should not run tasks scheduled by operations that raised."""
+    task = mocker.Mock()
+
+    def _operation():
+        schedule(task)
+        raise HTTPNotFound()
+
+    handler = RequestHandler(path='/a', operation=_operation, body_extractor=None,
+                             params_extractors={}, background=executor)
+    with pytest.raises(HTTPNotFound):
+        handler.handle_request(http_req, mocker.Mock())
+    assert executor.drain(timeout=5)
+    task.assert_not_called()
+    assert executor.stats().submitted == 0
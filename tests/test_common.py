@@ -34,3 +34,12 @@ def test_names_logger_accordingly(mocker, logger_name, loggable):
     logger = loggable.logger
     assert logger == get_logger_method.return_value
     get_logger_method.assert_called_once_with(logger_name)
+
+def test_deep_sizeof_counts_shared_once():
+    """The deep_sizeof function should count objects shared via `seen` only once."""
+    shared = list(range(100))
+    first = common.deep_sizeof({'a': shared})
+    seen = set()
+    common.deep_sizeof({'a': shared}, seen)
+    assert common.deep_sizeof({'b': shared}, seen) < first
+    assert first > common.deep_sizeof(shared)
@@ -0,0 +1,111 @@
+"""Test cases for ahead-of-time compilation of aubergine apps."""
+import json
+import falcon
+from falcon import testing
+import pytest
+import ymlref
+from aubergine.common import to_plain
+from aubergine import Aubergine, RawResponse
+from aubergine.cli import main
+from aubergine.compiler import compile_app
+from tests.conftest import SPEC_CONTENT, compile_module, compiled_api
+
+
+pytestmark = pytest.mark.usefixtures('bookstore')
+
+@pytest.fixture(name='app', scope='module')
+def _app():
+    """Fixture providing Aubergine app for the bookstore spec."""
+    return Aubergine(ymlref.load(SPEC_CONTENT))
+
+@pytest.fixture(name='compiled')
+def _compiled(app):
+    """Fixture providing module compiled from the bookstore spec."""
+    return compile_module(app, 'compiled_bookstore')
+
+REQUESTS = [
+    ('GET', '/v1/rest/books', '', None),
+    ('GET', '/v1/rest/books', 'type=horror&limit=10', None),
+    ('GET', '/v1/rest/books', 'limit=ten', None),
+    ('POST', '/v1/rest/books', '', {'title': 'Dune', 'author': 'Herbert'}),
+    ('POST', '/v1/rest/books', '', {'author': 'Herbert'}),
+    ('POST', '/v1/rest/books', '', {'title': 'Dune', 'pages': 412}),
+    ('HEAD', '/v1/rest/books', 'limit=10', None),
+    ('OPTIONS', '/v1/rest/books', '', None),
+    ('PUT', '/v1/rest/books', '', None)]
+
+@pytest.mark.parametrize('method,path,query,body', REQUESTS)
+def test_behaves_as_built_api(app, compiled, method, path, query, body):
+    """API from compiled module should respond the same way as the one built at runtime."""
+    expected_client = testing.TestClient(app.build_api())
+    compiled_client = testing.TestClient(compiled.api)
+    kwargs = {'query_string': query}
+    if body is not None:
+        kwargs['body'] = json.dumps(body)
+    try:
+        expected = expected_client.simulate_request(method, path, **kwargs)
+    except Exception as exc: # pylint: disable=broad-except
+        with pytest.raises(type(exc)):
+            compiled_client.simulate_request(method, path, **kwargs)
+        return
+    result = compiled_client.simulate_request(method, path, **kwargs)
+    assert result.status == expected.status
+    assert (result.json if result.text else None) == (
+        expected.json if expected.text else None)
+
+def test_defines_handlers(compiled):
+    """Compiled module should contain one handler function per operation and a route table."""
+    assert callable(compiled.handle_bookstore_get_all)
+    assert callable(compiled.handle_bookstore_add_book)
+    assert compiled.ROUTES[0][0] == '/v1/rest/books'
+    assert isinstance(compiled.create_api(), falcon.API)
+
+def test_cli_writes_module(tmpdir):
+    """The `aubergine compile` command should write compiled module to given file."""
+    spec_file = tmpdir.join('spec.yml')
+    spec_file.write(SPEC_CONTENT)
+    output = tmpdir.join('app.py')
+    assert main(['compile', str(spec_file), '-o', str(output)]) == 0
+    assert 'def handle_bookstore_get_all(req, resp, **kwargs):' in output.read()
+
+def test_passes_raw_responses(app, bookstore):
+    """Handlers from compiled module should send raw responses without serializing them."""
+    bookstore.get_all = lambda **kwargs: RawResponse(b'["cached"]', status=203)
+    result = testing.TestClient(compiled_api(app)).simulate_get('/v1/rest/books')
+    assert result.status == falcon.HTTP_203
+    assert result.content == b'["cached"]'
+
+def test_applies_defaults(bookstore):
+    """Compiled and runtime APIs should both apply defaults of absent optional parameters."""
+    spec = SPEC_CONTENT.replace('            format: int32\n      responses:',
+                                '            format: int32\n            default: 25\n'
+                                '      responses:', 1)
+    app = Aubergine(ymlref.load(spec))
+    for api in (app.build_api(), compiled_api(app)):
+        result = testing.TestClient(api).simulate_get('/v1/rest/books')
+        assert result.json == [['limit', 25]]
+
+@pytest.mark.parametrize('extension', [
+    {'x-aubergine-resources': ['db']},
+    {'security': [{'token': []}]},
+    {'security': [{}, {'token': []}]}])
+def test_refuses_unsupported_extensions(extension):
+    """Compiling operations declaring resources or security requirements should fail."""
+    spec_dict = to_plain(ymlref.load(SPEC_CONTENT))
+    spec_dict['paths']['/books']['get'].update(extension)
+    with pytest.raises(ValueError):
+        compile_app(Aubergine(spec_dict))
+
+def test_refuses_spec_wide_security():
+    """Compiling specs with spec-wide security requirements should fail, unless they're
+    optional or overridden by operations."""
+    spec_dict = to_plain(ymlref.load(SPEC_CONTENT))
+    spec_dict['security'] = [{'token': []}]
+    with pytest.raises(ValueError):
+        compile_app(Aubergine(spec_dict))
+    for op_spec in spec_dict['paths']['/books'].values():
+        op_spec['security'] = []
+    assert compile_app(Aubergine(spec_dict))
+    spec_dict['security'] = [{}]
+    del spec_dict['paths']['/books']['get']['security']
+    assert compile_app(Aubergine(spec_dict))
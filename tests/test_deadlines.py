@@ -0,0 +1,136 @@
+"""Test cases for per-request deadlines."""
+import asyncio
+from falcon import HTTPBadRequest, HTTPGatewayTimeout, Request, testing
+import pytest
+import ymlref
+from aubergine import Aubergine
+from aubergine.common import to_plain
+from aubergine.deadlines import (Deadline, DeadlinePolicy, current_deadline, deadline_scope,
+                                 remaining_budget, run_coroutine)
+from aubergine.handlers import RequestHandler
+from tests.conftest import SPEC_CONTENT, compiled_api
+
+
+class FakeClock:
+    """Clock whose time is advanced manually."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(name='clock')
+def _clock():
+    """Fixture providing fake clock."""
+    return FakeClock()
+
+@pytest.fixture(name='http_req')
+def _http_req(mocker):
+    """Fixture providing HTTP Request mock without any headers."""
+    req = mocker.Mock(spec=Request)
+    req.get_header.return_value = None
+    return req
+
+def test_no_policy_without_timeout_and_header():
+    """DeadlinePolicy.from_spec should return None if requests cannot have deadlines."""
+    assert DeadlinePolicy.from_spec({'operationId': 'a.b'}) is None
+    assert DeadlinePolicy.from_spec({'operationId': 'a.b'}, 'X-Deadline') is not None
+
+@pytest.mark.parametrize('timeout', [0, -1, 'nan', 'inf'])
+def test_rejects_invalid_timeout(timeout):
+    """DeadlinePolicy.from_spec should reject timeouts which are not positive and finite."""
+    with pytest.raises(ValueError):
+        DeadlinePolicy.from_spec({'x-aubergine-timeout': timeout})
+
+def test_uses_earlier_deadline(clock, http_req):
+    """DeadlinePolicy should use the earlier of operation's timeout and client's deadline."""
+    policy = DeadlinePolicy(timeout=2.0, header='X-Deadline', clock=clock)
+    assert policy.deadline_for(http_req).expires == 1002.0
+    http_req.get_header.return_value = '1001.5'
+    assert policy.deadline_for(http_req).expires == 1001.5
+    http_req.get_header.return_value = '1005'
+    assert policy.deadline_for(http_req).expires == 1002.0
+
+@pytest.mark.parametrize('header', ['tomorrow', 'nan', 'inf', '-inf'])
+def test_rejects_malformed_header(clock, http_req, header):
+    """DeadlinePolicy should respond with 400 to malformed or non-finite deadline headers."""
+    http_req.get_header.return_value = header
+    with pytest.raises(HTTPBadRequest):
+        DeadlinePolicy(header='X-Deadline', clock=clock).deadline_for(http_req)
+
+def test_deadline_budget(clock):
+    """Deadline should report remaining budget and raise 504 once expired."""
+    deadline = Deadline(1001.0, clock)
+    assert deadline.remaining() == 1.0
+    deadline.check()
+    clock.now = 1002.0
+    assert deadline.remaining() == 0.0
+    with pytest.raises(HTTPGatewayTimeout):
+        deadline.check()
+
+def test_deadline_scope(clock):
+    """The deadline_scope should make deadline current only within its block."""
+    deadline = Deadline(1003.0, clock)
+    assert remaining_budget() is None
+    with deadline_scope(deadline):
+        assert current_deadline() is deadline
+        assert remaining_budget() == 3.0
+    assert current_deadline() is None
+
+def test_cancels_coroutine():
+    """The run_coroutine function should cancel coroutines running past the deadline."""
+    cancelled = []
+
+    async def _slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with pytest.raises(HTTPGatewayTimeout):
+        run_coroutine(_slow(), Deadline(0.01, lambda: 0.0))
+    assert cancelled
+
+def test_handler_rejects_expired_request(clock, http_req, mocker):
+    """RequestHandler should reject requests past their deadline before extraction."""
+    extractor = mocker.Mock()
+    operation = mocker.Mock()
+    http_req.get_header.return_value = '999'
+    handler = RequestHandler(path='/a', operation=operation, body_extractor=extractor,
+                             params_extractors={'id': extractor},
+                             deadline_policy=DeadlinePolicy(header='X-Deadline', clock=clock))
+    with pytest.raises(HTTPGatewayTimeout):
+        handler.handle_request(http_req, mocker.Mock())
+    extractor.extract.assert_not_called()
+    operation.assert_not_called()
+
+def test_handler_passes_budget_to_async_operation(clock, http_req, mocker):
+    """RequestHandler should run async operations with the request's deadline current."""
+    async def _operation():
+        return remaining_budget()
+
+    resp = mocker.Mock()
+    handler = RequestHandler(path='/a', operation=_operation, body_extractor=None,
+                             params_extractors={},
+                             deadline_policy=DeadlinePolicy(timeout=5.0, clock=clock))
+    handler.handle_request(http_req, resp)
+    assert resp.body == '5.0'
+
+async def _slow_get_all(**kwargs):
+    await asyncio.sleep(10 if kwargs.get('limit') else 0)
+    return remaining_budget()
+
+@pytest.mark.parametrize('bookstore', [{'get_all': _slow_get_all}], indirect=True)
+@pytest.mark.parametrize('create_api', [Aubergine.build_api, compiled_api])
+def test_api_applies_declared_timeout(bookstore, create_api):
+    """Built and compiled APIs should cancel async operations running past their timeout."""
+    spec_dict = to_plain(ymlref.load(SPEC_CONTENT))
+    spec_dict['paths']['/books']['get']['x-aubergine-timeout'] = 0.2
+    client = testing.TestClient(create_api(Aubergine(spec_dict)))
+    result = client.simulate_get('/v1/rest/books')
+    assert 0 < result.json <= 0.2
+    assert client.simulate_get('/v1/rest/books', query_string='limit=1').status_code == 504
+    assert bookstore.get_all.call_count == 2
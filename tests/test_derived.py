@@ -0,0 +1,117 @@
+"""Test cases for derived HEAD and OPTIONS handlers."""
+from falcon import testing
+import pytest
+import ymlref
+from aubergine import Aubergine
+from aubergine.common import to_plain
+from aubergine.cors import CorsSettings, OptionsHandler
+from tests.conftest import SPEC_CONTENT, compile_module
+
+
+pytestmark = pytest.mark.usefixtures('bookstore')
+
+@pytest.fixture(name='bookstore_operations')
+def _bookstore_operations():
+    """Fixture providing bookstore operations used by tests of derived handlers."""
+    return {'get_all': lambda **kwargs: [{'title': 'Dune'}], 'count_all': lambda **kwargs: None}
+
+@pytest.fixture(name='spec_dict')
+def _spec_dict():
+    """Fixture providing plain copy of the bookstore spec."""
+    return to_plain(ymlref.load(SPEC_CONTENT))
+
+def _client(spec_dict, **kwargs):
+    return testing.TestClient(Aubergine(spec_dict).build_api(**kwargs))
+
+def _compiled_client(spec_dict, **kwargs):
+    return testing.TestClient(compile_module(Aubergine(spec_dict)).create_api(**kwargs))
+
+@pytest.fixture(name='make_client', params=[_client, _compiled_client], ids=['built', 'compiled'])
+def _make_client(request):
+    """Fixture providing function creating client of built or compiled API for a spec."""
+    return request.param
+
+def test_head_skips_serialization(spec_dict, bookstore, mocker):
+    """Derived HEAD handler should call GET operation but not serialize its result."""
+    dumps = mocker.patch('aubergine.handlers.json.dumps')
+    result = _client(spec_dict).simulate_head('/v1/rest/books', query_string='limit=2')
+    assert result.status_code == 200
+    bookstore.get_all.assert_called_once_with(limit=2)
+    dumps.assert_not_called()
+
+@pytest.mark.parametrize('bookstore', [{'get_all': lambda **kwargs: object()}], indirect=True)
+def test_head_never_serializes(spec_dict, bookstore, make_client):
+    """Derived HEAD handlers of built and compiled APIs should not serialize results."""
+    result = make_client(spec_dict).simulate_head('/v1/rest/books', query_string='limit=2')
+    assert result.status_code == 200
+    bookstore.get_all.assert_called_once_with(limit=2)
+
+def test_head_uses_declared_operation(spec_dict, bookstore, make_client):
+    """Derived HEAD handler should call operation named in x-aubergine-head, if any."""
+    spec_dict['paths']['/books']['get']['x-aubergine-head'] = 'bookstore.count_all'
+    client = make_client(spec_dict)
+    result = client.simulate_head('/v1/rest/books', query_string='limit=x')
+    assert result.status_code == 400
+    assert client.simulate_head('/v1/rest/books').status_code == 200
+    bookstore.count_all.assert_called_once_with()
+    bookstore.get_all.assert_not_called()
+
+def test_options_lists_methods(spec_dict, bookstore, make_client):
+    """Derived OPTIONS handler should answer with Allow, without calling operations."""
+    result = make_client(spec_dict).simulate_options('/v1/rest/books')
+    assert result.status_code == 204
+    assert result.headers['Allow'] == 'GET, HEAD, OPTIONS, POST'
+    assert 'Access-Control-Allow-Origin' not in result.headers
+    bookstore.get_all.assert_not_called()
+
+def test_answers_preflights(spec_dict, make_client):
+    """Preflights from allowed origins should get precomputed CORS headers."""
+    cors = CorsSettings(origins=('https://shop.example',), allow_headers=('Content-Type',),
+                        max_age=60)
+    client = make_client(spec_dict, cors=cors)
+    headers = {'Origin': 'https://shop.example', 'Access-Control-Request-Method': 'POST'}
+    result = client.simulate_options('/v1/rest/books', headers=headers)
+    assert result.headers['Access-Control-Allow-Origin'] == 'https://shop.example'
+    assert result.headers['Access-Control-Allow-Methods'] == 'GET, HEAD, OPTIONS, POST'
+    assert result.headers['Access-Control-Allow-Headers'] == 'Content-Type'
+    assert result.headers['Access-Control-Max-Age'] == '60'
+    headers['Origin'] = 'https://evil.example'
+    result = client.simulate_options('/v1/rest/books', headers=headers)
+    assert 'Access-Control-Allow-Origin' not in result.headers
+
+def test_exposes_headers_on_responses(spec_dict, bookstore, make_client):
+    """Responses to allowed origins, not preflights, should carry exposed headers."""
+    cors = CorsSettings(origins=('https://shop.example',), expose_headers=('X-Total',),
+                        allow_credentials=True)
+    client = make_client(spec_dict, cors=cors)
+    headers = {'Origin': 'https://shop.example'}
+    result = client.simulate_get('/v1/rest/books', headers=headers)
+    assert result.status_code == 200
+    assert result.headers['Access-Control-Allow-Origin'] == 'https://shop.example'
+    assert result.headers['Access-Control-Expose-Headers'] == 'X-Total'
+    assert result.headers['Access-Control-Allow-Credentials'] == 'true'
+    assert result.headers['Vary'] == 'Origin'
+    result = client.simulate_get('/v1/rest/books', query_string='limit=x', headers=headers)
+    assert result.status_code == 400
+    assert result.headers['Access-Control-Allow-Origin'] == 'https://shop.example'
+    headers['Access-Control-Request-Method'] = 'GET'
+    result = client.simulate_options('/v1/rest/books', headers=headers)
+    assert 'Access-Control-Expose-Headers' not in result.headers
+    result = client.simulate_get('/v1/rest/books', headers={'Origin': 'https://evil.example'})
+    assert 'Access-Control-Allow-Origin' not in result.headers
+    assert 'Access-Control-Expose-Headers' not in result.headers
+
+def test_wildcard_origin_with_credentials():
+    """Wildcard origins should be echoed when credentials are allowed."""
+    handler = OptionsHandler('/a', ['get'], CorsSettings(origins='*', allow_credentials=True))
+    assert handler.allowed_origin('https://a.example') == 'https://a.example'
+    handler = OptionsHandler('/a', ['get'], CorsSettings(origins='*'))
+    assert handler.allowed_origin('https://a.example') == '*'
+    assert handler.allowed_origin(None) is None
+
+def test_declared_methods_are_kept(spec_dict, bookstore, make_client):
+    """Operations declared for HEAD and OPTIONS should not be replaced by derived handlers."""
+    spec_dict['paths']['/books']['head'] = dict(spec_dict['paths']['/books']['get'],
+                                                operationId='bookstore.count_all')
+    make_client(spec_dict).simulate_head('/v1/rest/books')
+    bookstore.count_all.assert_called_once_with()
@@ -0,0 +1,70 @@
+"""Test cases for serving the specification document."""
+import gzip
+import json
+from falcon import testing
+import pytest
+import yaml
+import ymlref
+from aubergine import Aubergine
+from aubergine.document import DocumentResource, accepts_gzip, etag_matches
+from tests.conftest import SPEC_CONTENT
+
+
+pytestmark = pytest.mark.usefixtures('bookstore')
+
+@pytest.fixture(name='client')
+def _client():
+    """Fixture providing test client of the bookstore API serving its specification."""
+    app = Aubergine(ymlref.load(SPEC_CONTENT))
+    return testing.TestClient(app.build_api(spec_route='/openapi'))
+
+@pytest.mark.parametrize('header,expected', [
+    (None, False), ('gzip', True), ('deflate, gzip;q=0.5', True), ('gzip;q=0', False),
+    ('*', True), ('identity', False)])
+def test_accepts_gzip(header, expected):
+    """The accepts_gzip function should respect codings and their qualities."""
+    assert accepts_gzip(header) == expected
+
+def test_etag_matches():
+    """The etag_matches function should compare lists of tags weakly."""
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches('*', '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+def test_serializes_once(mocker):
+    """DocumentResource should serialize the document only when it's created."""
+    serialize = mocker.patch('aubergine.document.serialize', return_value=b'{}')
+    resource = DocumentResource({}, 'json')
+    for _ in range(3):
+        resource.on_get(mocker.Mock(**{'get_header.return_value': None}), mocker.Mock())
+    serialize.assert_called_once_with({}, 'json')
+
+@pytest.mark.parametrize('suffix,load', [('json', json.loads), ('yaml', yaml.safe_load)])
+def test_serves_specification(client, suffix, load):
+    """The specification should be served in both formats under the base path."""
+    result = client.simulate_get('/v1/rest/openapi.' + suffix)
+    assert result.status_code == 200
+    assert load(result.content.decode('utf-8'))['info']['title'] == 'Bookstore'
+    assert result.headers['ETag'].startswith('"')
+
+def test_serves_compressed_and_not_modified(client):
+    """Compressed variant should have its own ETag, and matching requests get 304."""
+    plain = client.simulate_get('/v1/rest/openapi.json')
+    compressed = client.simulate_get('/v1/rest/openapi.json',
+                                     headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.content) == plain.content
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+    result = client.simulate_get('/v1/rest/openapi.json',
+                                 headers={'If-None-Match': plain.headers['ETag']})
+    assert result.status_code == 304
+    assert result.content == b''
+
+def test_document_keeps_references(tmpdir):
+    """Aubergine.document should not resolve references of specs loaded from files."""
+    spec_file = tmpdir.join('spec.yml')
+    spec_file.write(SPEC_CONTENT)
+    document = Aubergine.from_file(str(spec_file)).document()
+    schema = document['paths']['/books']['post']['requestBody']['content']['application/json']
+    assert '$ref' in schema['schema']
@@ -1,9 +1,10 @@
 """Test cases for content extractors."""
-from falcon import HTTPBadRequest, Request
+from falcon import Request
 from marshmallow import Schema, UnmarshalResult
 import pytest
-from aubergine.extractors import (Extractor, read_body, read_header, read_path, read_query,
-                                  Location, MissingValueError, ValidationError)
+from aubergine.extractors import (Extractor, load_default, read_body, read_header, read_path,
+                                  read_query, Location, MISSING, MissingValueError,
+                                  ValidationError)
 
 
 @pytest.fixture(name='http_req')
@@ -29,67 +30,78 @@ def test_read_body(http_req):
     http_req.bounded_stream.read.assert_called_once_with()
     assert http_req.bounded_stream.read() == body
 
-def test_raises_missing_body(http_req):
-    """The read_body function should raise MissingValueError when body is not present."""
-    http_req.bounded_stream.read.return_value = ''
-    with pytest.raises(MissingValueError) as exc_info:
-        read_body(http_req)
-    assert exc_info.value.location == Location.BODY
+def test_missing_body(http_req):
+    """The read_body function should return MISSING when body is not present."""
+    http_req.bounded_stream.read.return_value = b''
+    assert read_body(http_req) is MISSING
 
 def test_read_header(http_req):
     """The read_header function should read correct header from request."""
-    effect = lambda key, required: {'param1': 'xyz', 'param2': 'uvw'}.get(key)
+    effect = lambda key: {'param1': 'xyz', 'param2': 'uvw'}.get(key)
     http_req.get_header.side_effect = effect
     assert read_header(http_req, 'param1') == 'xyz'
-    http_req.get_header.assert_called_once_with('param1', required=True)
+    http_req.get_header.assert_called_once_with('param1')
 
-def test_raises_missing_header(http_req):
-    """The read_header function should raise MissingValueError if given header is missing."""
-    http_req.get_header.side_effect = HTTPBadRequest()
-    with pytest.raises(MissingValueError) as exc_info:
-        read_header(http_req, 'id')
-    assert exc_info.value.location == Location.HEADER
-    assert exc_info.value.name == 'id'
+def test_missing_header(http_req):
+    """The read_header function should return MISSING if given header is missing."""
+    http_req.get_header.return_value = None
+    assert read_header(http_req, 'id') is MISSING
 
 def test_read_path(http_req):
     """The read_path function should get path argument from kwargs."""
     assert read_path(http_req, param_name='b', a='baz', b='foobar') == 'foobar'
 
-def test_raises_missing_path(http_req):
-    """The read_path function should raise MissingValueError if param_name is not in kwargs."""
-    with pytest.raises(MissingValueError) as exc_info:
-        read_path(http_req, param_name='name', id='10')
-    assert exc_info.value.location == Location.PATH
-    assert exc_info.value.name == 'name'
+def test_missing_path(http_req):
+    """The read_path function should return MISSING if param_name is not in kwargs."""
+    assert read_path(http_req, param_name='name', id='10') is MISSING
 
 def test_read_query(http_req):
     """The read_query function should read correct param from request."""
     assert http_req.get_param.return_value == read_query(http_req, param_name='horror')
-    http_req.get_param.assert_called_once_with('horror', required=True)
+    http_req.get_param.assert_called_once_with('horror')
 
-def test_raises_missing_query(http_req):
-    """The read_query function should raise MissingValueError if param_name is not in request."""
-    http_req.get_param.side_effect = HTTPBadRequest()
-    with pytest.raises(MissingValueError) as exc_info:
-        read_query(http_req, param_name='test')
-    assert exc_info.value.location == Location.QUERY
-    assert exc_info.value.name == 'test'
+def test_missing_query(http_req):
+    """The read_query function should return MISSING if param_name is not in request."""
+    http_req.get_param.return_value = None
+    assert read_query(http_req, param_name='test') is MISSING
 
 def test_raises_missing_required(http_req, schema, decoder, mocker):
-    """The Extractor.extract should reraise if its param is required and not present."""
-    err = MissingValueError(Location.PATH, 'foo')
-    read_data = mocker.Mock(side_effect=err)
-    ext = Extractor(schema=schema, decoder=decoder, required=True, read_data=read_data)
+    """The Extractor.extract should raise if its param is required and not present."""
+    read_data = mocker.Mock(return_value=MISSING)
+    ext = Extractor(schema=schema, decoder=decoder, required=True, read_data=read_data,
+                    location=Location.PATH, name='foo')
     with pytest.raises(MissingValueError) as exc_info:
         ext.extract(http_req)
-    assert exc_info.value == err
+    assert exc_info.value.location == Location.PATH
+    assert exc_info.value.name == 'foo'
 
 def test_not_raises_optional(http_req, schema, decoder, mocker):
-    """The Extractor.extract should not reraise if its param is optional and not present."""
-    read_data = mocker.Mock(side_effect=MissingValueError(Location.QUERY, 'foo'))
+    """The Extractor.extract should not raise if its param is optional and not present."""
+    read_data = mocker.Mock(return_value=MISSING)
     ext = Extractor(schema=schema, decoder=decoder, required=False, read_data=read_data)
     result = ext.extract(http_req)
     assert not result.present
+    decoder.decode.assert_not_called()
+
+def test_uses_default(http_req, schema, decoder, mocker):
+    """The Extractor.extract should use default value for absent optional params."""
+    read_data = mocker.Mock(return_value=MISSING)
+    ext = Extractor(schema=schema, decoder=decoder, required=False, read_data=read_data,
+                    default=['a'])
+    first, second = ext.extract(http_req), ext.extract(http_req)
+    assert first == (True, ['a'])
+    assert first.value is not second.value
+    schema.load.assert_not_called()
+
+def test_loads_default():
+    """The load_default function should load default declared in schema, if any."""
+    schema = Schema()
+    schema.load = lambda data: ({'content': int(data['content'])}, {})
+    assert load_default(schema, {'type': 'integer', 'default': '10'}) == 10
+    assert load_default(schema, {'type': 'integer'}) is MISSING
+    schema.load = lambda data: ({}, {'content': ['Not a valid integer.']})
+    with pytest.raises(ValueError):
+        load_default(schema, {'type': 'integer', 'default': 'ten'})
 
 def test_returns_loaded_value(http_req, schema, decoder, mocker):
     """The Extractor.extract should decode raw value, pass it to Schema and return parsed value."""
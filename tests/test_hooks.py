@@ -0,0 +1,82 @@
+"""Test cases for operation-level hooks."""
+import sys
+import types
+import falcon
+from falcon import testing
+import pytest
+import ymlref
+from aubergine import Aubergine
+from aubergine.common import to_plain
+from aubergine.compiler import compile_app
+from aubergine.handlers import RequestHandler
+from aubergine.hooks import chain_hooks, declared_hooks
+from tests.conftest import SPEC_CONTENT
+
+
+def _deny_horror(req, resp, params): # pylint: disable=unused-argument
+    if req.get_param('type') == 'horror':
+        raise falcon.HTTPForbidden('Forbidden', 'No horror allowed.')
+
+def _tag(req, resp, params): # pylint: disable=unused-argument
+    req.context.setdefault('tags', []).append('tagged')
+
+
+@pytest.fixture(name='bookhooks', autouse=True)
+def _bookhooks(monkeypatch, bookstore): # pylint: disable=unused-argument
+    """Fixture providing fake module with hooks used in the spec, next to the bookstore."""
+    hooks = types.ModuleType('bookhooks')
+    hooks.deny_horror = _deny_horror
+    hooks.tag = _tag
+    monkeypatch.setitem(sys.modules, 'bookhooks', hooks)
+
+@pytest.fixture(name='app')
+def _app():
+    """Fixture providing bookstore app whose listing of books has hooks."""
+    spec_dict = to_plain(ymlref.load(SPEC_CONTENT))
+    spec_dict['paths']['/books']['get']['x-aubergine-hooks'] = ['bookhooks.tag',
+                                                                'bookhooks.deny_horror']
+    return Aubergine(spec_dict)
+
+def test_declared_hooks():
+    """The declared_hooks function should accept single names and reject duplicates."""
+    assert declared_hooks({}) == []
+    assert declared_hooks({'x-aubergine-hooks': 'a.b'}) == ['a.b']
+    with pytest.raises(ValueError):
+        declared_hooks({'x-aubergine-hooks': ['a.b', 'c.d', 'a.b']})
+
+def test_chains_hooks_in_order(mocker):
+    """The chain_hooks function should run hooks in order, and add nothing for one hook."""
+    assert chain_hooks([]) is None
+    hook = mocker.Mock()
+    assert chain_hooks([hook]) is hook
+    calls = []
+    chained = chain_hooks([lambda *args: calls.append(1), lambda *args: calls.append(2)])
+    chained(None, None, {})
+    assert calls == [1, 2]
+
+def test_hooks_run_before_extraction(mocker):
+    """RequestHandler should not extract anything from requests rejected by hooks."""
+    extractor = mocker.Mock()
+    hook = mocker.Mock(side_effect=falcon.HTTPUnauthorized('Unauthorized'))
+    handler = RequestHandler(path='/a', operation=mocker.Mock(), body_extractor=extractor,
+                             params_extractors={'id': extractor}, hooks=hook)
+    req, resp = mocker.Mock(spec=falcon.Request), mocker.Mock()
+    with pytest.raises(falcon.HTTPUnauthorized):
+        handler.handle_request(req, resp, id='1')
+    hook.assert_called_once_with(req, resp, {'id': '1'})
+    extractor.extract.assert_not_called()
+
+def test_built_api_runs_hooks(app):
+    """Hooks should be resolved like operations and only run for their operation."""
+    client = testing.TestClient(app.build_api())
+    assert client.simulate_get('/v1/rest/books').status_code == 200
+    assert client.simulate_get('/v1/rest/books', query_string='type=horror').status_code == 403
+    assert app.routes['/v1/rest/books']['post'].hooks is None
+
+def test_compiled_api_runs_hooks(app):
+    """Modules compiled from specs should call hooks of their operations."""
+    module = types.ModuleType('compiled_bookstore')
+    exec(compile_app(app), module.__dict__) # pylint: disable=exec-used
+    client = testing.TestClient(module.api)
+    assert client.simulate_get('/v1/rest/books', query_string='type=horror').status_code == 403
+    assert client.simulate_get('/v1/rest/books', query_string='type=drama').status_code == 200
@@ -0,0 +1,64 @@
+"""Test cases for hosting several apps in a single API."""
+from falcon import testing
+import pytest
+import ymlref
+from aubergine import Aubergine
+from aubergine.common import to_plain
+from aubergine.hosting import CachingSchemaBuilder, Host
+from tests.conftest import SPEC_CONTENT
+
+
+pytestmark = pytest.mark.usefixtures('bookstore')
+
+def _app(base_path='/v1/rest'):
+    spec_dict = to_plain(ymlref.load(SPEC_CONTENT))
+    spec_dict['servers'] = [{'url': base_path}]
+    return Aubergine(spec_dict)
+
+def test_caches_equal_schemas(mocker):
+    """CachingSchemaBuilder should build schema once for equal specs."""
+    wrapped = mocker.Mock(**{'build.side_effect': lambda spec: object()})
+    builder = CachingSchemaBuilder(wrapped)
+    first = builder.build({'type': 'string', 'maxLength': 3})
+    assert builder.build({'maxLength': 3, 'type': 'string'}) is first
+    assert builder.build({'type': 'integer'}) is not first
+    assert wrapped.build.call_count == 2
+    assert builder.stats()[:3] == (1, 2, 2)
+
+def test_serves_apps_under_prefixes():
+    """Host should serve every mounted app under its own prefix."""
+    host = Host()
+    public, admin = _app(), _app()
+    host.mount('/public', public)
+    host.mount('/admin/', admin)
+    client = testing.TestClient(host.build_api())
+    assert client.simulate_get('/public/v1/rest/books', query_string='limit=5').json == [
+        ['limit', 5]]
+    body = '{"title": "Dune", "author": "Herbert"}'
+    assert client.simulate_post('/admin/v1/rest/books', body=body).json['id'] == 1
+    assert client.simulate_get('/v1/rest/books').status_code == 404
+    assert list(admin.routes) == ['/admin/v1/rest/books']
+
+def test_shares_extractor_builder():
+    """Mounted apps should share extractor builder, building shared schemas once."""
+    host = Host()
+    first, second = _app(), _app()
+    host.mount('/a', first)
+    host.mount('/b', second)
+    host.build_api()
+    first_post = first.routes['/a/v1/rest/books']['post']
+    second_post = second.routes['/b/v1/rest/books']['post']
+    assert first_post is not second_post
+    assert first_post.body_extractor.schema is second_post.body_extractor.schema
+    assert host.ex_factory.schema_builder.stats().hits > 0
+
+def test_rejects_conflicts():
+    """Host should refuse apps mounted under the same prefix or with overlapping routes."""
+    host = Host()
+    host.mount('/a', _app())
+    with pytest.raises(ValueError):
+        host.mount('/a/', _app())
+    host.mount('', _app())
+    host.mount('/v1', _app('/rest'))
+    with pytest.raises(ValueError):
+        host.build_api()
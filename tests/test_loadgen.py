@@ -0,0 +1,115 @@
+"""Test cases for spec-driven load generator."""
+import random
+import pytest
+import ymlref
+from aubergine import Aubergine
+from aubergine.cli import main
+from aubergine.loadgen import (RequestFactory, SampleGenerator, SyntheticRequest,
+                               TestClientTarget, format_report, percentile, run_load)
+from tests.conftest import SPEC_CONTENT
+
+
+class FakeClock:
+    """Clock advanced only by sleeping."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        """Advance the clock instead of sleeping."""
+        self.now += seconds
+
+
+pytestmark = pytest.mark.usefixtures('bookstore')
+
+@pytest.fixture(name='app')
+def _app():
+    """Fixture providing Aubergine app for the bookstore spec."""
+    return Aubergine(ymlref.load(SPEC_CONTENT))
+
+@pytest.fixture(name='factory')
+def _factory(app):
+    """Fixture providing seeded factory of requests to the bookstore API."""
+    return RequestFactory.from_app(app, rng=random.Random(7))
+
+def test_generates_values_matching_schema():
+    """SampleGenerator should generate values conforming to schemas."""
+    samples = SampleGenerator(random.Random(1))
+    schema = {'required': ['id'],
+              'properties': {'id': {'type': 'integer', 'minimum': 5, 'maximum': 6},
+                             'tags': {'type': 'array', 'items': {'type': 'string'},
+                                      'minItems': 1},
+                             'kind': {'type': 'string', 'enum': ['a', 'b']}}}
+    for _ in range(20):
+        value = samples.valid(schema)
+        assert value['id'] in (5, 6)
+        assert value.get('kind', 'a') in ('a', 'b')
+        assert all(isinstance(tag, str) for tag in value.get('tags', ['x']))
+
+def test_generates_invalid_values():
+    """SampleGenerator should violate schemas when asked to, if possible."""
+    samples = SampleGenerator(random.Random(1))
+    assert samples.invalid({'type': 'integer'}) == 'not-a-integer'
+    assert samples.invalid({'type': 'string'}) is None
+    assert samples.invalid({'type': 'string', 'maxLength': 2}) == 'xxx'
+    assert 'title' not in samples.invalid({'required': ['title'],
+                                           'properties': {'title': {'type': 'string'}}})
+
+def test_generates_requests(factory):
+    """RequestFactory should generate requests respecting base path and content type."""
+    post = next(op for op in factory.operations if op[1] == 'POST')
+    request = factory.generate(post)
+    assert request.path == '/v1/rest/books'
+    assert request.headers['Content-Type'] == 'application/json'
+    assert '"title"' in request.body
+    assert request.valid
+
+def test_valid_requests_succeed_and_invalid_fail(app, factory):
+    """Valid generated requests should be accepted by the API, and invalid rejected."""
+    target = TestClientTarget(app.build_api())
+    for operation in factory.operations:
+        for _ in range(10):
+            assert target.send(factory.generate(operation)) == 200
+            request = factory.generate(operation, valid=False)
+            assert not request.valid
+            assert target.send(request) >= 400
+
+def test_percentile():
+    """The percentile function should use nearest-rank method."""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([], 50) is None
+
+def test_runs_at_rate(mocker):
+    """The run_load function should pace requests and report per operation."""
+    clock = FakeClock()
+    target = mocker.Mock(**{'send.return_value': 200})
+    requests = [SyntheticRequest('op.a' if i % 2 else 'op.b', 'GET', '/', '', {}, None, True)
+                for i in range(100)]
+    report = run_load(target, requests, rate=10, duration=2, clock=clock, sleep=clock.sleep)
+    assert report.requests == 20
+    assert list(report.operations) == ['op.a', 'op.b']
+    assert report.operations['op.a'].requests == 10
+    assert report.operations['op.a'].statuses[200] == 10
+    assert report.operations['op.a'].throughput == pytest.approx(10 / 1.9)
+    assert 'op.a' in format_report(report)
+
+def test_requires_stop_condition(mocker):
+    """The run_load function should refuse to run forever."""
+    with pytest.raises(ValueError):
+        run_load(mocker.Mock(), [], rate=10)
+
+def test_cli_runs_in_process(tmpdir, capsys):
+    """The loadgen command should build the API in-process when no URL is given."""
+    spec_file = tmpdir.join('spec.yml')
+    spec_file.write(SPEC_CONTENT)
+    assert main(['loadgen', str(spec_file), '--rate', '1000', '--count', '20',
+                 '--seed', '3']) == 0
+    out = capsys.readouterr().out
+    assert '20 requests in' in out
+    assert 'bookstore.get_all' in out
@@ -0,0 +1,116 @@
+"""Test cases for memoization of validation results."""
+import types
+from falcon import testing
+from marshmallow import UnmarshalResult
+import pytest
+import ymlref
+from aubergine import Aubergine
+from aubergine.common import to_plain
+from aubergine.extractors import Extractor, ValidationCache, ValidationError
+from tests.conftest import SPEC_CONTENT, compile_module
+
+
+@pytest.fixture(name='schema')
+def _schema(mocker):
+    """Fixture providing schema mock loading list from raw value unless it's 'bad'."""
+    schema = mocker.Mock()
+    schema.load.side_effect = lambda data: (
+        UnmarshalResult({}, {'content': ['Invalid.']}) if data['content'] == 'bad'
+        else UnmarshalResult({'content': [data['content']]}, {}))
+    return schema
+
+@pytest.fixture(name='extractor')
+def _extractor(schema, mocker):
+    """Fixture providing extractor with validation cache of size 2."""
+    return Extractor(schema=schema, decoder=mocker.Mock(decode=lambda raw: raw),
+                     required=False, read_data=lambda req, **kwargs: req.raw,
+                     cache=ValidationCache(maxsize=2))
+
+def extract(extractor, raw):
+    """Extract raw value using given extractor."""
+    return extractor.extract(types.SimpleNamespace(raw=raw))
+
+def test_cache_from_spec():
+    """ValidationCache.from_spec should create cache only for operations enabling it."""
+    assert ValidationCache.from_spec({}) is None
+    assert ValidationCache.from_spec({'x-aubergine-memoize': True}).maxsize == 256
+    assert ValidationCache.from_spec({'x-aubergine-memoize': {'size': 10}}).maxsize == 10
+
+def test_memoizes_values(extractor, schema):
+    """Extractor with cache should validate every raw value once and return copies."""
+    first = extract(extractor, 'a')
+    first.value.append('mutated')
+    assert extract(extractor, 'a').value == ['a']
+    assert schema.load.call_count == 1
+    assert extractor.cache.stats() == (1, 1, 1, 2)
+
+def test_memoizes_errors(extractor, schema):
+    """Extractor with cache should also memoize validation errors."""
+    for _ in range(2):
+        with pytest.raises(ValidationError) as exc_info:
+            extract(extractor, 'bad')
+        assert exc_info.value.errors == {'content': ['Invalid.']}
+    assert schema.load.call_count == 1
+
+def test_evicts_least_recently_used(extractor, schema):
+    """ValidationCache should evict least recently used entries above its size."""
+    for raw in ('a', 'b', 'a', 'c', 'a', 'b'):
+        extract(extractor, raw)
+    assert schema.load.call_count == 4
+    assert extractor.cache.stats().size == 2
+
+def test_skips_long_values(schema, mocker):
+    """ValidationCache should not cache values longer than its key limit."""
+    extractor = Extractor(schema=schema, decoder=mocker.Mock(decode=lambda raw: raw),
+                          required=False, read_data=lambda req, **kwargs: req.raw,
+                          cache=ValidationCache(max_key_length=3))
+    extract(extractor, 'long')
+    extract(extractor, 'long')
+    assert schema.load.call_count == 2
+    assert extractor.cache.stats().size == 0
+
+@pytest.mark.usefixtures('bookstore')
+def test_app_reports_cache_stats():
+    """Aubergine.cache_stats should report caches of operations enabling memoization."""
+    spec = ymlref.load(SPEC_CONTENT.replace('      operationId: bookstore.get_all\n',
+                                            '      operationId: bookstore.get_all\n'
+                                            '      x-aubergine-memoize: {size: 8}\n'))
+    app = Aubergine(spec)
+    client = testing.TestClient(app.build_api())
+    for _ in range(3):
+        client.simulate_get('/v1/rest/books', query_string='limit=5')
+    stats = app.cache_stats()
+    assert list(stats) == ['GET /v1/rest/books']
+    assert stats['GET /v1/rest/books']['params']['limit'].hits == 2
+    assert stats['GET /v1/rest/books']['params']['type'].misses == 0
+    assert stats['GET /v1/rest/books']['body'] is None
+
+@pytest.mark.parametrize('bookstore', [{'add_book': lambda **kwargs: None}], indirect=True)
+@pytest.mark.usefixtures('bookstore')
+def test_reports_body_apart_from_params():
+    """Aubergine.cache_stats should not mix body's cache with a parameter named 'body'."""
+    spec = to_plain(ymlref.load(SPEC_CONTENT))
+    post = spec['paths']['/books']['post']
+    post['x-aubergine-memoize'] = True
+    post['parameters'] = [{'name': 'body', 'in': 'query', 'schema': {'type': 'string'}}]
+    app = Aubergine(spec)
+    client = testing.TestClient(app.build_api())
+    client.simulate_post('/v1/rest/books', query_string='body=x', body='{"title": "Dune"}')
+    stats = app.cache_stats()['POST /v1/rest/books']
+    assert stats['params']['body'].misses == 1
+    assert stats['body'].misses == 1
+
+@pytest.mark.usefixtures('bookstore')
+def test_compiled_module_memoizes():
+    """Compiled modules should load values of memoizing operations through their caches."""
+    spec = to_plain(ymlref.load(SPEC_CONTENT))
+    spec['paths']['/books']['post']['x-aubergine-memoize'] = {'size': 8}
+    module = compile_module(Aubergine(spec))
+    client = testing.TestClient(module.api)
+    for _ in range(2):
+        assert client.simulate_post('/v1/rest/books', body='{"title": "Dune"}').json == {
+            'title': 'Dune', 'id': 1}
+        with pytest.raises(ValidationError):
+            client.simulate_post('/v1/rest/books', body='{"pages": 1}')
+    caches = [value for value in vars(module).values() if isinstance(value, ValidationCache)]
+    assert [(cache.hits, cache.misses) for cache in caches] == [(2, 2)]
@@ -0,0 +1,55 @@
+"""Test cases for memory usage reports."""
+from nadia.api import SchemaBuilder
+import pytest
+import ymlref
+from aubergine.extractors import ExtractorBuilder
+from aubergine.handlers import RequestHandler
+from aubergine.memory import memory_report
+from aubergine import Aubergine
+from tests.conftest import SPEC_CONTENT
+
+
+@pytest.fixture(name='builder')
+def _builder():
+    """Fixture providing ExtractorBuilder."""
+    return ExtractorBuilder(SchemaBuilder.create())
+
+def _handler(builder, path, params):
+    extractors = {name: builder.build_param_extractor({'name': name, 'in': 'query',
+                                                       'schema': {'type': 'string'}})
+                  for name in params}
+    return RequestHandler(path=path, operation=len, body_extractor=None,
+                          params_extractors=extractors)
+
+def test_shares_decoders_and_readers(builder):
+    """ExtractorBuilder should share decoders and readers between extractors."""
+    param_spec = {'name': 'id', 'in': 'query', 'schema': {'type': 'string'}}
+    first = builder.build_param_extractor(param_spec)
+    second = builder.build_param_extractor(param_spec)
+    assert first.decoder is second.decoder
+    assert first.read_data is second.read_data
+    spec = {'content': {'application/json': {'schema': {'type': 'string'}}}}
+    assert builder.build_body_extractor(spec).decoder is builder.build_body_extractor(spec).decoder
+
+def test_runtime_objects_have_no_dict(builder):
+    """Extractors and handlers should not carry instance dictionaries."""
+    handler = _handler(builder, '/a', ['id'])
+    assert not hasattr(handler, '__dict__')
+    assert not hasattr(handler.params_extractors['id'], '__dict__')
+
+def test_counts_shared_objects_once(builder):
+    """The memory_report function should count objects shared by routes only once."""
+    report = memory_report({'/a': {'get': _handler(builder, '/a', ['id', 'limit'])},
+                            '/b': {'get': _handler(builder, '/b', ['id', 'limit'])}})
+    assert set(report.routes) == {'/a', '/b'}
+    assert report.routes['/a'] > report.routes['/b'] > 0
+    assert report.total == sum(report.components.values())
+    assert all(report.components[name] > 0 for name in ('handler', 'extractor', 'schema'))
+
+def test_app_memory_report(mocker):
+    """Aubergine.memory_report should report routes built by build_api."""
+    app = Aubergine(ymlref.load(SPEC_CONTENT))
+    app.build_api(import_module=mocker.Mock())
+    report = app.memory_report()
+    assert list(report.routes) == ['/v1/rest/books']
+    assert report.total > 0
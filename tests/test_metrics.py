@@ -0,0 +1,83 @@
+"""Test cases for metrics shared by worker processes."""
+import os
+from falcon import testing
+import pytest
+import ymlref
+from aubergine import Aubergine
+from aubergine.metrics import CLIENT_ERROR, OK, SERVER_ERROR, MetricsStore, outcome_for
+from tests.conftest import SPEC_CONTENT
+
+
+@pytest.fixture(name='store')
+def _store(tmpdir):
+    """Fixture providing a small metrics store backed by a temporary file."""
+    return MetricsStore(str(tmpdir.join('metrics')), slots=2, max_operations=4,
+                        buckets=(0.1, 1.0))
+
+pytestmark = pytest.mark.usefixtures('bookstore')
+
+def _in_child(func):
+    """Run func in a forked process and wait until it exits."""
+    pid = os.fork()
+    if pid == 0:
+        try:
+            func()
+        finally:
+            os._exit(0) # pylint: disable=protected-access
+    os.waitpid(pid, 0)
+
+def test_classifies_outcomes():
+    """The outcome_for function should tell outcome of request by its status."""
+    assert outcome_for('200 OK') == OK
+    assert outcome_for('404 Not Found') == CLIENT_ERROR
+    assert outcome_for('503 Service Unavailable') == SERVER_ERROR
+
+def test_registers_operations_once(store):
+    """MetricsStore.register should assign indices shared by all stores using the file."""
+    assert store.register('a.b') == 0
+    assert store.register('c.d') == 1
+    other = MetricsStore(store.path, slots=2, max_operations=4, buckets=(0.1, 1.0))
+    assert other.register('c.d') == 1
+    for name in ('e.f', 'g.h'):
+        store.register(name)
+    with pytest.raises(ValueError):
+        store.register('i.j')
+    with pytest.raises(ValueError):
+        MetricsStore(store.path, slots=3, max_operations=4, buckets=(0.1, 1.0))
+
+def test_aggregates_across_processes(store):
+    """Requests recorded by other processes, alive or not, should be included in snapshots."""
+    index = store.register('a.b')
+    store.record(index, 0.05, OK)
+    _in_child(lambda: [store.record(index, 0.5, CLIENT_ERROR), store.record(index, 5, OK)])
+    stats = store.snapshot()['a.b']
+    assert stats.count == 3
+    assert stats.outcomes == {'ok': 2, 'client_error': 1, 'server_error': 0}
+    assert stats.buckets == (1, 2, 3)
+    assert stats.duration_sum == pytest.approx(5.55)
+
+def test_reclaims_slots_of_exited_workers(store):
+    """Slots of exited workers should be reused without losing their counts."""
+    index = store.register('a.b')
+    store.record(index, 0.05, OK)
+    for _ in range(3):
+        _in_child(lambda: store.record(index, 0.05, OK))
+    assert store.workers()[0] == os.getpid()
+    assert store.snapshot()['a.b'].count == 4
+
+def test_serves_aggregated_metrics(store, bookstore):
+    """API built with metrics should record requests and serve them in Prometheus format."""
+    app = Aubergine(ymlref.load(SPEC_CONTENT))
+    client = testing.TestClient(app.build_api(metrics=store))
+    assert client.simulate_get('/v1/rest/books').status_code == 200
+    bookstore.get_all.side_effect = RuntimeError
+    with pytest.raises(RuntimeError):
+        client.simulate_get('/v1/rest/books')
+    result = client.simulate_get('/metrics')
+    assert result.headers['content-type'].startswith('text/plain')
+    lines = result.text.splitlines()
+    assert 'aubergine_requests_total{operation="bookstore.get_all",outcome="ok"} 1' in lines
+    assert ('aubergine_requests_total{operation="bookstore.get_all",outcome="server_error"} 1'
+            in lines)
+    assert ('aubergine_request_duration_seconds_count{operation="bookstore.add_book"} 0'
+            in lines)
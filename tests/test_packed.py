@@ -0,0 +1,119 @@
+"""Test cases for packed numeric arrays."""
+import array
+import json
+import sys
+import types
+import falcon
+from falcon import testing
+import pytest
+from aubergine import Aubergine
+from aubergine.extractors import ExtractorBuilder, ValidationError
+from aubergine.handlers import encode_result
+from aubergine.packed import PackedSchema, encode_packed
+from tests.conftest import compiled_api
+
+
+SERIES_SCHEMA = {'type': 'array', 'x-aubergine-packed': True, 'maxItems': 4,
+                 'items': {'type': 'number', 'minimum': 0}}
+
+IDS_SCHEMA = {'type': 'array', 'x-aubergine-packed': True,
+              'items': {'type': 'integer', 'format': 'int32'}}
+
+SPEC = {
+    'openapi': '3.0.0',
+    'info': {'title': 'Analytics', 'version': '1.0'},
+    'servers': [{'url': 'http://localhost/v1'}],
+    'paths': {
+        '/series': {
+            'post': {
+                'operationId': 'analytics.total',
+                'parameters': [{'name': 'ids', 'in': 'query', 'schema': IDS_SCHEMA}],
+                'requestBody': {'required': True,
+                                'content': {'application/json': {'schema': SERIES_SCHEMA}}},
+                'responses': {'200': {'description': 'Total.'}}}}}}
+
+@pytest.fixture(name='analytics', autouse=True)
+def _analytics(monkeypatch, mocker):
+    """Fixture providing fake analytics module with operations used in the spec."""
+    module = types.ModuleType('analytics')
+    module.total = mocker.Mock(side_effect=lambda body, ids=None: body)
+    monkeypatch.setitem(sys.modules, 'analytics', module)
+    return module
+
+def test_creates_schema_from_spec():
+    """PackedSchema should pick typecode by item type and refuse schemas it can't check."""
+    assert PackedSchema.from_spec(SERIES_SCHEMA).typecode == 'd'
+    assert PackedSchema.from_spec(IDS_SCHEMA).typecode == 'i'
+    with pytest.raises(ValueError):
+        PackedSchema.from_spec({'type': 'array', 'items': {'type': 'string'}})
+    with pytest.raises(ValueError):
+        PackedSchema.from_spec({'type': 'array', 'uniqueItems': True,
+                                'items': {'type': 'integer', 'enum': [1, 2]}})
+
+@pytest.mark.parametrize('content,expected', [
+    ([1, 2.5], array.array('d', [1.0, 2.5])),
+    ('1,2.5', array.array('d', [1.0, 2.5])),
+    ('', array.array('d'))])
+def test_loads_valid_values(content, expected):
+    """PackedSchema should load lists of numbers and comma separated strings into arrays."""
+    data, errors = PackedSchema.from_spec(SERIES_SCHEMA).load({'content': content})
+    assert not errors
+    assert data['content'] == expected
+
+@pytest.mark.parametrize('content', [[1, 'a'], {'a': 1}, 'a,b', [-1], [1, 2, 3, 4, 5]])
+def test_reports_invalid_values(content):
+    """PackedSchema should report values of wrong type or violating the constraints."""
+    data, errors = PackedSchema.from_spec(SERIES_SCHEMA).load({'content': content})
+    assert not data
+    assert errors['content']
+
+def test_checks_exclusive_bounds_and_overflow():
+    """PackedSchema should respect exclusive bounds and ranges of item types."""
+    schema = PackedSchema('i', minimum=0, maximum=10, exclusive_maximum=True)
+    assert schema.check(array.array('i', [0, 9])) == []
+    assert len(schema.check(array.array('i', [10]))) == 1
+    assert schema.load({'content': [2 ** 40]})[1]
+
+def test_checks_floats_before_narrowing():
+    """Float arrays should be checked as doubles and refuse items single precision can't hold."""
+    schema = PackedSchema.from_spec({'type': 'array', 'items': {
+        'type': 'number', 'format': 'float', 'maximum': 0.1}})
+    data, errors = schema.load({'content': [0.1, -1e30]})
+    assert not errors
+    assert data['content'].typecode == 'f'
+    for content in ([1e300], [-1e300], [float('nan')], [float('inf')], 'nan'):
+        assert schema.load({'content': content})[1]
+    with pytest.raises(OverflowError):
+        schema.coerce([-1e300])
+    assert PackedSchema.from_spec(SERIES_SCHEMA).load({'content': [1, float('nan')]})[1]
+
+def test_extracts_packed_values(mocker):
+    """Extractors of packed schemas should read repeated query params and reject bad items."""
+    builder = ExtractorBuilder(mocker.Mock())
+    extractor = builder.build_param_extractor(SPEC['paths']['/series']['post']['parameters'][0])
+    builder.schema_builder.build.assert_not_called()
+    req = falcon.Request(testing.create_environ(query_string='ids=1&ids=2,3'))
+    assert extractor.extract(req).value == array.array('i', [1, 2, 3])
+    with pytest.raises(ValidationError):
+        extractor.extract(falcon.Request(testing.create_environ(query_string='ids=x')))
+    trusted = extractor.extract_trusted(req, validate=False, path_params={})
+    assert trusted.value == array.array('i', [1, 2, 3])
+
+def test_encodes_packed_arrays():
+    """Packed arrays should be encoded as JSON arrays, next to records."""
+    assert json.dumps({'v': array.array('q', [1, 2])}, default=encode_result) == '{"v": [1, 2]}'
+    with pytest.raises(TypeError):
+        encode_packed([1])
+
+@pytest.mark.parametrize('create_api', [Aubergine.build_api, compiled_api])
+def test_operations_get_packed_arrays(analytics, create_api):
+    """Operations should receive packed arrays and may return them as responses, both with
+    built and compiled APIs."""
+    client = testing.TestClient(create_api(Aubergine(SPEC)))
+    result = client.simulate_post('/v1/series', query_string='ids=4&ids=5', body='[0.5, 2]')
+    assert result.status_code == 200
+    assert result.json == [0.5, 2.0]
+    kwargs = analytics.total.call_args[1]
+    assert kwargs['body'] == array.array('d', [0.5, 2.0])
+    assert kwargs['ids'] == array.array('i', [4, 5])
+    assert client.simulate_post('/v1/series', query_string='ids=x', body='[1]').status_code == 400
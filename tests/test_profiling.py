@@ -0,0 +1,99 @@
+"""Test cases for profiling of requests."""
+import os
+from falcon import Request
+import pytest
+from aubergine.cli import main
+from aubergine.handlers import RequestHandler
+from aubergine.profiling import (ProfileSettings, RequestProfiler, aggregate_profiles,
+                                 dump_name, operation_of)
+
+
+@pytest.fixture(name='settings')
+def _settings(tmpdir):
+    """Fixture providing profiling settings with a token."""
+    return ProfileSettings(directory=str(tmpdir), token='s3cret')
+
+@pytest.fixture(name='http_req')
+def _http_req(mocker):
+    """Fixture providing HTTP Request mock without any headers."""
+    req = mocker.Mock(spec=Request)
+    req.get_header.return_value = None
+    return req
+
+def busy_operation(**kwargs):
+    """Operation doing some work worth profiling."""
+    return sum(i * i for i in range(1000))
+
+def test_no_profiler_when_disabled():
+    """RequestProfiler.from_spec should return None if requests can't be profiled."""
+    spec = {'operationId': 'shop.buy', 'x-aubergine-profile': {'rate': 0.5}}
+    assert RequestProfiler.from_spec(spec, None) is None
+    assert RequestProfiler.from_spec({'operationId': 'shop.buy'},
+                                     ProfileSettings(directory='.')) is None
+    assert RequestProfiler.from_spec(spec, ProfileSettings(directory='.')).rate == 0.5
+
+def test_rejects_invalid_rate(settings):
+    """RequestProfiler.from_spec should reject rates outside of [0, 1]."""
+    with pytest.raises(ValueError):
+        RequestProfiler.from_spec({'operationId': 'a.b', 'x-aubergine-profile': {'rate': 3}},
+                                  settings)
+
+def test_profiles_on_demand(settings, http_req):
+    """RequestProfiler should profile requests carrying the header with valid token."""
+    profiler = RequestProfiler('shop.buy', settings)
+    assert not profiler.should_profile(http_req)
+    http_req.get_header.return_value = 'guess'
+    assert not profiler.should_profile(http_req)
+    http_req.get_header.return_value = 's3cret'
+    assert profiler.should_profile(http_req)
+    http_req.get_header.assert_called_with('X-Aubergine-Profile')
+    http_req.get_header.return_value = 's3crét'
+    assert not profiler.should_profile(http_req)
+
+def test_runs_unprofiled_if_profiler_fails(settings, mocker):
+    """RequestProfiler should still process the request if the profiler can't be started."""
+    profile = mocker.Mock(**{'enable.side_effect': ValueError('Another profiler is active')})
+    profiler = RequestProfiler('shop.buy', settings._replace(profile_factory=lambda: profile))
+    assert profiler.profile(busy_operation) == busy_operation()
+    profile.dump_stats.assert_not_called()
+
+def test_profiles_sampled_requests(http_req):
+    """RequestProfiler should profile requests sampled at its rate."""
+    profiler = RequestProfiler('shop.buy', ProfileSettings(directory='.'), 0.1,
+                               sample=lambda: 0.05)
+    assert profiler.should_profile(http_req)
+    profiler.sample = lambda: 0.5
+    assert not profiler.should_profile(http_req)
+
+def test_dump_names():
+    """Names of dumps should carry operationId, which can be recovered from them."""
+    name = dump_name('shop.orders.buy', timestamp=12.5, pid=42)
+    assert name == 'shop.orders.buy.12500000.42.pstats'
+    assert operation_of(name) == 'shop.orders.buy'
+    assert operation_of('notes.txt') is None
+
+def test_handler_dumps_profiles(settings, http_req, mocker, tmpdir):
+    """RequestHandler should dump profiles of profiled requests, which can be aggregated."""
+    http_req.get_header.return_value = 's3cret'
+    handler = RequestHandler(path='/a', operation=busy_operation, body_extractor=None,
+                             params_extractors={},
+                             profiler=RequestProfiler('shop.buy', settings))
+    resp = mocker.Mock()
+    handler.handle_request(http_req, resp)
+    handler.handle_request(http_req, resp)
+    assert resp.body == '332833500'
+    assert len(os.listdir(str(tmpdir))) == 2
+    profiles = aggregate_profiles(str(tmpdir))
+    assert list(profiles) == ['shop.buy']
+    stats, count = profiles['shop.buy']
+    assert count == 2
+    assert any(func[2] == 'busy_operation' for func in stats.stats)
+
+def test_cli_reports_profiles(settings, tmpdir, capsys):
+    """The profile-report command should print stats of every operation."""
+    RequestProfiler('shop.buy', settings).profile(busy_operation)
+    assert main(['profile-report', str(tmpdir), '--limit', '5']) == 0
+    out = capsys.readouterr().out
+    assert '=== shop.buy (1 profiles) ===' in out
+    assert 'busy_operation' in out
+    assert main(['profile-report', str(tmpdir), '--operation', 'shop.sell']) == 1
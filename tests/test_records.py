@@ -0,0 +1,79 @@
+"""Test cases for records materialized from validated values."""
+import copy
+import json
+from falcon import testing
+import pytest
+import ymlref
+from aubergine import Aubergine
+from aubergine.common import deep_sizeof, to_plain
+from aubergine.records import RecordFactory, encode_record, record_class
+from tests.conftest import SPEC_CONTENT, compiled_api
+
+
+BOOK_SCHEMA = {'x-aubergine-record': 'Book', 'required': ['title'],
+               'properties': {'title': {'type': 'string'}, 'author': {'type': 'string'},
+                              'pages': {'type': 'integer'}}}
+
+pytestmark = pytest.mark.usefixtures('bookstore')
+
+@pytest.fixture(name='bookstore_operations')
+def _bookstore_operations():
+    """Fixture making the bookstore return added books as they are, possibly as records."""
+    return {'add_book': lambda body: body}
+
+def test_creates_slotted_classes():
+    """The record_class function should create slotted classes with optional fields."""
+    cls = record_class('Point', ['x', 'y'])
+    point = cls(1)
+    assert (point.x, point.y) == (1, None)
+    assert not hasattr(point, '__dict__')
+    assert point == cls(x=1) and point != cls(2)
+    assert repr(point) == 'Point(x=1, y=None)'
+    assert copy.deepcopy(point) == point
+    with pytest.raises(ValueError):
+        record_class('Bad', ['first-name'])
+
+def test_materializes_nested_records():
+    """RecordFactory should materialize records nested in arrays and plain objects."""
+    factory = RecordFactory()
+    schema = {'properties': {'books': {'type': 'array', 'items': BOOK_SCHEMA},
+                             'total': {'type': 'integer'}}}
+    value = factory.materializer(schema)({'books': [{'title': 'Dune', 'extra': 1}],
+                                          'total': 1})
+    assert value['total'] == 1
+    book = value['books'][0]
+    assert (type(book).__name__, book.title, book.pages) == ('Book', 'Dune', None)
+    assert factory.record_class(dict(BOOK_SCHEMA)) is type(book)
+    assert factory.materializer({'type': 'array', 'items': {'type': 'integer'}}) is None
+
+def test_records_are_smaller():
+    """Records should occupy a fraction of the memory of equivalent dicts."""
+    materialize = RecordFactory().materializer({'type': 'array', 'items': BOOK_SCHEMA})
+    items = [{'title': 't', 'author': 'a', 'pages': 1} for _ in range(100)]
+    records = materialize(items)
+    shared = set()
+    deep_sizeof(items[0]['title'], shared)
+    deep_sizeof(items[0]['author'], shared)
+    assert deep_sizeof(records, set(shared)) * 2 < deep_sizeof(items, set(shared))
+
+def test_encodes_records():
+    """The encode_record function should let json.dumps serialize records."""
+    book = RecordFactory().materializer(BOOK_SCHEMA)({'title': 'Dune'})
+    assert json.loads(json.dumps([book], default=encode_record)) == [
+        {'title': 'Dune', 'author': None, 'pages': None}]
+    with pytest.raises(TypeError):
+        encode_record(object())
+
+@pytest.mark.parametrize('create_api', [Aubergine.build_api, compiled_api])
+def test_operations_get_records(bookstore, create_api):
+    """Bodies of schemas using records should be passed to operations as records, both by
+    built and compiled APIs."""
+    spec_dict = to_plain(ymlref.load(SPEC_CONTENT))
+    spec_dict['components']['schemas']['NewBook']['x-aubergine-record'] = True
+    spec_dict['paths']['/books']['post']['requestBody']['content']['application/json'][
+        'schema'] = spec_dict['components']['schemas']['NewBook']
+    client = testing.TestClient(create_api(Aubergine(spec_dict)))
+    result = client.simulate_post('/v1/rest/books', body='{"title": "Dune"}')
+    assert result.json == {'title': 'Dune', 'author': None, 'genre': None}
+    body = bookstore.add_book.call_args[1]['body']
+    assert (type(body).__name__, body.title) == ('Record', 'Dune')
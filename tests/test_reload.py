@@ -0,0 +1,185 @@
+"""Test cases for hot reloading of the specification."""
+import importlib
+import os
+import falcon
+from falcon import testing
+import pytest
+from aubergine.extractors import ExtractorBuilder
+from aubergine.reload import ReloadableResource, SpecWatcher, diff_paths
+from aubergine.security import Authenticator
+from aubergine import Aubergine
+
+
+SPEC_TEMPLATE = """
+openapi: "3.0.0"
+servers:
+  - url: /v1
+info:
+  version: 1.0.0
+  title: Reloadable
+paths:
+  /books:
+    get:
+      operationId: bookstore.{books_op}
+  /authors:
+    get:
+      operationId: bookstore.get_authors
+"""
+
+SECURITY = """
+security:
+  - token: []
+components:
+  securitySchemes:
+    token:
+      type: http
+      scheme: bearer
+"""
+
+@pytest.fixture(name='import_module')
+def _import_module(mocker):
+    """Fixture providing import_module mock."""
+    return mocker.Mock(spec_set=importlib.import_module)
+
+@pytest.fixture(name='extractor_factory')
+def _extractor_factory(mocker):
+    """Fixture providing ExtractorBuilder mock."""
+    return mocker.Mock(spec_set=ExtractorBuilder)
+
+@pytest.fixture(name='spec_file')
+def _spec_file(tmpdir):
+    """Fixture providing path to the specification file."""
+    spec_file = tmpdir.join('spec.yml')
+    spec_file.write(SPEC_TEMPLATE.format(books_op='get_all'))
+    return spec_file
+
+def test_diff_paths():
+    """The diff_paths function should report added, removed and changed operations."""
+    old = {'/a': {'get': {'operationId': 'x.a'}, 'post': {'operationId': 'x.b'}},
+           '/b': {'get': {'operationId': 'x.c'}}}
+    new = {'/a': {'get': {'operationId': 'x.a'}, 'post': {'operationId': 'x.d'}},
+           '/c': {'put': {'operationId': 'x.e'}}}
+    diff = diff_paths(old, new)
+    assert diff.added == {('/c', 'put')}
+    assert diff.removed == {('/b', 'get')}
+    assert diff.changed == {('/a', 'post')}
+
+def test_resource_dispatches(mocker):
+    """ReloadableResource should forward requests to the handler of given method."""
+    handler = mocker.Mock()
+    resource = ReloadableResource('/a', {'get': handler})
+    resource.on_get('req', 'resp', a=1)
+    handler.handle_request.assert_called_once_with('req', 'resp', a=1)
+    with pytest.raises(falcon.HTTPMethodNotAllowed):
+        resource.on_post('req', 'resp')
+
+def test_resource_swaps(mocker):
+    """ReloadableResource should use new handlers after swap."""
+    old, new = mocker.Mock(), mocker.Mock()
+    resource = ReloadableResource('/a', {'get': old})
+    resource.swap({'get': new})
+    resource.on_get('req', 'resp')
+    new.handle_request.assert_called_once_with('req', 'resp')
+    old.handle_request.assert_not_called()
+    resource.swap({})
+    with pytest.raises(falcon.HTTPNotFound):
+        resource.on_get('req', 'resp')
+
+def test_rebuilds_only_changed(spec_file, extractor_factory, import_module):
+    """SpecWatcher should rebuild changed operations and keep the unchanged ones."""
+    app = Aubergine.from_file(str(spec_file))
+    api = app.build_api(ex_factory=extractor_factory, import_module=import_module, watch=True,
+                        watch_interval=60)
+    app.watcher.stop()
+    authors_handler = app.watcher.resources['/authors'].handlers['GET']
+    books_handler = app.watcher.resources['/books'].handlers['GET']
+
+    spec_file.write(SPEC_TEMPLATE.format(books_op='get_new'))
+    app.watcher.reload()
+
+    assert app.watcher.resources['/authors'].handlers['GET'] is authors_handler
+    new_handler = app.watcher.resources['/books'].handlers['GET']
+    assert new_handler is not books_handler
+    assert new_handler.operation == import_module.return_value.get_new
+    assert app.spec_dict['paths']['/books']['get']['operationId'] == 'bookstore.get_new'
+    assert isinstance(api, falcon.API)
+
+def test_keeps_old_routes_on_failure(spec_file, extractor_factory, import_module):
+    """SpecWatcher should leave all routes untouched if new handlers cannot be built."""
+    app = Aubergine.from_file(str(spec_file))
+    app.build_api(ex_factory=extractor_factory, import_module=import_module, watch=True,
+                  watch_interval=60)
+    app.watcher.stop()
+    books_handler = app.watcher.resources['/books'].handlers['GET']
+    import_module.side_effect = ImportError('bookstore')
+    spec_file.write(SPEC_TEMPLATE.format(books_op='get_new'))
+    with pytest.raises(ImportError):
+        app.watcher.reload()
+    assert app.watcher.resources['/books'].handlers['GET'] is books_handler
+
+def test_watch_requires_file(extractor_factory, import_module):
+    """Aubergine.build_api should refuse to watch app not loaded from file."""
+    app = Aubergine({'info': {'title': 'x', 'version': '1'}, 'servers': [{'url': '/'}],
+                     'paths': {}})
+    with pytest.raises(ValueError):
+        app.build_api(ex_factory=extractor_factory, import_module=import_module, watch=True)
+
+def test_watcher_is_created(spec_file, extractor_factory, import_module, mocker):
+    """Aubergine.build_api should start SpecWatcher when asked to watch the spec."""
+    start = mocker.patch.object(SpecWatcher, 'start')
+    app = Aubergine.from_file(str(spec_file))
+    app.build_api(ex_factory=extractor_factory, import_module=import_module, watch=True)
+    start.assert_called_once_with()
+    assert app.watcher.base_path == '/v1'
+
+def test_applies_new_security(spec_file, extractor_factory, import_module):
+    """SpecWatcher should rebind security to the reloaded spec and rebuild all operations."""
+    app = Aubergine.from_file(str(spec_file))
+    app.build_api(ex_factory=extractor_factory, import_module=import_module, watch=True,
+                  watch_interval=60, security=Authenticator({'token': lambda token: token}))
+    app.watcher.stop()
+    assert app.watcher.resources['/authors'].handlers['GET'].security is None
+    spec_file.write(SPEC_TEMPLATE.format(books_op='get_all') + SECURITY)
+    app.watcher.reload()
+    policy = app.watcher.resources['/authors'].handlers['GET'].security
+    assert [scheme.name for scheme in policy.alternatives[0]] == ['token']
+    assert app.watcher.options['security'].schemes == {'token': {'type': 'http',
+                                                                 'scheme': 'bearer'}}
+
+def test_serves_added_paths(spec_file, extractor_factory, import_module, mocker):
+    """Paths added by reloads should be served without touching the router of the API."""
+    app = Aubergine.from_file(str(spec_file))
+    api = app.build_api(ex_factory=extractor_factory, import_module=import_module, watch=True,
+                        watch_interval=60)
+    app.watcher.stop()
+    add_route = mocker.spy(falcon.API, 'add_route')
+    import_module.return_value.get_chapters.return_value = ['prologue']
+    spec_file.write(SPEC_TEMPLATE.format(books_op='get_all') + """
+  /books/{book_id}/chapters:
+    get:
+      operationId: bookstore.get_chapters
+""")
+    app.watcher.reload()
+    client = testing.TestClient(api)
+    assert client.simulate_get('/v1/books/7/chapters').json == ['prologue']
+    import_module.return_value.get_chapters.assert_called_once_with()
+    assert client.simulate_post('/v1/books/7/chapters').status_code == 405
+    assert client.simulate_get('/v1/books/7/pages').status_code == 404
+    add_route.assert_not_called()
+    assert all(list(handlers) == ['get'] for handlers in app.routes.values())
+
+def test_retries_failed_reloads(spec_file, extractor_factory, import_module):
+    """SpecWatcher should reload files fixed after a failed reload, even with the same mtime."""
+    app = Aubergine.from_file(str(spec_file))
+    app.build_api(ex_factory=extractor_factory, import_module=import_module, watch=True,
+                  watch_interval=60)
+    app.watcher.stop()
+    mtime = os.stat(str(spec_file)).st_mtime + 10
+    spec_file.write('paths: [')
+    os.utime(str(spec_file), (mtime, mtime))
+    assert not app.watcher.check()
+    spec_file.write(SPEC_TEMPLATE.format(books_op='get_new'))
+    os.utime(str(spec_file), (mtime, mtime))
+    assert app.watcher.check()
+    assert app.spec_dict['paths']['/books']['get']['operationId'] == 'bookstore.get_new'
+    assert not app.watcher.check()
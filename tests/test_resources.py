@@ -0,0 +1,67 @@
+"""Test cases for resources injected into operations."""
+from falcon import Request
+import pytest
+from aubergine.handlers import RequestHandler
+from aubergine.resources import ResourceRegistry
+from aubergine import utils
+
+
+@pytest.fixture(name='registry')
+def _registry(mocker):
+    """Fixture providing registry with two resources."""
+    registry = ResourceRegistry({'db': mocker.Mock(side_effect=lambda: object())})
+    registry.register('http', mocker.Mock(side_effect=lambda: object()), close=mocker.Mock())
+    return registry
+
+def test_no_binding_without_declaration(registry):
+    """ResourceRegistry.bind should return None if operation declares no resources."""
+    assert registry.bind({'operationId': 'a.b'}) is None
+
+def test_binds_list_and_mapping(registry):
+    """ResourceRegistry.bind should accept lists of names and mappings kwarg -> name."""
+    assert registry.bind({'x-aubergine-resources': ['db']}).pairs == (('db', 'db'),)
+    binding = registry.bind({'x-aubergine-resources': {'session': 'http'}})
+    assert binding.pairs == (('session', 'http'),)
+
+@pytest.mark.parametrize('declared', [['cache'], {'limit': 'db'}])
+def test_rejects_invalid_declarations(registry, declared):
+    """ResourceRegistry.bind should reject unknown resources and clashing arguments."""
+    with pytest.raises(ValueError):
+        registry.bind({'operationId': 'a.b', 'x-aubergine-resources': declared},
+                      reserved={'limit'})
+
+def test_creates_resources_once(registry):
+    """Resources should be created lazily, once per process, and recreated after close."""
+    binding = registry.bind({'x-aubergine-resources': ['db', 'http']})
+    factory = registry._factories['db'] # pylint: disable=protected-access
+    factory.assert_not_called()
+    first = binding.kwargs()
+    assert binding.kwargs() is first
+    assert factory.call_count == 1
+    close = registry._closers['http'] # pylint: disable=protected-access
+    registry.close()
+    close.assert_called_once_with(first['http'])
+    assert binding.kwargs()['db'] is not first['db']
+
+def test_recreates_resources_after_fork(registry, mocker):
+    """Resources inherited from the parent process should not be used by forked workers."""
+    binding = registry.bind({'x-aubergine-resources': ['db']})
+    parent = binding.kwargs()['db']
+    mocker.patch('aubergine.resources.os.getpid', return_value=-1)
+    assert binding.kwargs()['db'] is not parent
+
+def test_handler_injects_resources(registry, mocker):
+    """RequestHandler should pass resources to the operation along with parameters."""
+    operation = mocker.Mock(return_value=None)
+    extractor = mocker.Mock(**{'extract.return_value': (True, 5)})
+    handler = RequestHandler(path='/a', operation=operation, body_extractor=None,
+                             params_extractors={'limit': extractor},
+                             resources=registry.bind({'x-aubergine-resources': ['db']}))
+    handler.handle_request(mocker.Mock(spec=Request), mocker.Mock())
+    operation.assert_called_once_with(limit=5, db=registry.get('db'))
+
+def test_create_handler_requires_registry(mocker):
+    """The create_handler function should refuse resources declared without a registry."""
+    spec = {'operationId': 'os.getcwd', 'x-aubergine-resources': ['db']}
+    with pytest.raises(ValueError):
+        utils.create_handler('/a', spec, mocker.Mock())
@@ -0,0 +1,49 @@
+"""Test cases for pre-encoded responses."""
+import io
+import mmap
+import falcon
+from falcon import testing
+import pytest
+from aubergine import RawResponse
+from aubergine.handlers import RequestHandler
+
+
+@pytest.fixture(name='resp')
+def _resp():
+    """Fixture providing falcon response."""
+    return falcon.Response()
+
+def test_writes_bytes_to_data(resp):
+    """RawResponse should pass bytes to resp.data without copying them."""
+    data = b'{"id": 1}'
+    RawResponse(data, status=201).apply(resp)
+    assert resp.data is data
+    assert resp.status == falcon.HTTP_201
+    assert resp.content_type == 'application/json'
+
+def test_writes_file_to_stream(resp):
+    """RawResponse should pass file-like objects to resp.stream."""
+    stream = io.BytesIO(b'a,b\n')
+    RawResponse(stream, content_type='text/csv', length=4).apply(resp)
+    assert resp.stream is stream
+    assert resp.stream_len == 4
+    assert resp.content_type == 'text/csv'
+
+def test_writes_mmap_to_stream(resp):
+    """RawResponse should stream mmaps, sending their length."""
+    mapped = mmap.mmap(-1, 16)
+    RawResponse(mapped).apply(resp)
+    assert resp.stream is mapped
+    assert resp.stream_len == 16
+
+def test_handler_skips_serialization(mocker):
+    """RequestHandler should send raw responses without serializing them."""
+    json_mock = mocker.patch('aubergine.handlers.json')
+    handler = RequestHandler(path='/a', operation=lambda: RawResponse(b'[1, 2]'),
+                             body_extractor=None, params_extractors={})
+    api = falcon.API()
+    api.add_route('/a', type('Resource', (), {'on_get': handler.handle_request})())
+    result = testing.TestClient(api).simulate_get('/a')
+    assert result.content == b'[1, 2]'
+    assert result.headers['content-type'] == 'application/json'
+    json_mock.dumps.assert_not_called()
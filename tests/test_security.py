@@ -0,0 +1,170 @@
+"""Test cases for enforcement of security requirements."""
+import base64
+import sys
+import types
+import falcon
+from falcon import testing
+import pytest
+from aubergine import Aubergine
+from aubergine.security import Authenticator, SecurityScheme, TTLCache
+
+
+SPEC = {
+    'openapi': '3.0.0',
+    'info': {'title': 'Vault', 'version': '1.0.0'},
+    'servers': [{'url': '/api'}],
+    'security': [{'token': []}],
+    'components': {'securitySchemes': {
+        'token': {'type': 'http', 'scheme': 'bearer'},
+        'key': {'type': 'apiKey', 'in': 'header', 'name': 'X-Api-Key'},
+        'login': {'type': 'http', 'scheme': 'basic'}}},
+    'paths': {
+        '/secrets': {
+            'get': {'operationId': 'vault.list_secrets', 'responses': {}},
+            'post': {'operationId': 'vault.add_secret', 'security': [{'key': [], 'login': []}],
+                     'requestBody': {'required': True, 'content': {
+                         'application/json': {'schema': {'type': 'string'}}}},
+                     'responses': {}}},
+        '/health': {'get': {'operationId': 'vault.health', 'security': [], 'responses': {}}}}}
+
+
+class FakeClock:
+    """Clock advanced manually."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(name='vault', autouse=True)
+def _vault(monkeypatch):
+    """Fixture providing fake vault module with operations used in the spec."""
+    module = types.ModuleType('vault')
+    module.list_secrets = lambda: ['s3cret']
+    module.add_secret = lambda body: body
+    module.health = lambda: 'ok'
+    monkeypatch.setitem(sys.modules, 'vault', module)
+    return module
+
+@pytest.fixture(name='verifiers')
+def _verifiers(mocker):
+    """Fixture providing verifiers of the vault's security schemes."""
+    return {'token': mocker.Mock(side_effect=lambda token: 'alice' if token == 'good' else None),
+            'key': mocker.Mock(return_value='service'),
+            'login': mocker.Mock(side_effect=lambda cred: cred[0] if cred[1] == 'pw' else None)}
+
+@pytest.fixture(name='clock')
+def _clock():
+    """Fixture providing fake clock."""
+    return FakeClock()
+
+@pytest.fixture(name='client')
+def _client(verifiers, clock):
+    """Fixture providing test client of the vault API with enforced security."""
+    api = Aubergine(SPEC).build_api(security=Authenticator(verifiers, ttl=60, negative_ttl=5,
+                                                            clock=clock))
+    return testing.TestClient(api)
+
+def _basic(username, password):
+    token = base64.b64encode('{}:{}'.format(username, password).encode()).decode()
+    return 'Basic ' + token
+
+def test_ttl_cache_expires_and_evicts():
+    """TTLCache should forget expired entries and evict least recently used ones."""
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, clock=clock)
+    cache.put('a', 1, ttl=10)
+    cache.put('b', 2, ttl=1)
+    assert cache.get('a') == (True, 1)
+    cache.put('c', 3, ttl=10)
+    assert cache.get('b') == (False, None)
+    clock.now = 5
+    cache.put('c', 3, ttl=10)
+    clock.now = 10
+    assert cache.get('a') == (False, None)
+    assert cache.get('c') == (True, 3)
+
+def test_rejects_unsupported_schemes():
+    """SecurityScheme should refuse schemes other than apiKey, bearer and basic."""
+    with pytest.raises(ValueError):
+        SecurityScheme('oauth', {'type': 'oauth2', 'flows': {}})
+
+def test_rejects_schemes_without_verifiers():
+    """Building API should fail if some required scheme has no verifier."""
+    with pytest.raises(ValueError):
+        Aubergine(SPEC).build_api(security=Authenticator({'token': lambda token: token}))
+
+def test_authenticates_bearer_tokens(client):
+    """Requests should need valid bearer token required by the spec-wide security."""
+    result = client.simulate_get('/api/secrets')
+    assert result.status_code == 401
+    assert result.headers['WWW-Authenticate'] == 'Bearer'
+    headers = {'Authorization': 'Bearer bad'}
+    assert client.simulate_get('/api/secrets', headers=headers).status_code == 401
+    headers = {'Authorization': 'Bearer good'}
+    assert client.simulate_get('/api/secrets', headers=headers).json == ['s3cret']
+
+def test_caches_verification(client, verifiers, clock):
+    """Results of verifiers should be cached, failures for a shorter time."""
+    for token in ('good', 'good', 'bad', 'bad'):
+        client.simulate_get('/api/secrets', headers={'Authorization': 'Bearer ' + token})
+    assert verifiers['token'].call_count == 2
+    clock.now = 10
+    for token in ('good', 'bad'):
+        client.simulate_get('/api/secrets', headers={'Authorization': 'Bearer ' + token})
+    assert verifiers['token'].call_count == 3
+
+def test_requires_all_schemes_of_requirement(client, verifiers):
+    """Operation's security should override spec-wide one and need all of its schemes."""
+    headers = {'X-Api-Key': 'k1', 'Authorization': _basic('bob', 'nope')}
+    assert client.simulate_post('/api/secrets', headers=headers, body='"x"').status_code == 401
+    headers['Authorization'] = _basic('bob', 'pw')
+    assert client.simulate_post('/api/secrets', headers=headers, body='"x"').json == 'x'
+    verifiers['key'].assert_called_once_with('k1')
+    verifiers['login'].assert_called_with(('bob', 'pw'))
+
+def test_rejects_before_reading_body(client, mocker):
+    """Unauthenticated requests should be rejected without reading their bodies."""
+    read = mocker.patch('aubergine.extractors.Extractor.extract', autospec=True)
+    assert client.simulate_post('/api/secrets', body='"x"').status_code == 401
+    read.assert_not_called()
+
+def test_empty_security_disables_authentication(client):
+    """Operations with empty security should be accessible without credentials."""
+    assert client.simulate_get('/api/health').json == 'ok'
+
+def test_stores_principal(verifiers, mocker):
+    """Authenticated principal should be available to hooks and operations."""
+    policy = Authenticator(verifiers).for_spec(SPEC).policy_for({'operationId': 'a.b'})
+    req = mocker.Mock(spec=falcon.Request, context={})
+    req.get_header.return_value = 'Bearer good'
+    policy(req, mocker.Mock(), {})
+    assert req.context['principal'] == 'alice'
+
+def test_optional_authentication(verifiers, mocker):
+    """Valid credentials should be authenticated even if anonymous access is listed first."""
+    spec = dict(SPEC, security=[{}, {'token': []}])
+    policy = Authenticator(verifiers).for_spec(spec).policy_for({'operationId': 'a.b'})
+    req = mocker.Mock(spec=falcon.Request, context={})
+    req.get_header.return_value = 'Bearer good'
+    policy(req, mocker.Mock(), {})
+    assert req.context['principal'] == 'alice'
+    req = mocker.Mock(spec=falcon.Request, context={})
+    req.get_header.return_value = None
+    policy(req, mocker.Mock(), {})
+    assert req.context['principal'] is None
+
+def test_authenticates_before_admission(verifiers):
+    """Rejected credentials should not take tokens of operation's rate limit."""
+    spec = dict(SPEC, paths=dict(SPEC['paths']))
+    spec['paths']['/secrets'] = dict(
+        SPEC['paths']['/secrets'],
+        get=dict(SPEC['paths']['/secrets']['get'], **{'x-aubergine-limits': {'rate': 1}}))
+    client = testing.TestClient(Aubergine(spec).build_api(security=Authenticator(verifiers)))
+    for _ in range(3):
+        result = client.simulate_get('/api/secrets', headers={'Authorization': 'Bearer bad'})
+        assert result.status_code == 401
+    result = client.simulate_get('/api/secrets', headers={'Authorization': 'Bearer good'})
+    assert result.status_code == 200
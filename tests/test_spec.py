@@ -0,0 +1,110 @@
+"""Test cases for lazy specification loader."""
+import io
+import pytest
+from aubergine.spec import SpecLoader, SpecMapping
+from aubergine import Aubergine
+
+
+SPEC_CONTENT = """
+openapi: "3.0.0"
+servers:
+  - url: /v1
+info:
+  version: 1.0.0
+  title: Lazy
+paths:
+  /books:
+    post:
+      operationId: bookstore.add_book
+      requestBody:
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/Book'
+    put:
+      operationId: bookstore.put_book
+      requestBody:
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/Book'
+components:
+  schemas:
+    Book:
+      properties:
+        title:
+          type: string
+        author:
+          $ref: 'authors.yml#/Author'
+"""
+
+AUTHORS_CONTENT = """
+Author:
+  type: string
+"""
+
+@pytest.fixture(name='open_local')
+def _open_local(mocker):
+    """Fixture providing function opening fake local files."""
+    return mocker.Mock(side_effect=lambda path: io.StringIO(AUTHORS_CONTENT))
+
+@pytest.fixture(name='loader')
+def _loader(open_local):
+    """Fixture providing SpecLoader instance."""
+    return SpecLoader(base_dir='specs', open_local=open_local)
+
+def _body_schema(spec, method):
+    return spec['paths']['/books'][method]['requestBody']['content']['application/json']['schema']
+
+def test_resolves_references(loader):
+    """SpecLoader should transparently resolve internal references."""
+    spec = loader.load(SPEC_CONTENT)
+    assert _body_schema(spec, 'post')['properties']['title'] == {'type': 'string'}
+
+def test_shares_referenced_components(loader):
+    """SpecLoader should share one object for every place referring to the same component."""
+    spec = loader.load(SPEC_CONTENT)
+    book = spec['components']['schemas']['Book']
+    assert _body_schema(spec, 'post') is book
+    assert _body_schema(spec, 'put') is book
+
+def test_resolves_lazily(loader, open_local):
+    """SpecLoader should load external documents only when reference is accessed."""
+    spec = loader.load(SPEC_CONTENT)
+    open_local.assert_not_called()
+    book = spec['components']['schemas']['Book']
+    assert book['properties']['author'] == {'type': 'string'}
+    assert spec['components']['schemas']['Book']['properties']['author'] == {'type': 'string'}
+    open_local.assert_called_once_with('specs/authors.yml')
+
+def test_resolves_relative_to_remote_documents(open_local, mocker):
+    """References relative to remote documents should be loaded from the same host."""
+    documents = {'http://host/specs/a.yml': "author: {$ref: 'b.yml#/Author'}",
+                 'http://host/specs/b.yml': AUTHORS_CONTENT}
+    open_remote = mocker.Mock(side_effect=lambda uri: io.StringIO(documents[uri]))
+    loader = SpecLoader(open_local=open_local, open_remote=open_remote)
+    spec = loader.load("book: {$ref: 'http://host/specs/a.yml#/author'}")
+    assert spec['book'] == {'type': 'string'}
+    open_local.assert_not_called()
+    assert open_remote.call_count == 2
+
+def test_reports_footprint(loader):
+    """SpecLoader.footprint should account for materialized nodes and shared references."""
+    spec = loader.load(SPEC_CONTENT)
+    before = loader.footprint()
+    _body_schema(spec, 'post')
+    _body_schema(spec, 'put')
+    after = loader.footprint()
+    assert before.raw_bytes > 0
+    assert after.nodes > before.nodes
+    assert after.node_bytes > before.node_bytes
+    assert after.refs == 1
+
+def test_from_file_lazy(tmpdir):
+    """Aubergine.from_file should use SpecLoader if asked to load spec lazily."""
+    spec_file = tmpdir.join('spec.yml')
+    spec_file.write(SPEC_CONTENT)
+    app = Aubergine.from_file(str(spec_file), lazy=True)
+    assert isinstance(app.spec_dict, SpecMapping)
+    assert isinstance(app.spec_loader, SpecLoader)
+    assert app.spec_dict['info']['title'] == 'Lazy'
@@ -0,0 +1,81 @@
+"""Test cases for measuring startup phases."""
+import importlib
+import threading
+import time
+import pytest
+import ymlref
+from aubergine.extractors import ExtractorBuilder
+from aubergine.timing import BuildTimer, TimedExtractorBuilder
+from aubergine import Aubergine
+from tests.conftest import SPEC_CONTENT
+
+
+@pytest.fixture(name='clock')
+def _clock(mocker):
+    """Fixture providing fake clock advancing by one second on every call."""
+    return mocker.Mock(side_effect=range(100))
+
+@pytest.fixture(name='extractor_factory')
+def _extractor_factory(mocker):
+    """Fixture providing ExtractorBuilder mock."""
+    return mocker.Mock(spec_set=ExtractorBuilder)
+
+@pytest.fixture(name='import_module')
+def _import_module(mocker):
+    """Fixture providing importlib.import_module mock."""
+    return mocker.Mock(spec_set=importlib.import_module)
+
+def test_accumulates_phases(clock):
+    """BuildTimer should sum times and count calls for every phase."""
+    timer = BuildTimer(clock=clock)
+    with timer.phase('a'):
+        pass
+    timer.wrap('a', lambda: None)()
+    with timer.phase('b'):
+        pass
+    assert timer.report() == {'a': (2.0, 2), 'b': (1.0, 1)}
+    assert list(timer.report()) == ['a', 'b']
+
+def test_timed_extractor_builder(clock, extractor_factory):
+    """TimedExtractorBuilder should delegate to wrapped builder and record time."""
+    timer = BuildTimer(clock=clock)
+    builder = TimedExtractorBuilder(extractor_factory, timer)
+    result = builder.build_param_extractor({'name': 'id'})
+    extractor_factory.build_param_extractor.assert_called_once_with({'name': 'id'})
+    assert result == extractor_factory.build_param_extractor.return_value
+    assert timer.report()[BuildTimer.SCHEMA_COMPILE].calls == 1
+
+def test_reports_build_phases(extractor_factory, import_module):
+    """Aubergine.build_api should record all startup phases in given timer."""
+    timer = BuildTimer()
+    Aubergine(ymlref.load(SPEC_CONTENT)).build_api(ex_factory=extractor_factory,
+                                                   import_module=import_module, timer=timer)
+    report = timer.report()
+    assert report[BuildTimer.SCHEMA_COMPILE].calls == 3
+    assert report[BuildTimer.MODULE_IMPORT].calls == 2
+    assert report[BuildTimer.ROUTE_REGISTRATION].calls == 1
+
+def test_builds_concurrently(extractor_factory, import_module, mocker):
+    """Aubergine.build_api should build handlers in threads and register them in spec order."""
+    threads = set()
+    def _import(name):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.01)
+        return importlib.import_module('json')
+    import_module.side_effect = _import
+    create_resource = mocker.patch('aubergine.aubergine.utils.create_resource')
+    app = Aubergine(ymlref.load(SPEC_CONTENT.replace('bookstore.get_all', 'bookstore.loads')
+                                .replace('bookstore.add_book', 'bookstore.dumps')))
+    app.build_api(ex_factory=extractor_factory, import_module=import_module, workers=2)
+    assert len(threads) == 2
+    handlers = create_resource.call_args[0][0]
+    # Declared operations come in spec order, followed by derived HEAD and OPTIONS.
+    assert list(handlers) == ['get', 'post', 'head', 'options']
+    assert handlers['get'].operation is importlib.import_module('json').loads
+
+def test_concurrent_build_reports_first_error(extractor_factory, import_module):
+    """Aubergine.build_api should raise error of the first failing operation in spec order."""
+    import_module.side_effect = lambda name: None
+    app = Aubergine(ymlref.load(SPEC_CONTENT))
+    with pytest.raises(AttributeError, match='get_all'):
+        app.build_api(ex_factory=extractor_factory, import_module=import_module, workers=4)
@@ -0,0 +1,84 @@
+"""Test cases for validation policies of trusted callers."""
+from falcon import HTTPBadRequest, Request
+from marshmallow import UnmarshalResult
+import pytest
+from aubergine.extractors import Extractor, ValidationError, build_coercer
+from aubergine.handlers import RequestHandler
+from aubergine.validation import ValidationMode, ValidationPolicy
+
+
+@pytest.fixture(name='http_req')
+def _http_req(mocker):
+    """Fixture providing HTTP Request mock."""
+    return mocker.Mock(spec=Request)
+
+@pytest.fixture(name='schema')
+def _schema(mocker):
+    """Fixture providing schema mock always failing validation."""
+    schema = mocker.Mock()
+    schema.load.return_value = UnmarshalResult({}, {'content': ['Not a valid integer.']})
+    return schema
+
+@pytest.fixture(name='extractor')
+def _extractor(schema, mocker):
+    """Fixture providing extractor of integer parameter."""
+    return Extractor(schema=schema, decoder=mocker.Mock(decode=lambda raw: raw),
+                     required=False, read_data=mocker.Mock(return_value='12'),
+                     coerce=build_coercer({'type': 'integer'}))
+
+@pytest.mark.parametrize('spec', [{}, {'x-aubergine-validation': {'mode': 'full'}}])
+def test_no_policy_for_full_validation(spec):
+    """ValidationPolicy.from_spec should return None for fully validated operations."""
+    assert ValidationPolicy.from_spec(spec, lambda req: True) is None
+
+def test_no_policy_without_trusted_source():
+    """ValidationPolicy.from_spec should return None if no trusted source is given."""
+    spec = {'x-aubergine-validation': {'mode': 'coerce'}}
+    assert ValidationPolicy.from_spec(spec, None) is None
+
+def test_rejects_invalid_rate():
+    """ValidationPolicy.from_spec should reject sampling rates outside of [0, 1]."""
+    with pytest.raises(ValueError):
+        ValidationPolicy.from_spec({'x-aubergine-validation': {'mode': 'sampled', 'rate': 2}},
+                                   lambda req: True)
+
+def test_samples_at_rate():
+    """ValidationPolicy.should_sample should compare random sample with the rate."""
+    policy = ValidationPolicy(ValidationMode.SAMPLED, None, 0.25, sample=lambda: 0.2)
+    assert policy.should_sample()
+    policy.sample = lambda: 0.3
+    assert not policy.should_sample()
+    assert not ValidationPolicy(ValidationMode.COERCE, None, 0.25).should_sample()
+
+@pytest.mark.parametrize('validate', [True, False])
+def test_extract_trusted_coerces(http_req, extractor, schema, validate):
+    """Extractor.extract_trusted should coerce value and validate it only if asked to."""
+    result = extractor.extract_trusted(http_req, validate, {})
+    assert result.present
+    assert result.value == 12
+    assert schema.load.called == validate
+
+def test_extract_trusted_raises_on_failed_coercion(http_req, extractor):
+    """Extractor.extract_trusted should raise ValidationError if value cannot be coerced."""
+    extractor.read_data.return_value = 'twelve'
+    with pytest.raises(ValidationError):
+        extractor.extract_trusted(http_req, False, {})
+
+def test_coercer_for_arrays():
+    """The build_coercer function should coerce items of arrays of primitives."""
+    assert build_coercer({'type': 'array', 'items': {'type': 'number'}})(['1', 2]) == [1.0, 2.0]
+    value = {'a': '1'}
+    assert build_coercer({'type': 'object'})(value) is value
+
+def test_handler_uses_policy(http_req, extractor, mocker):
+    """RequestHandler should skip rejecting validation only for trusted callers."""
+    operation = mocker.Mock(return_value=None)
+    trusted = mocker.Mock(return_value=True)
+    handler = RequestHandler(path='/a', operation=operation, body_extractor=None,
+                             params_extractors={'id': extractor},
+                             validation_policy=ValidationPolicy(ValidationMode.COERCE, trusted))
+    handler.handle_request(http_req, mocker.Mock())
+    operation.assert_called_once_with(id=12)
+    trusted.return_value = False
+    with pytest.raises(HTTPBadRequest):
+        handler.handle_request(http_req, mocker.Mock())
@@ -0,0 +1,92 @@
+"""Test cases for warm-up and readiness of built APIs."""
+import subprocess
+import sys
+from falcon import testing
+import pytest
+import ymlref
+from aubergine import Aubergine
+from aubergine.common import to_plain
+from aubergine.security import Authenticator
+from aubergine.warmup import ReadinessResource, Warmup, WarmupSettings
+from tests.conftest import SPEC_CONTENT
+
+
+pytestmark = pytest.mark.usefixtures('bookstore')
+
+@pytest.fixture(name='app')
+def _app():
+    """Fixture providing Aubergine app for the bookstore spec."""
+    return Aubergine(ymlref.load(SPEC_CONTENT))
+
+def test_readiness_before_warmup(app):
+    """ReadinessResource should respond with 503 until the warm-up finishes."""
+    api = app.build_api()
+    api.add_route('/ready', ReadinessResource(Warmup(app, WarmupSettings())))
+    result = testing.TestClient(api).simulate_get('/ready')
+    assert result.status_code == 503
+    assert result.headers['Retry-After'] == '1'
+
+def test_warms_up_with_stubs(app, bookstore):
+    """Warm-up should send requests through the API without calling stubbed operations."""
+    api = app.build_api(warmup=WarmupSettings(rounds=2, background=False, seed=1))
+    assert app.warmup.ready
+    assert app.warmup.report.requests == 4
+    assert app.warmup.report.statuses['bookstore.add_book'] == {200: 2}
+    bookstore.get_all.assert_not_called()
+    bookstore.add_book.assert_not_called()
+    client = testing.TestClient(api)
+    assert client.simulate_get('/ready').json == {'status': 'ready'}
+    assert client.simulate_get('/v1/rest/books').json == []
+    bookstore.get_all.assert_called_once_with()
+
+def test_warms_up_operations(app, bookstore):
+    """Warm-up should call operations when they are not stubbed."""
+    app.build_api(warmup=WarmupSettings(rounds=3, stub_operations=False, background=False))
+    assert bookstore.get_all.call_count == 3
+    assert bookstore.add_book.call_count == 3
+
+def test_failures_dont_block_readiness(app, bookstore):
+    """Failing warm-up requests should be reported without preventing readiness."""
+    bookstore.get_all.side_effect = RuntimeError('cold')
+    app.build_api(warmup=WarmupSettings(rounds=1, stub_operations=False))
+    assert app.warmup.wait(timeout=5)
+    assert app.warmup.report.statuses['bookstore.get_all'] == {500: 1}
+
+@pytest.fixture(name='secured_spec')
+def _secured_spec():
+    """Fixture providing bookstore spec requiring bearer token and limiting rate of get_all."""
+    spec = to_plain(ymlref.load(SPEC_CONTENT))
+    spec['security'] = [{'token': []}]
+    spec['components']['securitySchemes'] = {'token': {'type': 'http', 'scheme': 'bearer'}}
+    spec['paths']['/books']['get']['x-aubergine-limits'] = {'rate': 1}
+    return spec
+
+def test_bypasses_admission_and_security(secured_spec, bookstore):
+    """Warm-up of stubbed operations should neither authenticate nor take admission tokens."""
+    app = Aubergine(secured_spec)
+    api = app.build_api(warmup=WarmupSettings(rounds=3, background=False),
+                        security=Authenticator({'token': lambda token: 'alice'}))
+    assert app.warmup.report.statuses['bookstore.get_all'] == {200: 3}
+    assert app.warmup.report.skipped == ()
+    client = testing.TestClient(api)
+    assert client.simulate_get('/v1/rest/books').status_code == 401
+    result = client.simulate_get('/v1/rest/books', headers={'Authorization': 'Bearer x'})
+    assert result.status_code == 200
+    bookstore.get_all.assert_called_once_with()
+
+def test_skips_secured_operations(secured_spec, bookstore):
+    """Warm-up calling operations should skip and report the ones requiring authentication."""
+    secured_spec['paths']['/books']['post']['security'] = []
+    app = Aubergine(secured_spec)
+    app.build_api(warmup=WarmupSettings(rounds=2, stub_operations=False, background=False),
+                  security=Authenticator({'token': lambda token: 'alice'}))
+    assert app.warmup.report.skipped == ('bookstore.get_all',)
+    assert list(app.warmup.report.statuses) == ['bookstore.add_book']
+    bookstore.get_all.assert_not_called()
+
+def test_import_skips_load_generator():
+    """Importing aubergine should load neither falcon.testing nor the load generator."""
+    code = ('import sys, aubergine; '
+            'print(sorted({"falcon.testing", "aubergine.loadgen"} & set(sys.modules)))')
+    output = subprocess.check_output([sys.executable, '-c', code], universal_newlines=True)
+    assert output.strip() == '[]'